@@ -4,6 +4,8 @@ Clear all reports and cleanings from Firestore
 """
 import firebase_admin
 from firebase_admin import credentials, firestore
+from services.bulk_mutations import delete_query
+from services.rollups import rebuild_rollups
 
 # Initialize Firebase
 try:
@@ -14,32 +16,21 @@ except:
 
 db = firestore.client()
 
+def report_progress(done):
+    print(f'   ... {done} deleted')
+
 # Clear reports
 print("🗑️  Clearing reports...")
-reports = db.collection('reports').stream()
-batch = db.batch()
-count = 0
-for doc in reports:
-    batch.delete(doc.reference)
-    count += 1
-    if count % 500 == 0:
-        batch.commit()
-        batch = db.batch()
-batch.commit()
-print(f'✅ Deleted {count} reports')
+result = delete_query(db.collection('reports'), "clear reports", db=db, on_progress=report_progress)
+print(f'✅ Deleted {result["written"]} reports in {result["seconds"]}s')
 
 # Clear cleanings
 print("🗑️  Clearing cleanings...")
-cleanings = db.collection('cleanings').stream()
-batch = db.batch()
-count = 0
-for doc in cleanings:
-    batch.delete(doc.reference)
-    count += 1
-    if count % 500 == 0:
-        batch.commit()
-        batch = db.batch()
-batch.commit()
-print(f'✅ Deleted {count} cleanings')
+result = delete_query(db.collection('cleanings'), "clear cleanings", db=db, on_progress=report_progress)
+print(f'✅ Deleted {result["written"]} cleanings in {result["seconds"]}s')
+
+# Drop their daily rollups
+print("🗑️  Clearing report and cleaning rollups...")
+rebuild_rollups(['reports', 'cleanings'], db=db)
 
 print('🔄 Database reset complete!')
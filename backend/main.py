@@ -3,6 +3,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 import logging
+from services.warmup import start_background_warmup, warmup_status
+from services.alert_queue import worker_status
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -11,15 +13,10 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 app = FastAPI(title="LUIT Backend", version="1.0.0")
- 
-# Initialize Firebase Admin SDK before importing any routes that use Firestore/Auth
-try:
-    from services.firebase_service import init_firebase
-    init_firebase()
-    logger.info("✅ Firebase Admin SDK initialized")
-except Exception as e:
-    logger.error(f"❌ Firebase initialization failed: {e}")
-    # Proceeding allows health endpoint to work; Firestore routes will raise until fixed
+
+# Firebase, Cloudinary and the image model initialize on first use; the
+# startup warmup below prepares them in the background so /health is served
+# immediately.
 
 # CORS Configuration - Allow specific origins
 allowed_origins = [
@@ -50,7 +47,9 @@ def health_check():
         "status": "healthy", 
         "message": "LUIT Backend is running", 
         "timestamp": str(__import__('datetime').datetime.utcnow()),
-        "admin_enabled": True
+        "admin_enabled": True,
+        "warmup": warmup_status(),
+        "alertWorker": worker_status()
     }
 
 @app.get("/")
@@ -75,6 +74,74 @@ app.include_router(health_agent.router)
 
 logger.info("✅ All routes registered")
 
+@app.on_event("startup")
+def start_warmup():
+    """Initialize Firebase, reference caches and the image model off the request path"""
+    start_background_warmup()
+
+@app.on_event("startup")
+def start_reference_cache_listeners():
+    """Optionally keep labs, safe sources and guidance current via snapshot listeners"""
+    if os.getenv("REFERENCE_CACHE_LISTEN", "").lower() in ("1", "true", "yes"):
+        from services.reference_cache import watch_reference_collections
+        attached = watch_reference_collections()
+        logger.info(f"✅ Reference cache listeners attached: {attached}")
+
+@app.on_event("startup")
+def start_live_mirrors():
+    """Mirror active reports and alerts in memory (MIRROR_MODE=listen|poll|off)"""
+    from services.live_mirror import start_mirrors
+    start_mirrors()
+
+@app.on_event("shutdown")
+def stop_live_mirrors():
+    from services.live_mirror import stop_mirrors
+    stop_mirrors()
+
+@app.on_event("startup")
+def start_hotspot_job():
+    """Recompute hotspots in-process when HOTSPOT_INTERVAL_MINUTES is set"""
+    from services.hotspots import start_hotspot_scheduler
+    start_hotspot_scheduler()
+
+@app.on_event("shutdown")
+def stop_hotspot_job():
+    from services.hotspots import stop_hotspot_scheduler
+    stop_hotspot_scheduler()
+
+@app.on_event("startup")
+def start_alert_queue_worker():
+    """Evaluate alert rules for submitted reports off the request path (ALERT_WORKER=0 to disable)"""
+    from services.alert_queue import start_alert_worker
+    start_alert_worker()
+
+@app.on_event("shutdown")
+def stop_alert_queue_worker():
+    from services.alert_queue import stop_alert_worker
+    stop_alert_worker()
+
+@app.on_event("startup")
+def start_alert_expiry_job():
+    """Archive expired alerts in-process every ALERT_EXPIRY_INTERVAL_MINUTES (0 to disable)"""
+    from services.alert_expiry import start_expiry_scheduler
+    start_expiry_scheduler()
+
+@app.on_event("shutdown")
+def stop_alert_expiry_job():
+    from services.alert_expiry import stop_expiry_scheduler
+    stop_expiry_scheduler()
+
+@app.on_event("startup")
+def start_rollup_job():
+    """Recount the reports rollups every ROLLUP_REBUILD_INTERVAL_MINUTES (0 to disable)"""
+    from services.rollups import start_rollup_scheduler
+    start_rollup_scheduler()
+
+@app.on_event("shutdown")
+def stop_rollup_job():
+    from services.rollups import stop_rollup_scheduler
+    stop_rollup_scheduler()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("BACKEND_PORT", 5000))
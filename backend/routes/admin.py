@@ -1,123 +1,204 @@
-from fastapi import APIRouter, HTTPException
-from firebase_admin import firestore, auth
+from fastapi import APIRouter, HTTPException, Response
+from firebase_admin import auth
+from services.firebase_service import get_firestore_client
+from collections import Counter
+from typing import Literal, Optional
+from services.bulk_mutations import bulk_delete, bulk_update, delete_query
+from services.pagination import decode_cursor, ndjson_response, ordered_query, paginate_query, snapshot_with_id
+from services.rollups import ROLLUP_SOURCES, rebuild_rollups, record_rollup, subtract_rollups
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
-db = firestore.client()
+
+def _validate_cursor(start_after: str):
+    """400 for a cursor that is malformed or not from these listings"""
+    try:
+        values = decode_cursor(start_after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # _list_collection orders by document id alone, so its cursors hold one value
+    if len(values) != 1:
+        raise HTTPException(status_code=400, detail="Pagination cursor does not match this query")
+
+def _list_collection(collection: str, response: Response, limit: Optional[int],
+                     start_after: Optional[str], format: str):
+    """Shared reader for the admin collection listings.
+
+    format=ndjson streams every document (or every document after the cursor)
+    without buffering. With a limit, one cursor page is returned and the token
+    for the next page is sent in the X-Next-Cursor header; without one, every
+    document (after the cursor, if given) is returned.
+    """
+    db = get_firestore_client()
+    query = db.collection(collection)
+
+    if format == "ndjson":
+        if start_after or limit:
+            query = ordered_query(query, start_after=start_after)
+        if limit:
+            query = query.limit(limit)
+        return ndjson_response(query.stream())
+
+    if limit is None:
+        if start_after:
+            query = ordered_query(query, start_after=start_after)
+        return [snapshot_with_id(doc) for doc in query.stream()]
+
+    docs, next_cursor = paginate_query(query, limit, start_after)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return [snapshot_with_id(doc) for doc in docs]
 
 @router.get("/reports")
-async def get_all_reports():
+async def get_all_reports(response: Response, limit: Optional[int] = None, start_after: Optional[str] = None,
+                          format: Literal["json", "ndjson"] = "json"):
     """Get all reports for admin view"""
+    if start_after:
+        _validate_cursor(start_after)
     try:
-        reports_ref = db.collection('reports')
-        reports = []
-        for doc in reports_ref.stream():
-            report_data = doc.to_dict()
-            report_data['id'] = doc.id
-            reports.append(report_data)
-        return reports
+        return _list_collection('reports', response, limit, start_after, format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/cleanings")
-async def get_all_cleanings():
+async def get_all_cleanings(response: Response, limit: Optional[int] = None, start_after: Optional[str] = None,
+                            format: Literal["json", "ndjson"] = "json"):
     """Get all cleanings for admin view"""
+    if start_after:
+        _validate_cursor(start_after)
     try:
-        cleanings_ref = db.collection('cleanings')
-        cleanings = []
-        for doc in cleanings_ref.stream():
-            cleaning_data = doc.to_dict()
-            cleaning_data['id'] = doc.id
-            cleanings.append(cleaning_data)
-        return cleanings
+        return _list_collection('cleanings', response, limit, start_after, format)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+ADMIN_SORT_FIELDS = ("name", "email", "reportsCount", "cleaningsCount", "createdAt")
+
+def _activity_counts():
+    """Count reports and cleanings per userId in one pass over each collection.
+
+    Only the userId field is projected so the scan does not pull whole documents.
+    """
+    db = get_firestore_client()
+    reports_counts = Counter()
+    cleanings_counts = Counter()
+    for doc in db.collection('reports').select(['userId']).stream():
+        uid = (doc.to_dict() or {}).get('userId')
+        if uid:
+            reports_counts[uid] += 1
+    for doc in db.collection('cleanings').select(['userId']).stream():
+        uid = (doc.to_dict() or {}).get('userId')
+        if uid:
+            cleanings_counts[uid] += 1
+    return reports_counts, cleanings_counts
+
+def _list_profiles(user_type: str, display_name, response: Response,
+                   limit: Optional[int], offset: int, sort_by: str, order: str):
+    """Join profiles of one userType with their activity counts, then sort and page.
+
+    Runs a constant three queries (profiles, reports, cleanings) regardless of
+    how many profiles exist. The unpaged total is returned in X-Total-Count.
+    """
+    db = get_firestore_client()
+    reports_counts, cleanings_counts = _activity_counts()
+
+    profiles = []
+    for doc in db.collection('users').where('userType', '==', user_type).stream():
+        profile = doc.to_dict() or {}
+        uid = doc.id
+        profiles.append({
+            'id': uid,
+            'name': display_name(profile),
+            'email': profile.get('email', ''),
+            'userType': user_type,
+            'reportsCount': reports_counts.get(uid, 0),
+            'cleaningsCount': cleanings_counts.get(uid, 0),
+            'createdAt': str(profile.get('createdAt'))
+        })
+
+    if sort_by not in ADMIN_SORT_FIELDS:
+        sort_by = 'createdAt'
+    profiles.sort(key=lambda p: (p[sort_by] is None, p[sort_by]), reverse=(order == 'desc'))
+
+    response.headers['X-Total-Count'] = str(len(profiles))
+    offset = max(offset, 0)
+    if limit is None:
+        return profiles[offset:]
+    return profiles[offset:offset + max(limit, 0)]
+
 @router.get("/users")
-async def get_all_users():
+async def get_all_users(response: Response, limit: Optional[int] = None, offset: int = 0,
+                        sort_by: str = "createdAt", order: Literal["asc", "desc"] = "desc"):
     """Get all individual users from Firestore with activity counts.
     Admin UI relies on Firestore as the source of truth so delete operations
     reflect immediately and login remains consistent.
     """
     try:
-        users_list = []
-
-        # Read canonical profiles from Firestore
-        users_ref = db.collection('users').where('userType', '==', 'individual')
-        for doc in users_ref.stream():
-            user = doc.to_dict() or {}
-            uid = doc.id
-            # Count activity
-            reports_count = sum(1 for _ in db.collection('reports').where('userId', '==', uid).stream())
-            cleanings_count = sum(1 for _ in db.collection('cleanings').where('userId', '==', uid).stream())
-            users_list.append({
-                'id': uid,
-                'name': user.get('name') or user.get('email', 'Unknown'),
-                'email': user.get('email', ''),
-                'userType': 'individual',
-                'reportsCount': reports_count,
-                'cleaningsCount': cleanings_count,
-                'createdAt': str(user.get('createdAt'))
-            })
-
-        return users_list
+        return _list_profiles(
+            'individual',
+            lambda user: user.get('name') or user.get('email', 'Unknown'),
+            response, limit, offset, sort_by, order
+        )
     except Exception as e:
         return []
 
 @router.get("/ngos")
-async def get_all_ngos():
+async def get_all_ngos(response: Response, limit: Optional[int] = None, offset: int = 0,
+                       sort_by: str = "createdAt", order: Literal["asc", "desc"] = "desc"):
     """Get all NGOs from Firestore with activity counts."""
     try:
-        ngos_list = []
-
-        ngos_ref = db.collection('users').where('userType', '==', 'ngo')
-        for doc in ngos_ref.stream():
-            ngo = doc.to_dict() or {}
-            uid = doc.id
-            reports_count = sum(1 for _ in db.collection('reports').where('userId', '==', uid).stream())
-            cleanings_count = sum(1 for _ in db.collection('cleanings').where('userId', '==', uid).stream())
-            ngos_list.append({
-                'id': uid,
-                'name': ngo.get('ngoName') or ngo.get('name') or 'Unknown NGO',
-                'email': ngo.get('email', ''),
-                'userType': 'ngo',
-                'reportsCount': reports_count,
-                'cleaningsCount': cleanings_count,
-                'createdAt': str(ngo.get('createdAt'))
-            })
-
-        return ngos_list
+        return _list_profiles(
+            'ngo',
+            lambda ngo: ngo.get('ngoName') or ngo.get('name') or 'Unknown NGO',
+            response, limit, offset, sort_by, order
+        )
     except Exception as e:
         return []
 
+async def _delete_reports_with_images(query, label: str, include=lambda data: True) -> int:
+    """Bulk delete the reports a query matches, then their Cloudinary images.
+
+    Only userType and public_id are read. include() decides per document
+    whether it is deleted, for filters Firestore cannot express (e.g. a
+    missing userType counts as "not ngo").
+    """
+    from services.cloudinary_service import delete_image_from_cloudinary
+    public_ids = []
+
+    def references():
+        for doc in query.select(['userType', 'public_id']).stream():
+            report_data = doc.to_dict() or {}
+            if not include(report_data):
+                continue
+            if report_data.get('public_id'):
+                public_ids.append(report_data['public_id'])
+            yield doc.reference
+
+    result = bulk_delete(references(), label)
+
+    for public_id in public_ids:
+        try:
+            await delete_image_from_cloudinary(public_id)
+        except Exception as img_err:
+            logger.warning(f"Could not delete image {public_id}: {str(img_err)}")
+
+    return result['written']
+
+def _delete_where(collection: str, label: str, include=lambda data: True) -> int:
+    """Bulk delete a collection's documents whose userType passes include()"""
+    db = get_firestore_client()
+    docs = db.collection(collection).select(['userType']).stream()
+    refs = (doc.reference for doc in docs if include(doc.to_dict() or {}))
+    return bulk_delete(refs, label)['written']
+
 @router.delete("/clear/reports")
 async def clear_all_reports():
     """Delete all reports from database and their images from Cloudinary"""
     try:
-        from services.cloudinary_service import delete_image_from_cloudinary
-        reports_ref = db.collection('reports')
-        batch = db.batch()
-        count = 0
-        
-        for doc in reports_ref.stream():
-            report_data = doc.to_dict()
-            public_id = report_data.get('public_id')
-            
-            # Delete image from Cloudinary if public_id exists
-            if public_id:
-                try:
-                    await delete_image_from_cloudinary(public_id)
-                except Exception as img_err:
-                    logger.warning(f"Could not delete image {public_id}: {str(img_err)}")
-            
-            batch.delete(doc.reference)
-            count += 1
-            
-            # Firestore batch limit is 500
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
-        
-        batch.commit()
+        db = get_firestore_client()
+        count = await _delete_reports_with_images(db.collection('reports'), "clear reports")
+        rebuild_rollups(['reports'])
         return {"message": f"Cleared {count} reports and their images"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -126,56 +207,15 @@ async def clear_all_reports():
 async def clear_all_cleanings():
     """Delete all cleanings and reset user points"""
     try:
-        # Clear cleanings
-        cleanings_ref = db.collection('cleanings')
-        batch = db.batch()
-        count = 0
-        
-        for doc in cleanings_ref.stream():
-            batch.delete(doc.reference)
-            count += 1
-            
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
-        
-        batch.commit()
-        
-        # Reset user points
-        users_ref = db.collection('users')
-        user_batch = db.batch()
-        user_count = 0
-        
-        for doc in users_ref.stream():
-            user_batch.update(doc.reference, {
-                'points': 0,
-                'cleaningsCount': 0
-            })
-            user_count += 1
-            
-            if user_count % 500 == 0:
-                user_batch.commit()
-                user_batch = db.batch()
-        
-        user_batch.commit()
-        
-        # Reset NGO points
-        ngos_ref = db.collection('ngos')
-        ngo_batch = db.batch()
-        ngo_count = 0
-        
-        for doc in ngos_ref.stream():
-            ngo_batch.update(doc.reference, {
-                'points': 0,
-                'cleaningsCount': 0
-            })
-            ngo_count += 1
-            
-            if ngo_count % 500 == 0:
-                ngo_batch.commit()
-                ngo_batch = db.batch()
-        
-        ngo_batch.commit()
+        db = get_firestore_client()
+        count = delete_query(db.collection('cleanings'), "clear cleanings")['written']
+        rebuild_rollups(['cleanings'])
+
+        # Reset user and NGO points
+        reset = {'points': 0, 'cleaningsCount': 0}
+        for collection in ('users', 'ngos'):
+            refs = (doc.reference for doc in db.collection(collection).select([]).stream())
+            bulk_update(refs, reset, f"reset {collection} points")
         
         return {"message": f"Cleared {count} cleanings and reset all points"}
     except Exception as e:
@@ -185,60 +225,18 @@ async def clear_all_cleanings():
 async def clear_all_users():
     """Delete all user documents from Firestore and related user data and images"""
     try:
-        from services.cloudinary_service import delete_image_from_cloudinary
-        
-        # 1) Delete all documents in 'users' collection
-        users_ref = db.collection('users')
-        users_batch = db.batch()
-        users_count = 0
-
-        for doc in users_ref.stream():
-            users_batch.delete(doc.reference)
-            users_count += 1
-            if users_count % 500 == 0:
-                users_batch.commit()
-                users_batch = db.batch()
+        db = get_firestore_client()
+        not_ngo = lambda data: data.get('userType') != 'ngo'
 
-        users_batch.commit()
+        # 1) Delete all documents in 'users' collection
+        users_count = delete_query(db.collection('users'), "clear users")['written']
 
         # 2) Delete all non-NGO reports and their images
-        reports_ref = db.collection('reports')
-        reports_batch = db.batch()
-        reports_count = 0
-
-        for doc in reports_ref.stream():
-            report_data = doc.to_dict()
-            if report_data.get('userType') != 'ngo':
-                public_id = report_data.get('public_id')
-                if public_id:
-                    try:
-                        await delete_image_from_cloudinary(public_id)
-                    except Exception as img_err:
-                        logger.warning(f"Could not delete image {public_id}: {str(img_err)}")
-                
-                reports_batch.delete(doc.reference)
-                reports_count += 1
-                if reports_count % 500 == 0:
-                    reports_batch.commit()
-                    reports_batch = db.batch()
-
-        reports_batch.commit()
+        reports_count = await _delete_reports_with_images(db.collection('reports'), "clear user reports", not_ngo)
 
         # 3) Delete all non-NGO cleanings
-        cleanings_ref = db.collection('cleanings')
-        cleanings_batch = db.batch()
-        cleanings_count = 0
-
-        for doc in cleanings_ref.stream():
-            cleaning_data = doc.to_dict()
-            if cleaning_data.get('userType') != 'ngo':
-                cleanings_batch.delete(doc.reference)
-                cleanings_count += 1
-                if cleanings_count % 500 == 0:
-                    cleanings_batch.commit()
-                    cleanings_batch = db.batch()
-
-        cleanings_batch.commit()
+        cleanings_count = _delete_where('cleanings', "clear user cleanings", not_ngo)
+        rebuild_rollups(['reports', 'cleanings'])
 
         return {
             "message": (
@@ -253,49 +251,15 @@ async def clear_all_users():
 async def clear_all_ngos():
     """Delete all NGO data from reports and cleanings, and their images"""
     try:
-        from services.cloudinary_service import delete_image_from_cloudinary
-        
-        count = 0
-        
+        db = get_firestore_client()
+        is_ngo = lambda data: data.get('userType') == 'ngo'
+
         # Delete all NGO reports and their images
-        reports_ref = db.collection('reports')
-        batch = db.batch()
-        
-        for doc in reports_ref.stream():
-            report_data = doc.to_dict()
-            if report_data.get('userType') == 'ngo':
-                public_id = report_data.get('public_id')
-                if public_id:
-                    try:
-                        await delete_image_from_cloudinary(public_id)
-                    except Exception as img_err:
-                        logger.warning(f"Could not delete image {public_id}: {str(img_err)}")
-                
-                batch.delete(doc.reference)
-                count += 1
-                
-                if count % 500 == 0:
-                    batch.commit()
-                    batch = db.batch()
-        
-        batch.commit()
+        count = await _delete_reports_with_images(db.collection('reports'), "clear NGO reports", is_ngo)
         
         # Delete NGO cleanings
-        cleanings_ref = db.collection('cleanings')
-        cleaning_batch = db.batch()
-        cleaning_count = 0
-        
-        for doc in cleanings_ref.stream():
-            cleaning_data = doc.to_dict()
-            if cleaning_data.get('userType') == 'ngo':
-                cleaning_batch.delete(doc.reference)
-                cleaning_count += 1
-                
-                if cleaning_count % 500 == 0:
-                    cleaning_batch.commit()
-                    cleaning_batch = db.batch()
-        
-        cleaning_batch.commit()
+        cleaning_count = _delete_where('cleanings', "clear NGO cleanings", is_ngo)
+        rebuild_rollups(['reports', 'cleanings'])
         
         return {"message": f"Cleared {count} NGO records with images and {cleaning_count} cleanings"}
     except Exception as e:
@@ -305,8 +269,10 @@ async def clear_all_ngos():
 async def delete_report(report_id: str):
     """Delete a single report by ID and its associated image from Cloudinary"""
     try:
+        db = get_firestore_client()
         # Get report data to retrieve public_id before deletion
-        report_doc = db.collection('reports').document(report_id).get()
+        report_ref = db.collection('reports').document(report_id)
+        report_doc = report_ref.get()
         if report_doc.exists:
             report_data = report_doc.to_dict()
             public_id = report_data.get('public_id')
@@ -320,8 +286,12 @@ async def delete_report(report_id: str):
                     logger.warning(f"Could not delete image: {str(img_err)}")
                     # Continue with report deletion even if image delete fails
         
-        # Delete the report from Firestore
-        db.collection('reports').document(report_id).delete()
+        # Delete the report from Firestore, uncounting it from its day's rollup
+        batch = db.batch()
+        batch.delete(report_ref)
+        if report_doc.exists:
+            record_rollup(batch, 'reports', report_doc.to_dict() or {}, delta=-1, db=db)
+        batch.commit()
         return {"message": f"Deleted report {report_id} and associated image"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -330,35 +300,41 @@ async def delete_report(report_id: str):
 async def delete_cleaning(cleaning_id: str):
     """Delete a single cleaning by ID"""
     try:
-        db.collection('cleanings').document(cleaning_id).delete()
+        db = get_firestore_client()
+        cleaning_ref = db.collection('cleanings').document(cleaning_id)
+        cleaning_doc = cleaning_ref.get()
+        batch = db.batch()
+        batch.delete(cleaning_ref)
+        if cleaning_doc.exists:
+            record_rollup(batch, 'cleanings', cleaning_doc.to_dict() or {}, delta=-1, db=db)
+        batch.commit()
         return {"message": f"Deleted cleaning {cleaning_id}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _delete_owner_records(owner_id: str, label: str) -> int:
+    """Bulk delete every report and cleaning owned by one account and take them out of the daily rollups"""
+    db = get_firestore_client()
+    deleted = {'reports': [], 'cleanings': []}
+    def references():
+        for collection, docs in deleted.items():
+            time_fields, dimensions = ROLLUP_SOURCES[collection]
+            query = db.collection(collection).where('userId', '==', owner_id).select(time_fields + dimensions)
+            for doc in query.stream():
+                docs.append(doc)
+                yield doc.reference
+    count = bulk_delete(references(), label)['written']
+    for collection, docs in deleted.items():
+        if docs:
+            subtract_rollups(collection, docs, db=db)
+    return count
+
 @router.delete("/delete/user/{user_id}")
 async def delete_user(user_id: str):
     """Delete all data for a single user (reports and cleanings)"""
     try:
-        count = 0
-        
-        # Delete user's reports
-        reports = db.collection('reports').where('userId', '==', user_id).stream()
-        batch = db.batch()
-        for doc in reports:
-            batch.delete(doc.reference)
-            count += 1
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
-        
-        # Delete user's cleanings
-        cleanings = db.collection('cleanings').where('userId', '==', user_id).stream()
-        for doc in cleanings:
-            batch.delete(doc.reference)
-            count += 1
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
+        db = get_firestore_client()
+        count = _delete_owner_records(user_id, f"delete user {user_id}")
         
         # Delete user profile if exists
         db.collection('users').document(user_id).delete()
@@ -367,8 +343,6 @@ async def delete_user(user_id: str):
             auth.delete_user(user_id)
         except Exception as _:
             pass
-
-        batch.commit()
         
         return {"message": f"Deleted user {user_id} and {count} associated records"}
     except Exception as e:
@@ -378,26 +352,8 @@ async def delete_user(user_id: str):
 async def delete_ngo(ngo_id: str):
     """Delete all data for a single NGO (reports and cleanings)"""
     try:
-        count = 0
-        
-        # Delete NGO's reports
-        reports = db.collection('reports').where('userId', '==', ngo_id).stream()
-        batch = db.batch()
-        for doc in reports:
-            batch.delete(doc.reference)
-            count += 1
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
-        
-        # Delete NGO's cleanings
-        cleanings = db.collection('cleanings').where('userId', '==', ngo_id).stream()
-        for doc in cleanings:
-            batch.delete(doc.reference)
-            count += 1
-            if count % 500 == 0:
-                batch.commit()
-                batch = db.batch()
+        db = get_firestore_client()
+        count = _delete_owner_records(ngo_id, f"delete NGO {ngo_id}")
         
         # Delete NGO profile and auth account
         db.collection('users').document(ngo_id).delete()
@@ -405,9 +361,7 @@ async def delete_ngo(ngo_id: str):
             auth.delete_user(ngo_id)
         except Exception as _:
             pass
-
-        batch.commit()
         
         return {"message": f"Deleted NGO {ngo_id} and {count} associated records"}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
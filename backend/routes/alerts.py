@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional, Literal
-from services.firebase_service import add_document, get_document, query_documents, update_document, get_firestore_client
-from services.alert_engine import check_and_trigger_alerts
-from services.utils import haversine_distance
-from datetime import datetime
+from services.firebase_service import add_document, query_documents, update_document, get_firestore_client
+from services.alert_engine import MAX_ALERT_RADIUS, affected_radius, alert_live, check_and_trigger_alerts, find_alert
+from services.alert_queue import queue_stats
+from services.geohash import query_nearby, with_geohash
+from services.live_mirror import ActiveAlert, active_alert_geofences, active_alerts, freshness
+from services.notifications import SUBSCRIPTIONS_COLLECTION, dispatch_alert, subscribers
+from datetime import datetime, timedelta
 from google.cloud.firestore import GeoPoint, FieldFilter
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
@@ -16,39 +19,91 @@ class ManualAlertRequest(BaseModel):
     severityLevel: str
     message: str
     radius: int = 5000
+    ttlHours: Optional[float] = None  # None = active until dismissed
+
+class SubscribeRequest(BaseModel):
+    userId: str
+    latitude: float
+    longitude: float
+    channel: Literal["sms", "push"]
+    address: str  # phone number for sms, device token for push
+    contaminationTypes: Optional[List[str]] = None  # None = every type
+
+def _active_alert_records() -> tuple:
+    """Live alerts from the in-memory mirror, or Firestore while it is not ready"""
+    now = datetime.now().isoformat()
+    if active_alerts.ready:
+        return [r for r in active_alerts.records() if alert_live(r.payload, now)], active_alerts
+    db = get_firestore_client()
+    docs = db.collection("alerts").where(filter=FieldFilter("status", "==", "active")).stream()
+    records = [ActiveAlert.from_dict(doc.id, doc.to_dict() or {}) for doc in docs]
+    return [r for r in records if alert_live(r.payload, now)], None
 
 @router.get("/active")
-async def get_active_alerts(lat: Optional[float] = None, lon: Optional[float] = None, radius: int = 10000):
-    """Get active alerts, optionally filtered by proximity"""
+async def get_active_alerts(lat: Optional[float] = None, lon: Optional[float] = None, radius: int = 10000,
+                            mode: Literal["center", "covering"] = "center"):
+    """Get active alerts, optionally filtered by proximity.
+
+    With lat/lon, mode "center" (the default) returns the alerts whose center
+    is within radius meters of the point. Mode "covering" returns the alerts
+    whose affected area covers the point or comes within radius meters of it,
+    and sets covers on the ones the point is inside.
+    Alerts past their expiresAt are left out before the expiry job archives them.
+    """
     try:
-        db = get_firestore_client()
-        docs = db.collection("alerts").where(filter=FieldFilter("status", "==", "active")).stream()
+        if lat is not None and lon is not None:
+            covering = mode == "covering"
+            alerts = []
+            now = datetime.now().isoformat()
+            if active_alerts.ready:
+                # Geofence index over the mirror: only alert areas near the point are checked
+                for dist, alert_id, record in active_alert_geofences.covering(
+                        lat, lon, buffer_meters=radius, where=lambda alert: alert_live(alert.payload, now)):
+                    if not covering and dist > radius:
+                        continue
+                    data = dict(record.payload)
+                    data['id'] = alert_id
+                    data['distance'] = round(dist, 2)
+                    if covering:
+                        data['covers'] = dist <= affected_radius(data)
+                    alerts.append(data)
+                return {"success": True, "alerts": alerts, "asOf": freshness(active_alerts)}
+
+            # Without the mirror only alerts in the geohash cells that can reach the point are read
+            reach = radius + MAX_ALERT_RADIUS if covering else radius
+            for data in query_nearby("alerts", lat, lon, reach, filters=[("status", "==", "active")]):
+                if not alert_live(data, now):
+                    continue
+                if covering:
+                    if data['distance'] > affected_radius(data) + radius:
+                        continue
+                    data['covers'] = data['distance'] <= affected_radius(data)
+                data['distance'] = round(data['distance'], 2)
+                alerts.append(data)
+            alerts.sort(key=lambda a: a['distance'])
+            return {"success": True, "alerts": alerts, "asOf": freshness()}
+
+        records, mirror = _active_alert_records()
         
         alerts = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            
-            # Distance filter if coordinates provided
-            if lat is not None and lon is not None:
-                a_lat = data.get("latitude")
-                a_lon = data.get("longitude")
-                if a_lat is not None and a_lon is not None:
-                    dist = haversine_distance(lat, lon, a_lat, a_lon)
-                    if dist <= radius:
-                        data['distance'] = round(dist, 2)
-                        alerts.append(data)
-            else:
-                alerts.append(data)
+        for record in records:
+            data = dict(record.payload)
+            data['id'] = record.id
+            alerts.append(data)
                 
-        return {"success": True, "alerts": alerts}
+        return {"success": True, "alerts": alerts, "asOf": freshness(mirror)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/create")
 async def create_manual_alert(request: ManualAlertRequest):
     """Health agent creates manual alert"""
+    if not 0 < request.radius <= MAX_ALERT_RADIUS:
+        raise HTTPException(status_code=400, detail=f"radius must be between 1 and {MAX_ALERT_RADIUS} meters")
+    if request.ttlHours is not None and request.ttlHours <= 0:
+        raise HTTPException(status_code=400, detail="ttlHours must be positive")
     try:
+        now = datetime.now()
         alert_data = {
             "triggerType": "manual",
             "contaminationType": request.contaminationType,
@@ -60,16 +115,53 @@ async def create_manual_alert(request: ManualAlertRequest):
                 "center": GeoPoint(request.latitude, request.longitude),
                 "radius": request.radius
             },
-            "createdAt": datetime.now().isoformat(),
+            "createdAt": now.isoformat(),
             "status": "active",
             "verified": True,
             "createdBy": "health_agent"
         }
-        alert_id = add_document("alerts", alert_data)
+        if request.ttlHours is not None:
+            alert_data["expiresAt"] = (now + timedelta(hours=request.ttlHours)).isoformat()
+        alert_id = add_document("alerts", with_geohash(alert_data))
+        active_alerts.apply_local_write(alert_id, alert_data)
+        dispatch_alert(alert_id, alert_data)
         return {"success": True, "alertId": alert_id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/subscribe")
+async def subscribe_to_alerts(request: SubscribeRequest):
+    """Receive alerts raised around a home location (one subscription per user)"""
+    try:
+        data = {
+            "userId": request.userId,
+            "latitude": request.latitude,
+            "longitude": request.longitude,
+            "location": GeoPoint(request.latitude, request.longitude),
+            "channel": request.channel,
+            "address": request.address,
+            "contaminationTypes": request.contaminationTypes,
+            "status": "active",
+            "updatedAt": datetime.now().isoformat()
+        }
+        get_firestore_client().collection(SUBSCRIPTIONS_COLLECTION).document(request.userId).set(with_geohash(data))
+        subscribers.apply_local_write(request.userId, data)
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/subscribe/{user_id}")
+async def unsubscribe_from_alerts(user_id: str):
+    try:
+        get_firestore_client().collection(SUBSCRIPTIONS_COLLECTION).document(user_id).update({
+            "status": "inactive",
+            "updatedAt": datetime.now().isoformat()
+        })
+        subscribers.apply_local_write(user_id, None)
+        return {"success": True}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/{alert_id}/dismiss")
 async def dismiss_alert(alert_id: str, reason: str):
     """Dismiss or resolve an alert"""
@@ -79,6 +171,7 @@ async def dismiss_alert(alert_id: str, reason: str):
             "dismissReason": reason,
             "updatedAt": datetime.now().isoformat()
         })
+        active_alerts.apply_local_write(alert_id, None)
         return {"success": True, "message": "Alert dismissed"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -103,13 +196,22 @@ async def mark_affected(alert_id: str, user_id: str):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/queue")
+async def get_alert_queue():
+    """Alert evaluation queue: entries waiting, lag of the oldest and this worker's counters"""
+    try:
+        return {"success": True, **queue_stats()}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{alert_id}")
-async def get_alert(alert_id: str):
+async def get_alert(alert_id: str, createdAt: Optional[str] = None):
+    """An alert, archived ones included; createdAt picks one of the alerts that held a reused id"""
     try:
-        alert = get_document("alerts", alert_id)
-        if not alert:
-            raise HTTPException(status_code=404, detail="Alert not found")
-        alert['id'] = alert_id
-        return {"success": True, "alert": alert}
+        alert = find_alert(alert_id, createdAt)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    alert['id'] = alert_id
+    return {"success": True, "alert": alert}
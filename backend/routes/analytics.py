@@ -1,10 +1,19 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from services.firebase_service import get_firestore_client
 from google.cloud.firestore import FieldFilter
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+from services.rollups import ROLLUP_SOURCES, get_rollups, timeseries
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
+# Longest range /timeseries serves (one rollup read per uncached day)
+MAX_TIMESERIES_DAYS = 5 * 366
+
+# Projections for the leaderboard scans - only identity and points are used
+REPORT_LEADERBOARD_FIELDS = ["userId", "userName"]
+CLEANING_LEADERBOARD_FIELDS = ["userId", "userName", "pointsAwarded"]
+
 @router.get("/user/{userId}")
 async def get_user_analytics(userId: str):
     """Get user analytics - reports and cleanings count"""
@@ -12,15 +21,15 @@ async def get_user_analytics(userId: str):
         db = get_firestore_client()
         
         # Count reports by user
-        reports = db.collection("reports").where(filter=FieldFilter("userId", "==", userId)).stream()
+        reports = db.collection("reports").where(filter=FieldFilter("userId", "==", userId)).select([]).stream()
         reports_count = sum(1 for _ in reports)
         
         # Count cleanings by user
-        cleanings = db.collection("cleanings").where(filter=FieldFilter("userId", "==", userId)).stream()
+        cleanings = db.collection("cleanings").where(filter=FieldFilter("userId", "==", userId)).select([]).stream()
         cleanings_count = sum(1 for _ in cleanings)
         
         # Calculate total points
-        cleanings_list = db.collection("cleanings").where(filter=FieldFilter("userId", "==", userId)).stream()
+        cleanings_list = db.collection("cleanings").where(filter=FieldFilter("userId", "==", userId)).select(["pointsAwarded"]).stream()
         total_points = sum(c.to_dict().get("pointsAwarded", 0) for c in cleanings_list)
         total_points += reports_count * 10  # 10 points per report
         
@@ -46,13 +55,13 @@ async def get_ngo_analytics(ngoId: str):
     try:
         db = get_firestore_client()
         
-        reports = db.collection("reports").where(filter=FieldFilter("userId", "==", ngoId)).stream()
+        reports = db.collection("reports").where(filter=FieldFilter("userId", "==", ngoId)).select([]).stream()
         reports_count = sum(1 for _ in reports)
         
-        cleanings = db.collection("cleanings").where(filter=FieldFilter("userId", "==", ngoId)).stream()
+        cleanings = db.collection("cleanings").where(filter=FieldFilter("userId", "==", ngoId)).select([]).stream()
         cleanings_count = sum(1 for _ in cleanings)
         
-        cleanings_list = db.collection("cleanings").where(filter=FieldFilter("userId", "==", ngoId)).stream()
+        cleanings_list = db.collection("cleanings").where(filter=FieldFilter("userId", "==", ngoId)).select(["pointsAwarded"]).stream()
         total_points = sum(c.to_dict().get("pointsAwarded", 0) for c in cleanings_list)
         total_points += reports_count * 10
         
@@ -79,7 +88,7 @@ async def get_global_analytics():
         db = get_firestore_client()
         
         # Count all reports
-        all_reports = db.collection("reports").stream()
+        all_reports = db.collection("reports").select(["status", "wasteType"]).stream()
         reports_list = [r.to_dict() for r in all_reports]
         total_reports = len(reports_list)
         
@@ -136,7 +145,7 @@ async def get_users_leaderboard(category: str = "reporting", limit: int = 20):
         
         if category == "reporting":
             # Get all users with their reports count
-            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "individual")).stream()
+            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "individual")).select(REPORT_LEADERBOARD_FIELDS).stream()
             user_stats = {}
             
             for report in reports:
@@ -154,7 +163,7 @@ async def get_users_leaderboard(category: str = "reporting", limit: int = 20):
             
         elif category == "cleaning":
             # Get all users with their cleanings points
-            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "individual")).stream()
+            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "individual")).select(CLEANING_LEADERBOARD_FIELDS).stream()
             user_stats = {}
             
             for cleaning in cleanings:
@@ -176,7 +185,7 @@ async def get_users_leaderboard(category: str = "reporting", limit: int = 20):
             user_stats = {}
             
             # Add reporting points
-            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "individual")).stream()
+            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "individual")).select(REPORT_LEADERBOARD_FIELDS).stream()
             for report in reports:
                 data = report.to_dict()
                 user_id = data.get("userId")
@@ -188,7 +197,7 @@ async def get_users_leaderboard(category: str = "reporting", limit: int = 20):
                     user_stats[user_id]["points"] += 10
             
             # Add cleaning points
-            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "individual")).stream()
+            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "individual")).select(CLEANING_LEADERBOARD_FIELDS).stream()
             for cleaning in cleanings:
                 data = cleaning.to_dict()
                 user_id = data.get("userId")
@@ -215,7 +224,7 @@ async def get_ngos_leaderboard(category: str = "reporting", limit: int = 20):
         db = get_firestore_client()
         
         if category == "reporting":
-            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "ngo")).stream()
+            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "ngo")).select(REPORT_LEADERBOARD_FIELDS).stream()
             ngo_stats = {}
             
             for report in reports:
@@ -232,7 +241,7 @@ async def get_ngos_leaderboard(category: str = "reporting", limit: int = 20):
             leaderboard = sorted(ngo_stats.values(), key=lambda x: x["points"], reverse=True)[:limit]
             
         elif category == "cleaning":
-            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "ngo")).stream()
+            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "ngo")).select(CLEANING_LEADERBOARD_FIELDS).stream()
             ngo_stats = {}
             
             for cleaning in cleanings:
@@ -254,7 +263,7 @@ async def get_ngos_leaderboard(category: str = "reporting", limit: int = 20):
             ngo_stats = {}
             
             # Add reporting points
-            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "ngo")).stream()
+            reports = db.collection("reports").where(filter=FieldFilter("userType", "==", "ngo")).select(REPORT_LEADERBOARD_FIELDS).stream()
             for report in reports:
                 data = report.to_dict()
                 ngo_id = data.get("userId")
@@ -266,7 +275,7 @@ async def get_ngos_leaderboard(category: str = "reporting", limit: int = 20):
                     ngo_stats[ngo_id]["points"] += 10
             
             # Add cleaning points
-            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "ngo")).stream()
+            cleanings = db.collection("cleanings").where(filter=FieldFilter("userType", "==", "ngo")).select(CLEANING_LEADERBOARD_FIELDS).stream()
             for cleaning in cleanings:
                 data = cleaning.to_dict()
                 ngo_id = data.get("userId")
@@ -288,71 +297,79 @@ async def get_ngos_leaderboard(category: str = "reporting", limit: int = 20):
 
 @router.get("/time-buckets")
 async def get_time_buckets():
-    """Counts of reports and cleanings for current week, month, and year.
-    Uses createdAt/cleanedAt when present, otherwise falls back to document create_time.
+    """Counts of reports, cleanings and water reports for the current week, month and year (UTC).
+
+    Summed from the daily rollups (services/rollups.py), so a year costs at
+    most 366 small reads whatever the collection sizes. Cleanings and water
+    reports are counted as they are written; reports, which the app writes
+    directly, only as of the last recount (ROLLUP_REBUILD_INTERVAL_MINUTES).
     """
     try:
-        db = get_firestore_client()
-
         now = datetime.now(timezone.utc)
-        week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        year_start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        def as_dt(val, fallback: datetime):
-            try:
-                if val is None:
-                    return fallback
-                if isinstance(val, datetime):
-                    return val if val.tzinfo else val.replace(tzinfo=timezone.utc)
-                if isinstance(val, (int, float)):
-                    # Support epoch millis
-                    return datetime.fromtimestamp(val / 1000.0, tz=timezone.utc)
-                if isinstance(val, str):
-                    try:
-                        dt = datetime.fromisoformat(val)
-                        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-                    except Exception:
-                        return fallback
-                return fallback
-            except Exception:
-                return fallback
+        today = now.date()
+        week_start = (today - timedelta(days=today.weekday())).isoformat()
+        month_start = today.replace(day=1).isoformat()
+        year_start = today.replace(month=1, day=1)
+        since = min(year_start, today - timedelta(days=today.weekday()))
 
-        def count_buckets(docs, get_time_field, fallback_time):
+        def count_buckets(collection):
             w = m = y = 0
-            for d in docs:
-                data = d.to_dict() or {}
-                t = get_time_field(data)
-                dt = as_dt(t, fallback_time(d))
-                if dt >= week_start:
-                    w += 1
-                if dt >= month_start:
-                    m += 1
-                if dt >= year_start:
-                    y += 1
-            return w, m, y
+            for day, rollup in get_rollups(collection, since, today).items():
+                total = rollup.get('total', 0)
+                if day >= week_start:
+                    w += total
+                if day >= month_start:
+                    m += total
+                if day >= year_start.isoformat():
+                    y += total
+            return {'week': w, 'month': m, 'year': y}
 
-        reports_docs = list(db.collection('reports').stream())
-        cleanings_docs = list(db.collection('cleanings').stream())
-
-        r_w, r_m, r_y = count_buckets(
-            reports_docs,
-            lambda x: x.get('createdAt'),
-            lambda d: (getattr(d, 'create_time', now))
-        )
+        return {collection: count_buckets(collection) for collection in ('reports', 'cleanings', 'waterReports')}
+    except Exception as e:
+        return {
+            'reports': { 'week': 0, 'month': 0, 'year': 0 },
+            'cleanings': { 'week': 0, 'month': 0, 'year': 0 },
+            'waterReports': { 'week': 0, 'month': 0, 'year': 0 }
+        }
 
-        c_w, c_m, c_y = count_buckets(
-            cleanings_docs,
-            lambda x: x.get('cleanedAt') or x.get('createdAt'),
-            lambda d: (getattr(d, 'create_time', now))
-        )
+@router.get("/timeseries")
+async def get_timeseries(metric: Literal["reports", "cleanings", "waterReports"] = "reports",
+                         granularity: Literal["day", "week", "month", "year"] = "day",
+                         start: Optional[date] = None, end: Optional[date] = None,
+                         wasteType: Optional[str] = None, contaminationType: Optional[str] = None,
+                         userType: Optional[str] = None):
+    """Counts of a collection per day, week (from Monday), month or year over a UTC date range.
 
+    Every bucket from start to end (default: the last 30 days) is returned,
+    zero when empty. Served from the daily rollups, so the cost depends on
+    the number of days, not of documents. Rollups count each field on its
+    own, so at most one of wasteType, contaminationType and userType can be
+    given. metric=reports is as fresh as the last recount
+    (ROLLUP_REBUILD_INTERVAL_MINUTES), since the app writes reports directly.
+    """
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days + 1 > MAX_TIMESERIES_DAYS:
+        raise HTTPException(status_code=400, detail=f"range is limited to {MAX_TIMESERIES_DAYS} days")
+    filters = {field: value for field, value in
+               (("wasteType", wasteType), ("contaminationType", contaminationType), ("userType", userType)) if value}
+    if len(filters) > 1:
+        raise HTTPException(status_code=400, detail="only one of wasteType, contaminationType and userType can be given")
+    dimension, value = next(iter(filters.items()), (None, None))
+    if dimension and dimension not in ROLLUP_SOURCES[metric][1]:
+        raise HTTPException(status_code=400, detail=f"{metric} cannot be filtered by {dimension}")
+    try:
+        buckets = timeseries(metric, granularity, start, end, dimension, value)
         return {
-            'reports': { 'week': r_w, 'month': r_m, 'year': r_y },
-            'cleanings': { 'week': c_w, 'month': c_m, 'year': c_y }
+            "metric": metric,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "filter": filters or None,
+            "total": sum(b["count"] for b in buckets),
+            "buckets": buckets
         }
     except Exception as e:
-        return {
-            'reports': { 'week': 0, 'month': 0, 'year': 0 },
-            'cleanings': { 'week': 0, 'month': 0, 'year': 0 }
-        }
+        raise HTTPException(status_code=400, detail=str(e))
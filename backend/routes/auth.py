@@ -3,11 +3,11 @@ from pydantic import BaseModel, EmailStr
 from typing import Literal, Optional
 from firebase_admin import auth, firestore
 from firebase_admin.auth import UserNotFoundError
+from services.firebase_service import ensure_firebase, get_firestore_client
 import requests
 import os
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
-db = firestore.client()
 
 # Firebase Web API Key
 FIREBASE_WEB_API_KEY = os.getenv("FIREBASE_WEB_API_KEY", "")
@@ -35,6 +35,8 @@ async def register(request: RegisterRequest):
         if request.userType == "ngo" and not request.ngoName:
             raise HTTPException(status_code=400, detail="NGO name is required for NGO registration")
 
+        ensure_firebase()
+
         # Prevent duplicate accounts on the same email
         try:
             existing = auth.get_user_by_email(request.email)
@@ -75,7 +77,7 @@ async def register(request: RegisterRequest):
             'createdAt': firestore.SERVER_TIMESTAMP
         }
         
-        db.collection('users').document(user_id).set(user_data)
+        get_firestore_client().collection('users').document(user_id).set(user_data)
         
         return {
             "message": "Registration successful",
@@ -112,7 +114,7 @@ async def login(request: LoginRequest):
         id_token = auth_data.get('idToken')
 
         # Get user profile from Firestore
-        user_doc = db.collection('users').document(user_id).get()
+        user_doc = get_firestore_client().collection('users').document(user_id).get()
         if not user_doc.exists:
             raise HTTPException(status_code=401, detail="Account not found")
         user_data = user_doc.to_dict() or {}
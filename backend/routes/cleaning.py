@@ -1,8 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from services.image_verification import verify_cleaning_image
 from services.cloudinary_service import upload_image_to_cloudinary, delete_image_from_cloudinary
-from services.firebase_service import get_document, update_document, add_document
+from services.firebase_service import get_firestore_client
+from google.cloud.firestore import transactional
+from services.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, paginate_query
+from services.location_service import ACTIVE_REPORT_FIELDS
+from services.distance import distances_from
+from services.live_mirror import ActiveReport, active_report_index, active_reports, freshness
+from services.rollups import record_rollup
+from bisect import bisect_right
 from datetime import datetime
 import logging
 
@@ -22,49 +28,113 @@ class CleaningRequest(BaseModel):
 async def verify_cleaning(request: CleaningRequest):
     """Verify if area is cleaned"""
     try:
+        # OpenCV/ONNX Runtime load on first use, not at app startup
+        from services.image_verification import verify_cleaning_image
         result = await verify_cleaning_image(request.beforeImageBase64, request.afterImageBase64)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+class ReportUnavailable(Exception):
+    """The report vanished or was cleaned by someone else before this commit"""
+
+@transactional
+def _commit_cleaning(transaction, report_ref, cleaning_ref, request: CleaningRequest) -> tuple:
+    """Read the report, check it is still open, and write the report update and
+    the cleaning record in one commit. Firestore retries the function if the
+    report changes underneath it, so only one cleaner can ever be credited.
+    Returns (report_before_update, points_awarded).
+    """
+    snapshot = report_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        raise ReportUnavailable("Report not found")
+    report = snapshot.to_dict() or {}
+    if report.get('status') == 'cleaned':
+        raise ReportUnavailable("Report has already been cleaned")
+
+    points_awarded = get_points_for_waste_type(report.get('wasteType'))
+    cleaned_at = datetime.now().isoformat()
+
+    # Update report as cleaned - remove location and images
+    transaction.update(report_ref, {
+        "status": "cleaned",
+        "cleanedBy": request.userId,
+        "cleanedByName": request.userName,
+        "cleanedAt": cleaned_at,
+        "latitude": None,
+        "longitude": None,
+        "imageUrl": None,
+        "imagePublicId": None,
+        "afterImageUrl": None,
+        "afterImagePublicId": None
+    })
+
+    # Record cleaning activity, counted in the day's rollup
+    cleaning = {
+        "reportId": request.reportId,
+        "userId": request.userId,
+        "userType": request.userType,
+        "userName": request.userName,
+        "wasteType": report.get('wasteType'),
+        "pointsAwarded": points_awarded,
+        "cleanedAt": cleaned_at
+    }
+    transaction.set(cleaning_ref, cleaning)
+    record_rollup(transaction, "cleanings", cleaning)
+    return report, points_awarded
+
+def _extract_public_id(report: dict):
+    """Cloudinary public_id of the report's before image, if it has one"""
+    image_public_id = report.get('imagePublicId')
+    
+    # If imagePublicId is None but imageUrl exists, extract public_id from URL
+    if not image_public_id and report.get('imageUrl'):
+        try:
+            # Extract public_id from Cloudinary URL
+            # Format: https://res.cloudinary.com/{cloud}/image/upload/v{version}/{folder}/{id}.{ext}
+            url = report.get('imageUrl')
+            if 'cloudinary.com' in url and '/upload/' in url:
+                # Get everything after /upload/v{version}/
+                parts = url.split('/upload/')
+                if len(parts) > 1:
+                    # Remove version (v123456/) and get path
+                    path_parts = parts[1].split('/', 1)
+                    if len(path_parts) > 1:
+                        # Get public_id without extension
+                        public_id_with_ext = path_parts[1]
+                        # Remove file extension
+                        image_public_id = public_id_with_ext.rsplit('.', 1)[0]
+                        logger.info(f"📝 Extracted public_id from URL: {image_public_id}")
+        except Exception as e:
+            logger.error(f"❌ Could not extract public_id from URL: {str(e)}")
+    return image_public_id
+
 @router.post("/mark-cleaned")
 async def mark_cleaned(request: CleaningRequest):
     """Mark report as cleaned"""
     try:
+        from services.image_verification import verify_cleaning_image
+
         # Verify cleaning first
         verification = await verify_cleaning_image(request.beforeImageBase64, request.afterImageBase64)
         if not verification['is_cleaned']:
             return {"success": False, "message": verification['message']}
         
-        # Get report details
-        report = get_document("reports", request.reportId)
-        if not report:
-            return {"success": False, "message": "Report not found"}
-        
-        # Delete before image from Cloudinary if it exists
-        image_public_id = report.get('imagePublicId')
-        
-        # If imagePublicId is None but imageUrl exists, extract public_id from URL
-        if not image_public_id and report.get('imageUrl'):
-            try:
-                # Extract public_id from Cloudinary URL
-                # Format: https://res.cloudinary.com/{cloud}/image/upload/v{version}/{folder}/{id}.{ext}
-                url = report.get('imageUrl')
-                if 'cloudinary.com' in url and '/upload/' in url:
-                    # Get everything after /upload/v{version}/
-                    parts = url.split('/upload/')
-                    if len(parts) > 1:
-                        # Remove version (v123456/) and get path
-                        path_parts = parts[1].split('/', 1)
-                        if len(path_parts) > 1:
-                            # Get public_id without extension
-                            public_id_with_ext = path_parts[1]
-                            # Remove file extension
-                            image_public_id = public_id_with_ext.rsplit('.', 1)[0]
-                            logger.info(f"📝 Extracted public_id from URL: {image_public_id}")
-            except Exception as e:
-                logger.error(f"❌ Could not extract public_id from URL: {str(e)}")
+        # Status check, report update and cleaning record commit atomically
+        db = get_firestore_client()
+        try:
+            report, points_awarded = _commit_cleaning(
+                db.transaction(),
+                db.collection("reports").document(request.reportId),
+                db.collection("cleanings").document(),
+                request
+            )
+        except ReportUnavailable as e:
+            return {"success": False, "message": str(e)}
+        active_reports.apply_local_write(request.reportId, None)
         
+        # Delete before image from Cloudinary once the report no longer references it
+        image_public_id = _extract_public_id(report)
         if image_public_id:
             try:
                 logger.info(f"🗑️  Deleting before image from Cloudinary: {image_public_id}")
@@ -73,43 +143,6 @@ async def mark_cleaned(request: CleaningRequest):
             except Exception as e:
                 logger.error(f"❌ Could not delete before image: {str(e)}")
         
-        # Calculate points based on waste type
-        points_map = {
-            "plastic": 10,
-            "organic": 20,
-            "mixed": 30,
-            "toxic": 50,
-            "sewage": 100
-        }
-        points_awarded = points_map.get(report.get('wasteType'), 10)
-        
-        # Update report as cleaned - remove location and images
-        update_data = {
-            "status": "cleaned",
-            "cleanedBy": request.userId,
-            "cleanedByName": request.userName,
-            "cleanedAt": datetime.now().isoformat(),
-            "latitude": None,
-            "longitude": None,
-            "imageUrl": None,
-            "imagePublicId": None,
-            "afterImageUrl": None,
-            "afterImagePublicId": None
-        }
-        update_document("reports", request.reportId, update_data)
-        
-        # Record cleaning activity
-        cleaning_record = {
-            "reportId": request.reportId,
-            "userId": request.userId,
-            "userType": request.userType,
-            "userName": request.userName,
-            "wasteType": report.get('wasteType'),
-            "pointsAwarded": points_awarded,
-            "cleanedAt": datetime.now().isoformat()
-        }
-        add_document("cleanings", cleaning_record)
-        
         return {
             "success": True,
             "message": "Area marked as cleaned!",
@@ -118,67 +151,101 @@ async def mark_cleaned(request: CleaningRequest):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def _available_reports(wasteType: str | None, limit: int | None, start_after: str | None,
+                       near: tuple | None = None) -> tuple:
+    """Active reports for /available as (records, next_cursor, mirror or None).
+
+    Served from the in-memory mirror when it is ready; cursors are the same
+    document-id tokens either way, so clients can page across both paths.
+    near is an optional (lat, lon, radius_m); the mirror path answers it from
+    the grid index, the Firestore path leaves it to the caller.
+    """
+    if active_reports.ready:
+        if near:
+            records = [record for _, _, record in active_report_index.within(*near)]
+        else:
+            records = active_reports.records()
+        records = sorted(records, key=lambda r: r.id)
+        if wasteType:
+            records = [r for r in records if r.waste_type == wasteType]
+        next_cursor = None
+        if limit is not None:
+            if start_after:
+                last_id = decode_cursor(start_after)[-1]
+                records = records[bisect_right([r.id for r in records], last_id):]
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            if len(records) > limit:
+                next_cursor = encode_cursor([records[limit - 1].id])
+            records = records[:limit]
+        return records, next_cursor, active_reports
+
+    from google.cloud.firestore import FieldFilter
+
+    db = get_firestore_client()
+
+    # Query active reports (status = "active") using filter keyword argument
+    query = db.collection("reports").where(filter=FieldFilter("status", "==", "active"))
+    if wasteType:
+        query = query.where(filter=FieldFilter("wasteType", "==", wasteType))
+    query = query.select(ACTIVE_REPORT_FIELDS)
+
+    next_cursor = None
+    if limit is not None:
+        docs, next_cursor = paginate_query(query, limit, start_after)
+    else:
+        docs = query.stream()
+    records = [ActiveReport.from_dict(doc.id, doc.to_dict() or {}) for doc in docs]
+    return records, next_cursor, None
+
 @router.get("/available")
-async def get_available_cleanings(wasteType: str = None, userType: str = None, userLat: float | None = None, userLon: float | None = None):
-    """Get available cleanings to participate in"""
+async def get_available_cleanings(wasteType: str = None, userType: str = None, userLat: float | None = None, userLon: float | None = None,
+                                  radiusKm: float | None = None, limit: int | None = None, start_after: str | None = None):
+    """Get available cleanings to participate in.
+
+    With userLat/userLon and radiusKm, only reports within radiusKm are returned.
+
+    With a limit, reports are scanned one cursor page at a time and the token
+    for the next page is returned as nextCursor. A page can hold fewer than
+    limit cleanings because the remaining filters run after the read.
+    """
+    if start_after:
+        try:
+            decode_cursor(start_after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        from services.firebase_service import get_firestore_client
-        from google.cloud.firestore import FieldFilter
-        
-        db = get_firestore_client()
+        has_location = userLat is not None and userLon is not None
+        near = (userLat, userLon, radiusKm * 1000) if has_location and radiusKm is not None else None
+        reports, next_cursor, mirror = _available_reports(wasteType, limit, start_after, near)
         
-        # Query active reports (status = "active") using filter keyword argument
-        query = db.collection("reports").where(filter=FieldFilter("status", "==", "active"))
-        reports = query.stream()
+        # Skip reports missing essential fields (likely soft-deleted or incomplete)
+        reports = [r for r in reports if r.image_url and r.latitude is not None and r.longitude is not None]
+        # Individuals shouldn't see sewage
+        if userType == "individual":
+            reports = [r for r in reports if r.waste_type != "sewage"]
+
+        # Distances from userLat/userLon for the whole page in one vectorized pass
+        distances_km = [0] * len(reports)
+        if has_location and reports:
+            distances_km = distances_from(userLat, userLon, [r.latitude for r in reports],
+                                          [r.longitude for r in reports]) / 1000
         
         cleanings = []
-        for report in reports:
-            report_data = report.to_dict()
-            
-            # Filter by waste type if specified
-            if wasteType and report_data.get("wasteType") != wasteType:
-                continue
-            
-            # Individuals shouldn't see sewage
-            if userType == "individual" and report_data.get("wasteType") == "sewage":
-                continue
-            
-            # Skip if report is missing essential fields (likely soft-deleted or incomplete)
-            if not report_data.get("imageUrl"):
-                continue
-            if report_data.get("latitude") is None or report_data.get("longitude") is None:
+        for report, distance_km in zip(reports, distances_km):
+            if near and distance_km > radiusKm:
                 continue
-            
-            # Add to cleanings list with calculated distance (uses userLat/userLon if provided)
-            def haversine(lat1, lon1, lat2, lon2):
-                from math import radians, sin, cos, sqrt, atan2
-                R = 6371.0  # Earth radius in km
-                dlat = radians(lat2 - lat1)
-                dlon = radians(lon2 - lon1)
-                a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-                c = 2 * atan2(sqrt(a), sqrt(1 - a))
-                return R * c
-
-            report_lat = report_data.get("latitude", 0)
-            report_lon = report_data.get("longitude", 0)
-            distance_km = 0
-            if userLat is not None and userLon is not None:
-                try:
-                    distance_km = haversine(float(userLat), float(userLon), float(report_lat), float(report_lon))
-                except Exception:
-                    distance_km = 0
             cleaning = {
                 "id": report.id,
-                "imageUrl": report_data.get("imageUrl", ""),
-                "wasteType": report_data.get("wasteType", "unknown"),
-                "latitude": report_lat,
-                "longitude": report_lon,
-                "distanceKm": round(distance_km, 2),
-                "points": get_points_for_waste_type(report_data.get("wasteType", ""))
+                "imageUrl": report.image_url,
+                "wasteType": report.waste_type or "unknown",
+                "latitude": report.latitude,
+                "longitude": report.longitude,
+                "distanceKm": round(float(distance_km), 2),
+                "points": get_points_for_waste_type(report.waste_type or "")
             }
             cleanings.append(cleaning)
         
-        return {"success": True, "cleanings": cleanings}
+        return {"success": True, "cleanings": cleanings, "nextCursor": next_cursor, "asOf": freshness(mirror)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
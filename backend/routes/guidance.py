@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from services.firebase_service import query_documents
+from services.reference_cache import get_reference_collection
 
 router = APIRouter(prefix="/guidance", tags=["guidance"])
 
@@ -7,15 +7,15 @@ router = APIRouter(prefix="/guidance", tags=["guidance"])
 async def get_guidance(contaminationType: str = None, language: str = "en"):
     """Get treatment guidance based on contamination type"""
     try:
-        from services.firebase_service import get_firestore_client
-        db = get_firestore_client()
-        query = db.collection("treatmentGuidance").where("language", "==", language)
-        
-        if contaminationType:
-            query = query.where("contaminationType", "==", contaminationType)
-            
-        docs = query.stream()
-        guidance = [doc.to_dict() for doc in docs]
+        guidance = []
+        for doc in get_reference_collection("treatmentGuidance"):
+            if doc.get("language") != language:
+                continue
+            if contaminationType and doc.get("contaminationType") != contaminationType:
+                continue
+            # Guidance responses have never included document ids
+            doc.pop("id", None)
+            guidance.append(doc)
         return {"success": True, "guidance": guidance}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
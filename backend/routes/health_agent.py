@@ -1,70 +1,110 @@
 from fastapi import APIRouter, HTTPException
 from services.firebase_service import get_firestore_client, update_document
 from google.cloud.firestore import FieldFilter
+from services.pagination import decode_cursor, paginate_query, snapshot_with_id
+from services.reference_cache import get_reference_collection
+from services.hotspots import get_hotspots
+from services.alert_engine import alert_live
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter(prefix="/health-agent", tags=["health-agent"])
 
+def _report_summary(reports) -> dict:
+    """Totals and contamination breakdown for the dashboard.
+
+    The breakdown is keyed by the stored contaminationType, with reports that
+    have none under 'other', matching how it has always been presented.
+    """
+    total = pending = 0
+    breakdown = {}
+    for report in reports:
+        total += 1
+        if not report.get('verified', False):
+            pending += 1
+        ctype = report.get('contaminationType', 'other')
+        breakdown[ctype] = breakdown.get(ctype, 0) + 1
+    return {"total": total, "pending": pending, "breakdown": breakdown}
+
 @router.get("/dashboard")
-async def get_health_agent_dashboard():
-    """Get all data needed for the health agent dashboard overview"""
+async def get_health_agent_dashboard(limit: Optional[int] = None, start_after: Optional[str] = None):
+    """Get all data needed for the health agent dashboard overview.
+
+    Pass limit (and the returned nextCursor as start_after) to page through
+    reports newest first; without a limit every report is returned.
+    """
+    if start_after:
+        try:
+            decode_cursor(start_after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
         db = get_firestore_client()
         
         # 1. Fetch Reports
-        reports_docs = db.collection("waterReports").order_by("reportedAt", direction="DESCENDING").stream()
-        reports = []
-        pending_count = 0
-        for doc in reports_docs:
-            d = doc.to_dict()
-            d['id'] = doc.id
-            if not d.get('verified', False):
-                pending_count += 1
-            reports.append(d)
+        reports_query = db.collection("waterReports")
+        next_cursor = None
+        if limit is not None:
+            reports_docs, next_cursor = paginate_query(
+                reports_query, limit, start_after, order_by=[("reportedAt", "DESCENDING")]
+            )
+        else:
+            reports_docs = reports_query.order_by("reportedAt", direction="DESCENDING").stream()
+        reports = [snapshot_with_id(doc) for doc in reports_docs]
+        if limit is None:
+            summary = _report_summary(reports)
+        else:
+            # A page only holds some reports: summarize all of them from the two fields read
+            summary = _report_summary(doc.to_dict() or {} for doc in
+                                      reports_query.select(["contaminationType", "verified"]).stream())
 
         # 2. Fetch Alerts
         alerts_docs = db.collection("alerts").where(filter=FieldFilter("status", "==", "active")).stream()
         active_alerts = []
         total_affected = 0
+        now = datetime.now().isoformat()
         for doc in alerts_docs:
             d = doc.to_dict()
+            if not alert_live(d, now):
+                continue
             d['id'] = doc.id
             total_affected += len(d.get('affectedUsers', []))
             active_alerts.append(d)
 
-        # 3. Analytics Data
-        # Contamination Breakdown
-        contamination_stats = {}
-        for r in reports:
-            ctype = r.get('contaminationType', 'other')
-            contamination_stats[ctype] = contamination_stats.get(ctype, 0) + 1
-            
-        # 4. Fetch Labs and Safe Sources
-        labs_docs = db.collection("testingLabs").stream()
-        labs = [{"id": l.id, **l.to_dict()} for l in labs_docs]
-        
-        sources_docs = db.collection("safeSources").stream()
-        sources = [{"id": s.id, **s.to_dict()} for s in sources_docs]
+        # 3. Fetch Labs and Safe Sources
+        labs = get_reference_collection("testingLabs")
+        sources = get_reference_collection("safeSources")
 
         return {
             "success": True,
             "summary": {
                 "activeAlerts": len(active_alerts),
-                "pendingVerification": pending_count,
+                "pendingVerification": summary["pending"],
                 "totalAffected": total_affected,
-                "totalReports": len(reports)
+                "totalReports": summary["total"]
             },
             "reports": reports,
+            "nextCursor": next_cursor,
             "alerts": active_alerts,
             "labs": labs,
             "sources": sources,
             "analytics": {
-                "contaminationBreakdown": contamination_stats
+                "contaminationBreakdown": summary["breakdown"]
             }
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.get("/hotspots")
+async def get_contamination_hotspots(contaminationType: Optional[str] = None, windowDays: Optional[int] = None):
+    """Persistent contamination hotspots from the last hotspot job, largest first"""
+    try:
+        hotspots = get_hotspots(contaminationType, windowDays)
+        computed_at = max((h.get("computedAt") or "" for h in hotspots), default=None)
+        return {"success": True, "hotspots": hotspots, "computedAt": computed_at}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/verify-report/{report_id}")
 async def verify_report(report_id: str, verified: bool):
     try:
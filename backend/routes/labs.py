@@ -1,6 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from services.firebase_service import get_firestore_client
-from google.cloud.firestore import FieldFilter
+from services.reference_cache import get_reference_collection
 
 router = APIRouter(prefix="/labs", tags=["labs"])
 
@@ -8,12 +7,8 @@ router = APIRouter(prefix="/labs", tags=["labs"])
 async def get_labs():
     """Get all testing labs"""
     try:
-        db = get_firestore_client()
-        docs = db.collection("testingLabs").stream()
         labs = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
+        for data in get_reference_collection("testingLabs"):
             # Flatten GeoPoint for JSON response
             if 'location' in data:
                 data['latitude'] = data['location'].latitude
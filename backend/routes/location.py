@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from services.location_service import check_duplicate_location
+from typing import Literal
+from bisect import bisect_right
+from services.location_service import check_duplicate_location, find_nearby_reports
+from services.live_mirror import freshness
+from services.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/location", tags=["location"])
 
@@ -19,11 +23,44 @@ async def check_duplicate(request: CheckDuplicateRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/nearby-reports")
-async def get_nearby_reports(latitude: float, longitude: float, radius: int = 100):
-    """Get all reports within radius (in meters)"""
+async def get_nearby_reports(latitude: float, longitude: float, radius: int = 100, k: int | None = None,
+                             kind: Literal["waste", "water"] | None = None, wasteType: str | None = None,
+                             contaminationType: str | None = None, limit: int | None = None,
+                             start_after: str | None = None):
+    """Get open reports near a point, nearest first.
+
+    Radius mode returns every report within radius (meters); with k the k
+    nearest reports within radius are returned instead. kind picks waste
+    reports (default) or water reports (default when contaminationType is
+    given). With a limit, results are paged and nextCursor continues after
+    the last one.
+    """
+    if k is not None and not 1 <= k <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"k must be between 1 and {MAX_PAGE_SIZE}")
+    after = None
+    if start_after:
+        try:
+            after = tuple(decode_cursor(start_after))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        # Query Firebase for nearby reports
-        return {"reports": []}
+        kind = kind or ("water" if contaminationType else "waste")
+        reports, mirror = find_nearby_reports(latitude, longitude, radius, k, kind, wasteType, contaminationType)
+
+        if after is not None:
+            keys = [(report["distance"], report["id"]) for report in reports]
+            reports = reports[bisect_right(keys, after):]
+        next_cursor = None
+        if limit is not None:
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+            if len(reports) > limit:
+                last = reports[limit - 1]
+                next_cursor = encode_cursor([last["distance"], last["id"]])
+            reports = reports[:limit]
+
+        for report in reports:
+            report["distance"] = round(report["distance"], 2)
+        return {"reports": reports, "nextCursor": next_cursor, "asOf": freshness(mirror)}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -2,8 +2,9 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Literal, Optional
 from services.cloudinary_service import upload_image_to_cloudinary
-from services.firebase_service import add_document, get_document, get_firestore_client
-from services.alert_engine import check_and_trigger_alerts
+from services.firebase_service import get_document, get_firestore_client, stream_documents
+from services.pagination import MAX_PAGE_SIZE
+from services.alert_queue import get_alert_status, submit_report
 from datetime import datetime
 from google.cloud.firestore import GeoPoint
 
@@ -86,33 +87,31 @@ async def create_report(request: ReportRequest):
             "testResults": None
         }
         
-        # Add to Firestore
-        report_id = add_document("waterReports", report_data)
-        
-        # Trigger alert engine
-        alert_id = await check_and_trigger_alerts(report_data)
+        # Commit the report with its alert queue entry; the alert worker evaluates the rules
+        report_id = submit_report(report_data)
         
         return {
             "success": True,
             "message": "Report submitted successfully",
             "reportId": report_id,
-            "alertTriggered": bool(alert_id),
-            "alertId": alert_id
+            "alertStatus": "pending"
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/reports")
 async def get_reports(contaminationType: str = None, limit: int = 20):
-    """Get all reports according to new schema"""
+    """Get the newest reports, optionally for one contamination type"""
     try:
-        from services.firebase_service import query_documents
-        if contaminationType:
-            reports = query_documents("waterReports", "contaminationType", "==", contaminationType)
-        else:
-            reports = [] # needs better query
+        filters = [("contaminationType", "==", contaminationType)] if contaminationType else []
+        reports = list(stream_documents(
+            "waterReports",
+            filters=filters,
+            order_by=[("reportedAt", "DESCENDING")],
+            limit=max(1, min(limit, MAX_PAGE_SIZE))
+        ))
         
-        return {"success": True, "reports": reports[:limit]}
+        return {"success": True, "reports": reports}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -127,3 +126,14 @@ async def get_report(reportId: str):
         return {"success": True, "report": report}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/reports/{reportId}/alert-status")
+async def get_report_alert_status(reportId: str):
+    """Whether the alert worker has evaluated a report yet, and the alert it triggered"""
+    try:
+        status = get_alert_status(reportId)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if status is None:
+        raise HTTPException(status_code=404, detail="No alert evaluation queued for this report")
+    return {"success": True, **status}
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from services.firebase_service import get_firestore_client
+from services.reference_cache import get_reference_collection
 
 router = APIRouter(prefix="/safe-sources", tags=["safe-sources"])
 
@@ -7,12 +7,8 @@ router = APIRouter(prefix="/safe-sources", tags=["safe-sources"])
 async def get_safe_sources():
     """Get all verified safe water sources"""
     try:
-        db = get_firestore_client()
-        docs = db.collection("safeSources").stream()
         sources = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
+        for data in get_reference_collection("safeSources"):
             if 'location' in data:
                 data['latitude'] = data['location'].latitude
                 data['longitude'] = data['location'].longitude
@@ -1,14 +1,16 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import Optional
-from services.firebase_service import add_document, get_firestore_client
-from services.alert_engine import check_and_trigger_alerts
-from services.utils import haversine_distance
+from services.alert_queue import submit_report
+from services.facility_lookup import nearest_lab, nearest_safe_source
+from services.gazetteer import GEOCODE_MIN_CONFIDENCE, geocode
 from datetime import datetime
-from google.cloud.firestore import GeoPoint, FieldFilter
+from google.cloud.firestore import GeoPoint
 
 router = APIRouter(prefix="/sms", tags=["sms"])
 
+MAJULI_CENTER = (26.9363, 94.1205)
+
 class SMSRequest(BaseModel):
     phone: str
     message: str
@@ -32,16 +34,16 @@ async def simulate_sms(request: SMSRequest):
     # Simple mapping
     c_type = c_type.lower()
     source = source.lower()
+    village_query = village
     village = village.capitalize()
 
-    # Mock coordinates for Majuli demo based on village
-    coords = {
-        "Kamalabari": (26.9550, 94.2200),
-        "Garamur": (26.9612, 94.2289),
-        "Auniati": (26.9320, 94.1980),
-        "Majuli": (26.9363, 94.1205)
-    }
-    lat, lon = coords.get(village, (26.9363, 94.1205))
+    # Resolve the village offline; unknown or doubtful names fall back to the Majuli centre
+    place = geocode(village_query)
+    if place and place["confidence"] >= GEOCODE_MIN_CONFIDENCE:
+        lat, lon = place["latitude"], place["longitude"]
+        village = place["name"]
+    else:
+        lat, lon = MAJULI_CENTER
 
     try:
         # Create report
@@ -57,36 +59,40 @@ async def simulate_sms(request: SMSRequest):
             "userName": f"SMS User ({request.phone[-4:]})",
             "status": "pending",
             "location": GeoPoint(lat, lon),
-            "verified": False
+            "verified": False,
+            "geocode": {
+                "query": village_query.lower(),
+                "match": place["name"] if place else None,
+                "confidence": place["confidence"] if place else 0.0,
+            },
         }
         
-        report_id = add_document("waterReports", report_data)
-        
-        # Check alerts
-        alert_id = await check_and_trigger_alerts(report_data)
-        
-        # Fetch nearest lab for outgoing SMS mock
-        db = get_firestore_client()
-        labs = db.collection("testingLabs").stream()
-        nearest_lab = "Majuli District Lab"
-        lab_phone = "+91-3775-274001"
+        # The alert worker evaluates the rules after the reply is sent
+        report_id = submit_report(report_data)
         
-        # Fetch nearest safe source
-        sources = db.collection("safeSources").stream()
-        nearest_source = "Deep Tubewell"
+        # Nearest lab offering the test and nearest verified source, from the cached facility indexes
+        contamination = report_data["contaminationType"]
+        lab = nearest_lab(lat, lon, None if contamination == "other" else contamination)
+        source = nearest_safe_source(lat, lon, contamination)
         
         reply = (
             f"⚠️ LUIT CONFIRMATION\n"
             f"Report {report_id} received for {village}.\n"
-            f"Recommended Action: Boil water before use.\n"
-            f"Nearest Lab: {nearest_lab} ({lab_phone})"
+            f"Recommended Action: Boil water before use."
         )
+        if lab:
+            lab_phone = (lab.get("contact") or {}).get("phone")
+            reply += f"\nNearest Lab: {lab.get('name')}" + (f" ({lab_phone})" if lab_phone else "")
+            if not lab["open"] and lab.get("operatingHours"):
+                reply += f", open {lab['operatingHours']}"
+        if source:
+            reply += f"\nSafe Water: {source.get('name')} ({source['distance'] / 1000:.1f} km)"
         
         return {
             "success": True,
             "reportId": report_id,
             "reply": reply,
-            "alertTriggered": bool(alert_id)
+            "alertStatus": "pending"
         }
         
     except Exception as e:
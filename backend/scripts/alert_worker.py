@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Run the alert worker on its own: evaluate the alert rules for queued water reports.
+
+The API process runs the same worker on a thread unless ALERT_WORKER=0; use
+this to run it as a separate service instead (e.g. a Railway worker), or
+with --once to drain the queue and exit. Several workers may run at once:
+entries are claimed in transactions.
+
+Usage (from backend/): python scripts/alert_worker.py [--once] [--poll-seconds 2]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.alert_engine  # noqa: F401 -- registers the mirrors the rules read, so start_mirrors() covers them
+from services.alert_queue import ALERT_QUEUE_POLL_SECONDS, drain, queue_stats, run_worker
+from services.live_mirror import start_mirrors, stop_mirrors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    parser.add_argument("--poll-seconds", type=float, default=ALERT_QUEUE_POLL_SECONDS)
+    args = parser.parse_args()
+
+    if args.once:
+        print(f"🚦 Draining the alert queue ({queue_stats()['depth']})...")
+        print(f"✅ Completed {drain()} entries")
+        return
+
+    start_mirrors()
+    try:
+        run_worker(args.poll_seconds)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_mirrors()
+
+if __name__ == "__main__":
+    main()
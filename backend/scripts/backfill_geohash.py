@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Backfill the geohash field on reports, water reports and alerts.
+
+Documents written before geohashes were stored (or imported from elsewhere)
+are invisible to the geohash prefix-range queries until this has run. Only
+documents whose stored geohash is missing or stale are updated, so it is
+safe to re-run.
+
+Usage (from backend/): python scripts/backfill_geohash.py [--dry-run] [collection ...]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.bulk_mutations import bulk_update_documents
+from services.firebase_service import get_firestore_client
+from services.geohash import GEOHASH_FIELD, encode
+
+COLLECTIONS = ["reports", "waterReports", "alerts", "alertSubscriptions"]
+
+def pending_updates(db, collection: str, stats: dict):
+    """Yield (reference, {geohash}) for documents that need a new geohash"""
+    docs = db.collection(collection).select(["latitude", "longitude", GEOHASH_FIELD]).stream()
+    for doc in docs:
+        stats["scanned"] += 1
+        data = doc.to_dict() or {}
+        latitude = data.get("latitude")
+        longitude = data.get("longitude")
+        if latitude is None or longitude is None:
+            stats["skipped"] += 1
+            continue
+        geohash = encode(latitude, longitude)
+        if data.get(GEOHASH_FIELD) != geohash:
+            yield doc.reference, {GEOHASH_FIELD: geohash}
+
+def backfill(collection: str, dry_run: bool = False) -> dict:
+    db = get_firestore_client()
+    stats = {"scanned": 0, "skipped": 0}
+    updates = pending_updates(db, collection, stats)
+    if dry_run:
+        result = {"written": sum(1 for _ in updates), "failed": 0, "seconds": 0}
+    else:
+        result = bulk_update_documents(updates, f"backfill {collection} geohash", db=db,
+                                       on_progress=lambda done: print(f"   ... {done} updated"))
+    return {**stats, **result}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collections", nargs="*", default=COLLECTIONS, help="collections to backfill")
+    parser.add_argument("--dry-run", action="store_true", help="count documents that need updating without writing")
+    args = parser.parse_args()
+
+    for collection in args.collections:
+        print(f"🧭 Backfilling {collection}...")
+        result = backfill(collection, args.dry_run)
+        verb = "would update" if args.dry_run else "updated"
+        print(f"✅ {collection}: scanned {result['scanned']}, {verb} {result['written']}, "
+              f"skipped {result['skipped']} without coordinates, {result['failed']} failed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Backfill the daily analytics rollups (dailyRollups) from reports, cleanings
+and water reports.
+
+New cleanings and water reports are counted as they are written, and the
+API recounts reports every ROLLUP_REBUILD_INTERVAL_MINUTES (services/rollups.py);
+this recounts everything written before that, or repairs drift. Each day's
+rollup is overwritten and days left without documents are deleted, so it
+is safe to re-run, ideally while writes are quiet.
+
+Usage (from backend/): python scripts/backfill_rollups.py [--dry-run] [collection ...]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rollups import ROLLUP_SOURCES, rebuild_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("collections", nargs="*", default=list(ROLLUP_SOURCES),
+                        help=f"collections to recount (default: {' '.join(ROLLUP_SOURCES)})")
+    parser.add_argument("--dry-run", action="store_true", help="count without writing")
+    args = parser.parse_args()
+    unknown = set(args.collections) - set(ROLLUP_SOURCES)
+    if unknown:
+        parser.error(f"no rollups for {', '.join(sorted(unknown))}")
+
+    for collection in args.collections:
+        print(f"📊 Recounting {collection}...")
+        result = rebuild_rollups([collection], dry_run=args.dry_run)[collection]
+        write, remove = ("would write", "would remove") if args.dry_run else ("wrote", "removed")
+        print(f"✅ {collection}: {result['documents']} documents over {result['days']} days, {write} "
+              f"{result['days']} rollups, {remove} {result['stale']} stale ({result['seconds']}s)")
+
+if __name__ == "__main__":
+    main()
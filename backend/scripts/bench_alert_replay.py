@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark for alert rule replay (services/alert_replay.py).
+
+A year of synthetic water reports over Assam (hotspots on top of uniform
+noise, some critical, some arsenic) is generated. On a smaller slice the
+replay is first checked against the live code path: every report inserted
+into a ClusterWindow and counted when it arrives, with duplicates found by
+comparing keys with, and measuring against, every live alert dict, which
+expires and is extended through the AlertRules methods the engine calls. Both must raise the same alerts, from
+the same reports and rules, for several rule sets. The full year is then
+swept over a grid of cluster thresholds, radii and windows.
+
+Usage (from backend/): python scripts/bench_alert_replay.py [--reports 500000] [--thresholds 2 3 4 5] [--radii 2000 5000 10000] [--windows 12 24 48]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_replay import ReplayReports, cluster_counts, replay
+from services.alert_rules import AlertRules, rule_grid
+from services.cluster_window import ClusterWindow
+from services.distance import haversine_distance
+
+ASSAM_BOUNDS = (24.1, 28.0, 89.7, 96.1)  # min_lat, max_lat, min_lon, max_lon
+TYPES = ("arsenic", "fluoride", "bacteria", "turbidity", "other")
+TOWNS = [(26.95, 94.2), (26.18, 91.75), (27.48, 94.91), (26.75, 94.2), (27.1, 93.6)]
+
+def synthetic_year(rng: random.Random, n: int, start: datetime):
+    min_lat, max_lat, min_lon, max_lon = ASSAM_BOUNDS
+    reports = []
+    for i in range(n):
+        if i % 2:
+            lat, lon = rng.choice(TOWNS)
+            lat, lon = lat + rng.gauss(0, 0.05), lon + rng.gauss(0, 0.05)
+        else:
+            lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+        severity = "critical" if rng.random() < 0.02 else rng.choice(["unsafe", "moderate"])
+        contamination_type = "arsenic" if rng.random() < 0.05 else rng.choice(TYPES[1:])
+        reported_at = start + timedelta(seconds=rng.uniform(0, 365 * 86400))
+        reports.append({"id": f"w{i:07d}", "contaminationType": contamination_type, "severityLevel": severity,
+                        "reportedAt": reported_at.isoformat(), "latitude": lat, "longitude": lon})
+    return reports
+
+def live_replay(reports, rules: AlertRules):
+    """(reportId, triggeredBy) of each alert, evaluating reports one at a time as the live engine does"""
+    ordered = sorted(reports, key=lambda r: (datetime.fromisoformat(r["reportedAt"]), r["id"]))
+    window = ClusterWindow(rules.window_hours, rules.cluster_radius)
+    active = []
+    fired_alerts = []
+    for r in ordered:
+        now = datetime.fromisoformat(r["reportedAt"])
+        window.insert(r["id"], r["contaminationType"], r["reportedAt"], r["latitude"], r["longitude"])
+        fired = rules.immediate(r["severityLevel"], r["contaminationType"]) \
+            or rules.cluster(window.count(r["contaminationType"], r["latitude"], r["longitude"], now))
+        if not fired:
+            continue
+        live = [a for a in active if a["contaminationType"] == r["contaminationType"]
+                and a["expiresAt"] > now.isoformat()]
+        key = rules.keys.key(r["contaminationType"], r["latitude"], r["longitude"])
+        match = next((a for a in live if a["key"] == key), None) or next(
+            (a for a in live if haversine_distance(a["latitude"], a["longitude"], r["latitude"], r["longitude"])
+             <= a["affectedArea"]["radius"]), None)
+        if match is not None:
+            match["expiresAt"] = rules.extended_expiry(match, now) or match["expiresAt"]
+            continue
+        active.append({"key": key, "triggerType": "automatic", "contaminationType": r["contaminationType"],
+                       "latitude": r["latitude"], "longitude": r["longitude"],
+                       "affectedArea": {"radius": fired[1]}, "expiresAt": rules.expires_at(fired[0], now)})
+        fired_alerts.append((r["id"], fired[0]))
+    return fired_alerts
+
+def check_parity(reports):
+    prepared = ReplayReports(reports)
+    rule_sets = [AlertRules(), AlertRules(2, 2000, 12, extend_hours=0),
+                 AlertRules(5, 10000, 48, type_radius={}, ttl_hours={"cluster": 12, "severity": 24})]
+    for rules, result in zip(rule_sets, replay(prepared, rule_sets)):
+        expected = live_replay(reports, rules)
+        assert [(a["reportId"], a["triggeredBy"]) for a in result["alerts"]] == expected, rules.label()
+        print(f"✅ {rules.label():<20} {len(expected):>6} alerts from {len(reports):,} reports - matches the live rules")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=500000, help="reports over the year")
+    parser.add_argument("--parity-reports", type=int, default=20000)
+    parser.add_argument("--thresholds", type=int, nargs="+", default=[2, 3, 4, 5])
+    parser.add_argument("--radii", type=float, nargs="+", default=[2000, 5000, 10000])
+    parser.add_argument("--windows", type=float, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--seed", type=int, default=45)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    start = datetime(2025, 1, 1)
+
+    check_parity(synthetic_year(rng, args.parity_reports, start))
+
+    reports = synthetic_year(rng, args.reports, start)
+    started = time.perf_counter()
+    prepared = ReplayReports(reports)
+    prepare_s = time.perf_counter() - started
+
+    # The live path, for scale: one ClusterWindow insert and count per report
+    sample = prepared.ids[:20000]
+    by_id = {r["id"]: r for r in reports}
+    window = ClusterWindow(24, 5000)
+    started = time.perf_counter()
+    for report_id in sample:
+        r = by_id[report_id]
+        window.insert(report_id, r["contaminationType"], r["reportedAt"], r["latitude"], r["longitude"])
+        window.count(r["contaminationType"], r["latitude"], r["longitude"], datetime.fromisoformat(r["reportedAt"]))
+    live_s = (time.perf_counter() - started) / len(sample) * len(prepared)
+
+    started = time.perf_counter()
+    cluster_counts(prepared, 5000, 24)
+    count_s = time.perf_counter() - started
+
+    rule_sets = rule_grid(cluster_thresholds=args.thresholds, cluster_radii=args.radii, windows_hours=args.windows)
+    started = time.perf_counter()
+    results = replay(prepared, rule_sets)
+    sweep_s = time.perf_counter() - started
+
+    print(f"\n🔁 {len(prepared):,} reports over a year (prepared in {prepare_s:.1f}s)")
+    print(f"  one cluster-count pass: {count_s:.2f}s (live ClusterWindow, per report: ~{live_s:.0f}s)")
+    print(f"  {'rules':<22}{'alerts':>8}{'suppressed':>12}{'cluster':>9}{'critical':>10}{'arsenic':>9}")
+    for result in results:
+        by_rule = result["byRule"]
+        print(f"  {result['label']:<22}{result['alertCount']:>8,}{result['suppressed']:>12,}"
+              f"{by_rule.get('Rule 1', 0):>9,}{by_rule.get('Rule 2', 0):>10,}{by_rule.get('Rule 3', 0):>9,}")
+    print(f"\n  {len(rule_sets)} rule sets, {len(args.radii) * len(args.windows)} counting passes: {sweep_s:.1f}s\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark for the cluster rule's sliding window (services/cluster_window.py).
+
+Random water reports over Assam, spread over the last 36 hours and over the
+contamination types, are loaded into a ClusterWindow. The script first
+checks that its counts equal the Firestore rule (same type, reportedAt after
+now - TIME_WINDOW_HOURS, within CLUSTER_RADIUS) evaluated over every report,
+including after the window slides forward. It then times counts against that
+full pass, which is what each new report paid for (on top of the reads).
+
+Usage (from backend/): python scripts/bench_cluster_window.py [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_rules import CLUSTER_RADIUS, TIME_WINDOW_HOURS
+from services.cluster_window import ClusterWindow, window_start
+from services.distance import distances_from
+
+ASSAM_BOUNDS = (24.1, 28.0, 89.7, 96.1)  # min_lat, max_lat, min_lon, max_lon
+TYPES = ("arsenic", "fluoride", "bacteria", "turbidity", "other")
+HISTORY_HOURS = 36
+
+def random_report(rng: random.Random, now: datetime, i: int) -> dict:
+    min_lat, max_lat, min_lon, max_lon = ASSAM_BOUNDS
+    # Half the reports in a few hotspots, so clusters actually form
+    if i % 2:
+        lat, lon = rng.choice([(26.95, 94.2), (26.18, 91.75), (27.48, 94.91)])
+        lat, lon = lat + rng.gauss(0, 0.03), lon + rng.gauss(0, 0.03)
+    else:
+        lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+    reported_at = now - timedelta(seconds=rng.uniform(0, HISTORY_HOURS * 3600))
+    return {"id": f"w{i}", "contaminationType": rng.choice(TYPES), "reportedAt": reported_at.isoformat(),
+            "latitude": lat, "longitude": lon}
+
+def rule_count(reports, contamination_type, lat, lon, now) -> int:
+    """The Firestore rule, evaluated over every report"""
+    since = window_start(TIME_WINDOW_HOURS, now)
+    points = [(r["latitude"], r["longitude"]) for r in reports
+              if r["contaminationType"] == contamination_type and r["reportedAt"] > since]
+    if not points:
+        return 0
+    lats, lons = zip(*points)
+    return int((distances_from(lat, lon, lats, lons) <= CLUSTER_RADIUS).sum())
+
+def run(size: int, query_count: int, seed: int):
+    rng = random.Random(seed)
+    now = datetime.now()
+    reports = [random_report(rng, now, i) for i in range(size)]
+    queries = []
+    for i in range(query_count):
+        point = random_report(rng, now, i)
+        queries.append((rng.choice(TYPES), point["latitude"], point["longitude"]))
+
+    started = time.perf_counter()
+    window = ClusterWindow(TIME_WINDOW_HOURS, CLUSTER_RADIUS)
+    for r in reports:
+        window.insert(r["id"], r["contaminationType"], r["reportedAt"], r["latitude"], r["longitude"])
+    build_ms = (time.perf_counter() - started) * 1000
+
+    # Counts must match the rule now and as the window slides (evicting the oldest)
+    for hours_later in (0, 3, 9):
+        at = now + timedelta(hours=hours_later)
+        for contamination_type, lat, lon in queries[:30]:
+            expected = rule_count(reports, contamination_type, lat, lon, at)
+            assert window.count(contamination_type, lat, lon, at) == expected, (hours_later, contamination_type, lat, lon)
+    print(f"\n🧪 {size:,} reports (window build {build_ms:.0f} ms): counts match the rule before and after sliding")
+
+    window = ClusterWindow(TIME_WINDOW_HOURS, CLUSTER_RADIUS)
+    for r in reports:
+        window.insert(r["id"], r["contaminationType"], r["reportedAt"], r["latitude"], r["longitude"])
+    # The first count per type evicts the reports older than the window; time the steady state
+    for contamination_type in TYPES:
+        window.count(contamination_type, 26.0, 92.0, now)
+    scan_queries = queries[:max(5, query_count * 1000 // size)]
+    started = time.perf_counter()
+    for contamination_type, lat, lon in scan_queries:
+        rule_count(reports, contamination_type, lat, lon, now)
+    scan_ms = (time.perf_counter() - started) * 1000 / len(scan_queries)
+    started = time.perf_counter()
+    for contamination_type, lat, lon in queries:
+        window.count(contamination_type, lat, lon, now)
+    window_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"  {'count':<14}{'scan ms':>10}{'window ms':>11}{'speedup':>10}")
+    print(f"  {'cluster rule':<14}{scan_ms:>10.3f}{window_ms:>11.3f}{scan_ms / window_ms:>9.0f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200, help="counts timed per size")
+    parser.add_argument("--seed", type=int, default=24)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.seed)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark for services/distance.py.
+
+Times point-to-many distances at several sizes for the three scalar
+haversine implementations the app used to carry (reproduced below as
+references), the vectorized kernel and its equirectangular fast path, then
+the pairwise matrix. Their agreement is covered by tests/test_distance.py.
+
+Usage (from backend/): python scripts/bench_distance.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from services.distance import distances_from, haversine_distance, pairwise_distances
+
+def utils_haversine(lat1, lon1, lat2, lon2):
+    """Former services/utils.haversine_distance (meters)"""
+    R = 6371000
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    delta_phi = math.radians(lat2 - lat1)
+    delta_lambda = math.radians(lon2 - lon1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+def location_haversine(lat1, lon1, lat2, lon2):
+    """Former services/location_service.haversine_distance (meters)"""
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(math.sqrt(a)) * 6371000
+
+def cleaning_haversine(lat1, lon1, lat2, lon2):
+    """Former per-report closure in routes/cleaning (kilometers)"""
+    R = 6371.0
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+REFERENCES = [
+    ("utils", utils_haversine, 1.0),
+    ("location_service", location_haversine, 1.0),
+    ("cleaning", cleaning_haversine, 1000.0),
+]
+
+def random_points(rng, n, center=(26.2, 92.9), spread=2.0):
+    lats = [center[0] + rng.uniform(-spread, spread) for _ in range(n)]
+    lons = [center[1] + rng.uniform(-spread, spread) for _ in range(n)]
+    return lats, lons
+
+def time_ms(fn, repeat=3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def bench(rng, sizes):
+    lat, lon = 26.9, 94.2
+    print(f"\n  {'points':>8}{'utils':>10}{'location':>10}{'cleaning':>10}{'kernel':>10}{'fast':>10}"
+          f"{'kernel*':>10}{'fast*':>10}   (ms, point-to-many; * = ndarray input)")
+    for n in sizes:
+        lats, lons = random_points(rng, n)
+        timings = [time_ms(lambda fn=fn: [fn(lat, lon, a, b) for a, b in zip(lats, lons)]) for _, fn, _ in REFERENCES]
+        timings.append(time_ms(lambda: distances_from(lat, lon, lats, lons)))
+        timings.append(time_ms(lambda: distances_from(lat, lon, lats, lons, fast=True)))
+        lat_array, lon_array = np.array(lats), np.array(lons)
+        timings.append(time_ms(lambda: distances_from(lat, lon, lat_array, lon_array)))
+        timings.append(time_ms(lambda: distances_from(lat, lon, lat_array, lon_array, fast=True)))
+        print(f"  {n:>8,}" + "".join(f"{t:>10.2f}" for t in timings))
+
+    n = 2000
+    lats, lons = random_points(rng, n)
+    loops = time_ms(lambda: [[haversine_distance(a, b, c, d) for c, d in zip(lats, lons)] for a, b in zip(lats, lons)], repeat=1)
+    matrix = time_ms(lambda: pairwise_distances(lats, lons))
+    fast_matrix = time_ms(lambda: pairwise_distances(lats, lons, fast=True))
+    print(f"\n  pairwise {n}x{n}: scalar loops {loops:.0f} ms, kernel {matrix:.0f} ms, fast {fast_matrix:.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    bench(rng, args.sizes)
+    print()
+
+if __name__ == "__main__":
+    main()
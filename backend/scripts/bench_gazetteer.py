@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Correctness check and benchmark for the offline gazetteer (services/gazetteer.py).
+
+Compiles the index from the CSV, checks a set of exact, alternate-name,
+misspelled, truncated and unknown village names, then times index build,
+load (mmap open) and lookups per match type, uncached (Gazetteer.lookup)
+and cached (geocode).
+
+Usage (from backend/): python scripts/bench_gazetteer.py [--csv services/data/assam_gazetteer.csv] [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import gazetteer
+from services.gazetteer import GAZETTEER_CSV_PATH, Gazetteer, build_index
+
+# (query, expected place name or None, expected match type)
+CASES = [
+    ("Kamalabari", "Kamalabari", "exact"),
+    ("GARAMUR", "Garamur", "exact"),
+    ("gauhati", "Guwahati", "exact"),
+    ("kamlabari", "Kamalabari", "fuzzy"),
+    ("jorhatt", "Jorhat", "fuzzy"),
+    ("dibrugar", "Dibrugarh", "fuzzy"),
+    ("guwa", "Guwahati", "prefix"),
+    ("xyzzy", None, None),
+]
+
+def check(index: Gazetteer):
+    for query, name, match_type in CASES:
+        place = index.lookup(query)
+        found = (place["name"], place["matchType"]) if place else (None, None)
+        assert found == (name, match_type), f"{query!r}: expected {(name, match_type)}, got {found}"
+    print(f"✅ {len(CASES)} lookups resolve as expected")
+
+def per_call_us(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) * 1e6 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=GAZETTEER_CSV_PATH)
+    parser.add_argument("--repeat", type=int, default=2000, help="calls timed per query")
+    args = parser.parse_args()
+
+    index_path = os.path.join(tempfile.mkdtemp(), "bench_gazetteer.idx")
+    started = time.perf_counter()
+    build_index(args.csv, index_path)
+    build_ms = (time.perf_counter() - started) * 1000
+    load_us = per_call_us(lambda: Gazetteer(index_path), 200)
+    index = Gazetteer(index_path)
+    print(f"\n🗺️  {len(index):,} places, index {os.path.getsize(index_path) / 1024:.0f} KiB "
+          f"(build {build_ms:.0f} ms, load {load_us:.0f} µs)")
+    if args.csv == GAZETTEER_CSV_PATH:
+        check(index)
+
+    # geocode() goes through the process-wide instance; point it at this index
+    gazetteer._gazetteer = index
+    gazetteer._cached_lookup.cache_clear()
+    print(f"\n  {'query':<14}{'match':<8}{'uncached µs':>12}{'cached µs':>11}")
+    for query, _, _ in CASES:
+        place = index.lookup(query)
+        uncached = per_call_us(lambda: index.lookup(query), args.repeat)
+        cached = per_call_us(lambda: gazetteer.geocode(query), args.repeat)
+        print(f"  {query:<14}{(place or {}).get('matchType', 'none'):<8}{uncached:>12.1f}{cached:>11.2f}")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Parity check and benchmark for the hotspot clustering (services/hotspots.py).
+
+Synthetic water reports are generated over Assam: dense hotspots of varying
+size and spread on top of uniform background noise. The grid DBSCAN is first
+checked against a brute-force DBSCAN (full haversine distance matrix) on
+small inputs: same core points, same clusters up to numbering, same noise,
+and every border point in the cluster of its nearest core neighbour. It is
+then timed at larger sizes on one core.
+
+Usage (from backend/): python scripts/bench_hotspots.py [--sizes 10000 100000 300000] [--eps 1000] [--min-reports 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from services.distance import pairwise_distances
+from services.hotspots import HOTSPOT_EPS_METERS, HOTSPOT_MIN_REPORTS, NOISE, dbscan
+
+ASSAM_BOUNDS = (24.1, 28.0, 89.7, 96.1)  # min_lat, max_lat, min_lon, max_lon
+
+def synthetic_reports(rng: np.random.Generator, n: int, hotspot_share: float = 0.6):
+    min_lat, max_lat, min_lon, max_lon = ASSAM_BOUNDS
+    clustered = int(n * hotspot_share)
+    centers = np.column_stack([rng.uniform(min_lat, max_lat, max(1, n // 500)),
+                               rng.uniform(min_lon, max_lon, max(1, n // 500))])
+    which = rng.integers(0, len(centers), clustered)
+    spread = rng.choice([0.002, 0.01, 0.03], len(centers))[which]
+    lats = np.concatenate([centers[which, 0] + rng.normal(0, 1, clustered) * spread,
+                           rng.uniform(min_lat, max_lat, n - clustered)])
+    lons = np.concatenate([centers[which, 1] + rng.normal(0, 1, clustered) * spread,
+                           rng.uniform(min_lon, max_lon, n - clustered)])
+    return lats, lons
+
+def reference_dbscan(lats, lons, eps, min_samples):
+    """(core mask, cluster label per core point or NOISE, neighbour matrix)"""
+    within = pairwise_distances(lats, lons) <= eps
+    core = within.sum(axis=1) >= min_samples
+    labels = np.full(len(lats), NOISE)
+    cluster = 0
+    for start in np.flatnonzero(core):
+        if labels[start] != NOISE:
+            continue
+        stack = [start]
+        labels[start] = cluster
+        while stack:
+            point = stack.pop()
+            for other in np.flatnonzero(within[point] & core):
+                if labels[other] == NOISE:
+                    labels[other] = cluster
+                    stack.append(other)
+        cluster += 1
+    return core, labels, within
+
+def check_parity(rng, eps, min_samples):
+    for n in (200, 1000, 3000):
+        lats, lons = synthetic_reports(rng, n)
+        labels = dbscan(lats, lons, eps, min_samples)
+        core, expected, within = reference_dbscan(lats, lons, eps, min_samples)
+
+        # Same partition of the core points (cluster numbers may differ)
+        pairs = set(zip(labels[core].tolist(), expected[core].tolist()))
+        assert (labels[core] != NOISE).all(), "core point left as noise"
+        assert len(pairs) == len({a for a, _ in pairs}) == len({b for _, b in pairs}), "core partition differs"
+
+        distances = pairwise_distances(lats, lons)
+        for point in np.flatnonzero(~core):
+            core_neighbours = np.flatnonzero(within[point] & core)
+            if not len(core_neighbours):
+                assert labels[point] == NOISE, "noise point was clustered"
+            else:
+                nearest = core_neighbours[np.argmin(distances[point, core_neighbours])]
+                assert labels[point] == labels[nearest], "border point not in its nearest core's cluster"
+        print(f"✅ {n:>5} reports: {len(pairs)} clusters, {int(core.sum())} core, "
+              f"{int((labels == NOISE).sum())} noise - matches brute-force DBSCAN")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--eps", type=float, default=HOTSPOT_EPS_METERS)
+    parser.add_argument("--min-reports", type=int, default=HOTSPOT_MIN_REPORTS)
+    parser.add_argument("--seed", type=int, default=43)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    check_parity(rng, args.eps, args.min_reports)
+    print(f"\n  {'reports':>9}{'clusters':>10}{'noise':>9}{'seconds':>9}")
+    for n in args.sizes:
+        lats, lons = synthetic_reports(rng, n)
+        started = time.perf_counter()
+        labels = dbscan(lats, lons, args.eps, args.min_reports)
+        elapsed = time.perf_counter() - started
+        print(f"  {n:>9,}{int(labels.max()) + 1:>10,}{int((labels == NOISE).sum()):>9,}{elapsed:>9.2f}")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark alert fan-out (services/notifications.py) to a large subscriber base.
+
+Subscribers' homes are spread over Assam, most of them around a few towns.
+For alerts of several radii centred on a town, the script times finding the
+recipients with the grid index against a scan over every subscriber, then
+fans the alert out through the fake provider: unthrottled, with failures
+injected (retried), and under a provider rate limit. Every run checks that
+only recipients were messaged, none twice, and that sent + failed adds up.
+
+Usage (from backend/): python scripts/bench_notifications.py [--subscribers 100000] [--failure-rate 0.05]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import notifications
+from services.distance import haversine_distance
+from services.notifications import FakeProvider, Subscriber, fan_out, register_provider
+from services.spatial_index import GridIndex
+
+ASSAM_BOUNDS = (24.1, 28.0, 89.7, 96.1)  # min_lat, max_lat, min_lon, max_lon
+TOWNS = [(26.1445, 91.7362), (26.7509, 94.2037), (27.4728, 94.912), (26.9550, 94.2200)]
+RADII = (2000, 5000, 20000, 50000)
+
+def random_subscribers(rng: random.Random, n: int):
+    min_lat, max_lat, min_lon, max_lon = ASSAM_BOUNDS
+    result = []
+    for i in range(n):
+        if i % 5:
+            lat, lon = rng.choice(TOWNS)
+            lat, lon = lat + rng.gauss(0, 0.08), lon + rng.gauss(0, 0.08)
+        else:
+            lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+        channel = "sms" if i % 3 else "push"
+        result.append(Subscriber(f"u{i}", lat, lon, channel, f"{channel}:{i}", None))
+    return result
+
+def scan(subscribers, lat, lon, radius):
+    return [s for s in subscribers if haversine_distance(lat, lon, s.latitude, s.longitude) <= radius]
+
+def fresh_providers(**options):
+    providers = {channel: FakeProvider(seed=7, **options) for channel in ("sms", "push")}
+    for channel, provider in providers.items():
+        register_provider(channel, provider)
+    return providers
+
+def best_ms(fn, repeat: int = 3):
+    """(result, best wall time in ms) over a few runs, so GC pauses don't skew one row"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+def check_delivery(providers, recipients, result):
+    """Nobody outside the area is messaged, nobody twice, and the counts add up.
+
+    With failures injected a message can still fail every attempt; it is then
+    counted as failed instead of sent.
+    """
+    delivered = Counter(m["userId"] for p in providers.values() for m in p.sent)
+    assert set(delivered) <= {s.id for s in recipients}, "a subscriber outside the area was messaged"
+    assert max(delivered.values(), default=1) == 1, "a recipient got more than one message"
+    assert sum(delivered.values()) == result["sent"], "sent count differs from messages delivered"
+    assert result["sent"] + result["failed"] == len(recipients), "messages unaccounted for"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=100000)
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="share of sends the fake provider fails")
+    parser.add_argument("--rate", type=float, default=50000, help="provider rate limit (messages/s) for the paced run")
+    parser.add_argument("--seed", type=int, default=44)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    # Retries back off for real in production; keep the benchmark about throughput
+    notifications.NOTIFY_RETRY_BASE_SECONDS = 0.001
+
+    subscribers = random_subscribers(rng, args.subscribers)
+    started = time.perf_counter()
+    index = GridIndex(1000)
+    for s in subscribers:
+        index.insert(s.id, s.latitude, s.longitude, s)
+    print(f"\n📣 {len(subscribers):,} subscribers (index build {(time.perf_counter() - started) * 1000:.0f} ms)")
+    print(f"  {'radius':>8}{'recipients':>12}{'scan ms':>10}{'index ms':>10}"
+          f"{'send s':>9}{'msg/s':>10}{'retry s':>9}{'gave up':>9}{'paced s':>9}")
+
+    lat, lon = TOWNS[0]
+    alert = {"message": "Benchmark alert", "latitude": lat, "longitude": lon}
+    for radius in RADII:
+        expected, scan_ms = best_ms(lambda: scan(subscribers, lat, lon, radius))
+        recipients, index_ms = best_ms(lambda: [s for _, _, s in index.within(lat, lon, radius)])
+        assert {s.id for s in recipients} == {s.id for s in expected}
+
+        providers = fresh_providers(rate_per_second=0)
+        result = fan_out("bench", alert, recipients)
+        check_delivery(providers, recipients, result)
+        assert result["failed"] == 0
+        send_s = result["seconds"]
+
+        providers = fresh_providers(rate_per_second=0, failure_rate=args.failure_rate)
+        result = fan_out("bench", alert, recipients)
+        check_delivery(providers, recipients, result)
+        retry_s, gave_up = result["seconds"], result["failed"]
+
+        providers = fresh_providers(rate_per_second=args.rate)
+        result = fan_out("bench", alert, recipients)
+        check_delivery(providers, recipients, result)
+        assert result["failed"] == 0
+        paced_s = result["seconds"]
+
+        rate = len(recipients) / send_s if send_s else float("inf")
+        print(f"  {radius // 1000:>6}km{len(recipients):>12,}{scan_ms:>10.1f}{index_ms:>10.1f}"
+              f"{send_s:>9.2f}{rate:>10,.0f}{retry_s:>9.2f}{gave_up:>9}{paced_s:>9.2f}")
+    print(f"\n  retry: {args.failure_rate:.0%} of sends fail per attempt; paced: provider limit {args.rate:,.0f}/s\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark the grid spatial index against the linear scans it replaces.
+
+Random active reports are spread over Assam (bounding box below). For each
+size the script times index build, radius queries (100 m duplicate check and
+5 km / 10 km proximity) and 10-nearest queries, against a haversine scan over
+every report. Random alert areas (radii 500 m - 20 km) are then checked the
+same way for "which alerts cover this point". Results are checked against
+the scan before timing.
+
+Usage (from backend/): python scripts/bench_spatial_index.py [--sizes 1000 10000 100000] [--queries 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.spatial_index import GeofenceIndex, GridIndex
+from services.distance import haversine_distance
+
+ASSAM_BOUNDS = (24.1, 28.0, 89.7, 96.1)  # min_lat, max_lat, min_lon, max_lon
+RADII = (100, 5000, 10000)
+K = 10
+ALERT_RADII = (500, 2000, 5000, 20000)
+
+def random_point(rng: random.Random):
+    min_lat, max_lat, min_lon, max_lon = ASSAM_BOUNDS
+    return rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+
+def scan_within(points, lat, lon, radius):
+    matches = []
+    for point_id, p_lat, p_lon in points:
+        distance = haversine_distance(lat, lon, p_lat, p_lon)
+        if distance <= radius:
+            matches.append((distance, point_id))
+    matches.sort()
+    return matches
+
+def scan_nearest(points, lat, lon, k):
+    return sorted((haversine_distance(lat, lon, p_lat, p_lon), point_id) for point_id, p_lat, p_lon in points)[:k]
+
+def per_query_ms(fn, queries) -> float:
+    started = time.perf_counter()
+    for lat, lon in queries:
+        fn(lat, lon)
+    return (time.perf_counter() - started) * 1000 / len(queries)
+
+def run(size: int, query_count: int, seed: int):
+    rng = random.Random(seed)
+    points = [(f"r{i}", *random_point(rng)) for i in range(size)]
+    queries = [random_point(rng) for _ in range(query_count)]
+
+    started = time.perf_counter()
+    index = GridIndex()
+    for point_id, lat, lon in points:
+        index.insert(point_id, lat, lon)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    for lat, lon in queries[:20]:
+        for radius in RADII:
+            assert [p for _, p, _ in index.within(lat, lon, radius)] == [p for _, p in scan_within(points, lat, lon, radius)]
+            assert index.count_within(lat, lon, radius) == len(scan_within(points, lat, lon, radius))
+        assert [p for _, p, _ in index.nearest(lat, lon, K)] == [p for _, p in scan_nearest(points, lat, lon, K)]
+
+    print(f"\n📍 {size:,} active reports (index build {build_ms:.0f} ms)")
+    print(f"  {'query':<14}{'scan ms':>10}{'index ms':>10}{'speedup':>10}")
+    rows = [(f"within {radius // 1000}km" if radius >= 1000 else f"within {radius}m",
+             lambda lat, lon, r=radius: scan_within(points, lat, lon, r),
+             lambda lat, lon, r=radius: index.within(lat, lon, r)) for radius in RADII]
+    rows.append((f"nearest {K}", lambda lat, lon: scan_nearest(points, lat, lon, K),
+                 lambda lat, lon: index.nearest(lat, lon, K)))
+    for label, scan, indexed in rows:
+        # Scans are slow at large sizes; time them on fewer queries
+        scan_ms = per_query_ms(scan, queries[:max(5, query_count * 1000 // size)])
+        index_ms = per_query_ms(indexed, queries)
+        print(f"  {label:<14}{scan_ms:>10.3f}{index_ms:>10.3f}{scan_ms / index_ms:>9.0f}x")
+
+def scan_covering(fences, lat, lon):
+    matches = []
+    for fence_id, f_lat, f_lon, radius in fences:
+        distance = haversine_distance(lat, lon, f_lat, f_lon)
+        if distance <= radius:
+            matches.append((distance, fence_id))
+    matches.sort()
+    return matches
+
+def run_geofences(size: int, query_count: int, seed: int):
+    rng = random.Random(seed)
+    fences = [(f"a{i}", *random_point(rng), rng.choice(ALERT_RADII)) for i in range(size)]
+    queries = [random_point(rng) for _ in range(query_count)]
+
+    started = time.perf_counter()
+    index = GeofenceIndex()
+    for fence_id, lat, lon, radius in fences:
+        index.insert(fence_id, lat, lon, radius)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    for lat, lon in queries[:20]:
+        assert [f for _, f, _ in index.covering(lat, lon)] == [f for _, f in scan_covering(fences, lat, lon)]
+
+    scan_ms = per_query_ms(lambda lat, lon: scan_covering(fences, lat, lon), queries[:max(5, query_count * 1000 // size)])
+    index_ms = per_query_ms(lambda lat, lon: index.covering(lat, lon), queries)
+    print(f"\n🚨 {size:,} active alert areas (index build {build_ms:.0f} ms)")
+    print(f"  {'covering':<14}{scan_ms:>10.3f}{index_ms:>10.3f}{scan_ms / index_ms:>9.0f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200, help="queries timed per size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries, args.seed)
+    for size in args.sizes:
+        run_geofences(size, args.queries, args.seed)
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Build the village/locality extract for the offline gazetteer and compile its index.
+
+Downloads the GeoNames dump for India (or reads one given with --geonames),
+keeps Assam's populated places and localities, and writes them in the
+gazetteer CSV columns to GAZETTEER_EXTRACT_PATH (services/data/assam_places.csv).
+The index is then rebuilt from the curated CSV plus the extract. Curated
+entries keep priority; re-running replaces the extract.
+
+A failed download exits non-zero, so an image build fails rather than
+shipping only the curated places; --optional turns that into a warning.
+
+GeoNames data is CC BY 4.0 (https://www.geonames.org).
+
+Usage (from backend/): python scripts/build_gazetteer.py [--geonames IN.zip] [--admin2 admin2Codes.txt] [--optional]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.gazetteer import (GAZETTEER_CSV_PATH, GAZETTEER_EXTRACT_PATH, GAZETTEER_INDEX_PATH,
+                                GEONAMES_ADMIN2_URL, GEONAMES_DUMP_URL, Gazetteer, build_index,
+                                write_geonames_extract)
+
+def download(url: str, directory: str) -> str:
+    path = os.path.join(directory, os.path.basename(url))
+    print(f"⬇️  Downloading {url}...")
+    urllib.request.urlretrieve(url, path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--geonames", help=f"GeoNames IN.zip or IN.txt (default: download {GEONAMES_DUMP_URL})")
+    parser.add_argument("--admin2", help=f"GeoNames admin2Codes.txt (default: download {GEONAMES_ADMIN2_URL})")
+    parser.add_argument("--out", default=GAZETTEER_EXTRACT_PATH, help="extract CSV to write")
+    parser.add_argument("--optional", action="store_true",
+                        help="warn and keep the curated places only if GeoNames cannot be read")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory() as downloads:
+            dump_path = args.geonames or download(GEONAMES_DUMP_URL, downloads)
+            admin2_path = args.admin2 or download(GEONAMES_ADMIN2_URL, downloads)
+            places = write_geonames_extract(dump_path, admin2_path, args.out)
+    except (OSError, ValueError) as e:
+        banner = "!" * 72
+        print(f"{banner}\n⚠️  GAZETTEER EXTRACT NOT BUILT: {e}\n"
+              f"⚠️  Only the curated places in {GAZETTEER_CSV_PATH} will be geocoded.\n{banner}", file=sys.stderr)
+        sys.exit(0 if args.optional else 1)
+    if not places:
+        print(f"❌ No places found in {dump_path}", file=sys.stderr)
+        sys.exit(0 if args.optional else 1)
+    print(f"✅ {places} places written to {args.out}")
+
+    index_path = build_index(GAZETTEER_CSV_PATH, GAZETTEER_INDEX_PATH, args.out)
+    print(f"✅ Index {index_path}: {len(Gazetteer(index_path)):,} places "
+          f"({time.perf_counter() - started:.1f}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Recompute contamination hotspots and store them in the hotspots collection.
+
+Clusters the water reports of each contamination type over each window in
+HOTSPOT_WINDOWS_DAYS (see services/hotspots.py) and replaces the stored
+results. Meant to run on a schedule, e.g. a Railway cron service every hour;
+set HOTSPOT_INTERVAL_MINUTES instead to run it inside the API process.
+
+Usage (from backend/): python scripts/compute_hotspots.py [--dry-run] [--windows 7 30 90]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hotspots import HOTSPOT_WINDOWS_DAYS, run_hotspot_job
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", type=int, nargs="+", default=HOTSPOT_WINDOWS_DAYS, help="window lengths in days")
+    parser.add_argument("--dry-run", action="store_true", help="compute and report without writing")
+    args = parser.parse_args()
+
+    print(f"🔥 Computing hotspots over {', '.join(f'{d}d' for d in args.windows)}...")
+    summary = run_hotspot_job(args.windows, dry_run=args.dry_run)
+    verb = "would write" if args.dry_run else "wrote"
+    print(f"✅ {summary['reports']} reports -> {verb} {summary['hotspots']} hotspots, "
+          f"removed {summary['stale']} stale (load {summary['loadSeconds']}s, "
+          f"clustering {summary['clusterSeconds']}s, total {summary['seconds']}s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Archive alerts that are past their expiresAt.
+
+Moves each expired active alert from alerts to alertArchive in batches of
+ALERT_EXPIRY_BATCH_SIZE (see services/alert_expiry.py). Meant to run on a
+schedule, e.g. a Railway cron service every 10 minutes; the API process
+also runs it every ALERT_EXPIRY_INTERVAL_MINUTES unless that is 0.
+
+Usage (from backend/): python scripts/expire_alerts.py [--dry-run] [--max-batches 10]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.alert_expiry import run_expiry_job
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the first batch of expired alerts without moving them")
+    parser.add_argument("--max-batches", type=int, help="stop after this many batches")
+    args = parser.parse_args()
+
+    print("🗄️  Archiving expired alerts...")
+    summary = run_expiry_job(dry_run=args.dry_run, max_batches=args.max_batches)
+    if args.dry_run:
+        print(f"✅ {summary['expired']} expired alerts in the first batch ({summary['seconds']}s)")
+    else:
+        print(f"✅ Archived {summary['archived']} of {summary['expired']} expired alerts "
+              f"in {summary['batches']} batches ({summary['seconds']}s)")
+
+if __name__ == "__main__":
+    main()
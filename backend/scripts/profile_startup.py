@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Startup profile for the LUIT backend.
+
+1. Imports main.py under `python -X importtime` and reports the slowest
+   modules (cumulative import time) plus every app module (main, routes.*,
+   services.*).
+2. Boots uvicorn on a free port and measures the time until the first
+   successful /health response.
+
+Usage (from backend/): python scripts/profile_startup.py [--top 25]
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PREFIXES = ("main", "routes", "services", "config")
+
+def profile_imports():
+    """Return [(module, self_us, cumulative_us)] for a fresh `import main`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit("❌ import main failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def time_to_first_request(timeout: float = 60.0) -> float:
+    """Seconds from spawning uvicorn until /health answers 200"""
+    port = _free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise SystemExit("❌ uvicorn exited before serving /health")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.02)
+        raise SystemExit(f"❌ /health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=25, help="number of slowest modules to list")
+    args = parser.parse_args()
+
+    rows = profile_imports()
+    total_us = max((cumulative for _, _, cumulative in rows), default=0)
+
+    print(f"\n⏱️  import main: {total_us / 1000:.1f} ms total\n")
+    print(f"Slowest {args.top} modules (cumulative ms / self ms):")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} {self_us / 1000:9.1f}  {name}")
+
+    print("\nApp modules:")
+    for name, self_us, cumulative_us in rows:
+        if name.split(".")[0] in APP_PREFIXES:
+            print(f"  {cumulative_us / 1000:9.1f} {self_us / 1000:9.1f}  {name}")
+
+    heavy = [name for name, _, _ in rows if name.split(".")[0] in ("cv2", "onnxruntime", "cloudinary")]
+    print(f"\nHeavy libraries imported at startup: {', '.join(sorted(set(h.split('.')[0] for h in heavy))) or 'none'}")
+
+    print(f"\n🚀 Time to first /health response: {time_to_first_request() * 1000:.0f} ms\n")
+
+if __name__ == "__main__":
+    main()
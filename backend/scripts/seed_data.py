@@ -1,4 +1,6 @@
 from services.firebase_service import init_firebase, get_firestore_client, add_document
+from services.geohash import with_geohash
+from services.rollups import rebuild_rollups
 from google.cloud.firestore import GeoPoint
 from datetime import datetime, timedelta
 import random
@@ -88,7 +90,7 @@ def seed_demo_data():
             "userName": f"Villager {i+1}",
             "location": GeoPoint(26.9500, 94.2200)
         }
-        db.collection("waterReports").add(report)
+        db.collection("waterReports").add(with_geohash(report))
 
     # Garamur Fluoride (2 reports)
     for i in range(2):
@@ -103,10 +105,10 @@ def seed_demo_data():
             "status": "pending",
             "userName": f"Resident {i+1}"
         }
-        db.collection("waterReports").add(report)
+        db.collection("waterReports").add(with_geohash(report))
 
     # Auniati Bacteria (1 critical)
-    db.collection("waterReports").add({
+    db.collection("waterReports").add(with_geohash({
         "village": "Auniati",
         "contaminationType": "bacteria",
         "waterSource": "pond",
@@ -116,10 +118,10 @@ def seed_demo_data():
         "reportedAt": datetime.now().isoformat(),
         "status": "pending",
         "userName": "Concerned Citizen"
-    })
+    }))
 
     # 5. Pre-triggered Alerts
-    db.collection("alerts").add({
+    db.collection("alerts").add(with_geohash({
         "contaminationType": "arsenic",
         "severityLevel": "critical",
         "status": "active",
@@ -130,7 +132,10 @@ def seed_demo_data():
         "affectedArea": {"center": GeoPoint(26.9500, 94.2200), "radius": 5000},
         "createdAt": datetime.now().isoformat(),
         "triggerType": "automatic"
-    })
+    }))
+
+    # 6. Daily rollups of the seeded water reports
+    rebuild_rollups(["waterReports"], db=db)
 
     print("✅ Seeding Complete!")
 
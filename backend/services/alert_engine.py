@@ -1,112 +1,280 @@
 import logging
 from datetime import datetime, timedelta
-from services.firebase_service import add_document, get_firestore_client, update_document
-from services.utils import haversine_distance
+from typing import Optional, Tuple
+from services.firebase_service import get_firestore_client, update_document
+# Rule parameters live in alert_rules; import them from there
+from services.alert_rules import CLUSTER_RADIUS, DEFAULT_RULES, TIME_WINDOW_HOURS
+from services.cluster_window import WindowMirror, cluster_mirror
+from services.distance import distances_from, haversine_distance
+from services.geohash import with_geohash
+from services.notifications import dispatch_alert
+from services.live_mirror import ALERT_DEFAULT_RADIUS_METERS, active_alert_geofences, active_alerts
 from google.cloud.firestore import FieldFilter, GeoPoint
 
 logger = logging.getLogger(__name__)
 
-# Constants for rules
-CLUSTER_THRESHOLD = 3
-CLUSTER_RADIUS = 5000  # 5km
-ARSENIC_RADIUS = 2000  # 2km
-TIME_WINDOW_HOURS = 24
+MAX_ALERT_RADIUS = 50000  # 50km, largest affected area an alert may cover
 
-async def check_and_trigger_alerts(new_report: dict):
+# Alerts that gave up their key (see claim_alert_key) are kept here
+ALERT_ARCHIVE_COLLECTION = "alertArchive"
+
+# Water reports of the last TIME_WINDOW_HOURS, mirrored in memory for the cluster rule
+recent_water_reports = WindowMirror("recent-water-reports", "waterReports", TIME_WINDOW_HOURS)
+report_clusters = cluster_mirror(recent_water_reports, CLUSTER_RADIUS)
+
+# The mirror has already dropped reports that aged out since an older report
+# was made, so one evaluated later than this is counted against Firestore
+MIRROR_MAX_LAG_SECONDS = 60
+
+def report_time(report: dict, now: Optional[datetime] = None) -> datetime:
+    """When a report was made, as a naive local datetime like the stored
+    reportedAt strings. Missing, unparseable or future times give now."""
+    now = now or datetime.now()
+    try:
+        reported_at = datetime.fromisoformat(report.get("reportedAt"))
+    except (TypeError, ValueError):
+        return now
+    if reported_at.tzinfo is not None:
+        reported_at = reported_at.astimezone().replace(tzinfo=None)
+    return min(reported_at, now)
+
+def alert_live(alert: dict, now: Optional[str] = None) -> bool:
+    """Whether an alert document is active and not past its expiresAt.
+
+    Expired alerts stay "active" until the expiry job (services/alert_expiry.py)
+    archives them, so readers of active alerts check this too.
+    """
+    expires_at = alert.get("expiresAt")
+    return alert.get("status") == "active" and (not expires_at or expires_at > (now or datetime.now().isoformat()))
+
+def archive_record(alert_id: str, alert: dict) -> dict:
+    """What ALERT_ARCHIVE_COLLECTION keeps of an alert leaving the alerts collection"""
+    status = alert.get("status")
+    return {**alert, "alertId": alert_id, "status": "expired" if status == "active" else status,
+            "archivedAt": datetime.now().isoformat()}
+
+def find_alert(alert_id: str, created_at: Optional[str] = None, db=None) -> Optional[dict]:
+    """An alert by id, from alerts or, once it expired or gave up its key, from
+    ALERT_ARCHIVE_COLLECTION.
+
+    Keyed alert ids are reused by later alerts of the same area, so created_at
+    picks one of them; without it the current alert wins, then the most
+    recently archived. Archived alerts carry archivedAt.
+    """
+    if db is None:
+        db = get_firestore_client()
+    snapshot = db.collection("alerts").document(alert_id).get()
+    if snapshot.exists:
+        alert = snapshot.to_dict() or {}
+        if created_at is None or alert.get("createdAt") == created_at:
+            return alert
+    archived = [doc.to_dict() or {} for doc in db.collection(ALERT_ARCHIVE_COLLECTION)
+                .where(filter=FieldFilter("alertId", "==", alert_id)).stream()]
+    if created_at is not None:
+        archived = [alert for alert in archived if alert.get("createdAt") == created_at]
+    return max(archived, key=lambda alert: alert.get("archivedAt") or "", default=None)
+
+def _covering_alert_id(contamination_type: str, lat: float, lon: float) -> Optional[str]:
+    """Id of a live alert of this type whose affected area covers the point, if
+    the mirror's geofence index knows one (manual alerts included).
+
+    Costs no reads, so it only runs when the mirror is ready; claim_alert_key
+    makes the authoritative check against keyed alerts when the alert is written.
     """
-    Check if a new report triggers an alert based on rules.
+    if not active_alerts.ready:
+        return None
+    now = datetime.now().isoformat()
+    for _, alert_id, _ in active_alert_geofences.covering(
+            lat, lon, where=lambda alert: alert.contamination_type == contamination_type
+            and alert_live(alert.payload, now)):
+        return alert_id
+    return None
+
+def claim_alert_key(db, transaction, alert_data: dict) -> Tuple[str, bool, dict]:
+    """Create-if-absent for an automatic alert, inside a transaction.
+
+    The alert's id is its DEFAULT_RULES.keys key. The key cells around it are
+    read with point reads: a live alert keyed in the same cell, or one from a
+    neighbouring cell covering the alert's center, makes it a duplicate, whose
+    expiry is extended, and (existing_id, False, existing) is returned.
+    Otherwise the alert is written under its key, archiving an expired or
+    inactive alert that held the key before, and (key, True, alert_data) is
+    returned. Triggers racing for one area read each other's keys, so
+    Firestore serializes them and all but the first come back as duplicates.
+    """
+    contamination_type, lat, lon = alert_data["contaminationType"], alert_data["latitude"], alert_data["longitude"]
+    keys = DEFAULT_RULES.keys.nearby(contamination_type, lat, lon)
+    alerts = db.collection("alerts")
+    snapshots = {snapshot.id: snapshot
+                 for snapshot in db.get_all([alerts.document(key) for key in keys], transaction=transaction)}
+
+    now = datetime.now()
+    own = snapshots.get(keys[0])
+    for key in keys:
+        snapshot = snapshots.get(key)
+        existing = (snapshot.to_dict() or {}) if snapshot is not None and snapshot.exists else None
+        if not existing or not alert_live(existing, now.isoformat()):
+            continue
+        if key == keys[0] or (existing.get("latitude") is not None and existing.get("longitude") is not None
+                              and haversine_distance(lat, lon, existing["latitude"], existing["longitude"])
+                              <= affected_radius(existing)):
+            extended = DEFAULT_RULES.extended_expiry(existing, now)
+            if extended:
+                transaction.update(alerts.document(key), {"expiresAt": extended})
+                existing["expiresAt"] = extended
+            return key, False, existing
+
+    if own is not None and own.exists:
+        transaction.set(db.collection(ALERT_ARCHIVE_COLLECTION).document(), archive_record(keys[0], own.to_dict() or {}))
+    transaction.set(alerts.document(keys[0]), alert_data)
+    return keys[0], True, alert_data
+
+def extend_alert(db, transaction, alert_id: str) -> Optional[dict]:
+    """Extend a live alert that a new report matched, inside a transaction.
+    Returns the alert as extended, or None when it is no longer live."""
+    ref = db.collection("alerts").document(alert_id)
+    snapshot = ref.get(transaction=transaction)
+    existing = (snapshot.to_dict() or {}) if snapshot.exists else {}
+    if not alert_live(existing):
+        return None
+    extended = DEFAULT_RULES.extended_expiry(existing, datetime.now())
+    if extended:
+        transaction.update(ref, {"expiresAt": extended})
+        existing["expiresAt"] = extended
+    return existing
+
+def _in_transaction(operation, *args):
+    """operation(db, transaction, *args) in a Firestore transaction of its own"""
+    from google.cloud.firestore import transactional
+
+    db = get_firestore_client()
+
+    @transactional
+    def run(transaction):
+        return operation(db, transaction, *args)
+
+    return run(db.transaction())
+
+def create_alert(alert_data: dict) -> Tuple[str, bool]:
+    """claim_alert_key in a transaction of its own: (alert_id, created)"""
+    alert_id, created, _ = _in_transaction(claim_alert_key, alert_data)
+    return alert_id, created
+
+def affected_radius(alert: dict) -> float:
+    """Radius in meters of an alert document's affected area"""
+    radius = (alert.get("affectedArea") or {}).get("radius")
+    return radius if isinstance(radius, (int, float)) else ALERT_DEFAULT_RADIUS_METERS
+
+def evaluate_alert(new_report: dict, report_saved: bool = True) -> Tuple[Optional[str], Optional[dict]]:
+    """
+    Check if a new report triggers an alert based on DEFAULT_RULES
+    (services/alert_rules.py).
     1. 3+ reports of same contamination within 5km in 24h.
     2. Severity 'critical' triggers immediate alert.
     3. Arsenic triggers immediate alert (2km radius).
     4. Bacteria in water source (handled by same cluster logic for now).
+
+    Only reads. Returns (existing_alert_id, None) when a live alert already
+    covers the report (extend_alert then extends it), (None, alert_data) when a new alert should be written,
+    and (None, None) when no rule fires. Pass report_saved=False when the
+    report is not in Firestore yet; it is then counted towards its own cluster.
+    The cluster window is measured back from the report's reportedAt, so a
+    report evaluated late by the alert queue is judged as of when it was made.
     """
-    try:
-        db = get_firestore_client()
-        contamination_type = new_report.get("contaminationType")
-        severity = new_report.get("severityLevel")
-        lat = new_report.get("latitude")
-        lon = new_report.get("longitude")
-        
-        if not contamination_type or lat is None or lon is None:
-            return None
+    db = get_firestore_client()
+    contamination_type = new_report.get("contaminationType")
+    severity = new_report.get("severityLevel")
+    lat = new_report.get("latitude")
+    lon = new_report.get("longitude")
+    
+    if not contamination_type or lat is None or lon is None:
+        return None, None
 
-        triggered_rule = None
-        alert_radius = CLUSTER_RADIUS
-        
-        # Rule 2: IF severity = "critical" -> Immediate alert
-        if severity == "critical":
-            triggered_rule = "Rule 2: Critical Severity"
-            alert_radius = 5000 # Default critical radius
-            
-        # Rule 3: IF arsenic detected -> Alert all users within 2km radius
-        elif contamination_type == "arsenic":
-            triggered_rule = "Rule 3: Arsenic Detected"
-            alert_radius = ARSENIC_RADIUS
-
-        # Cluster Rule: IF 3+ reports of same type within 5km in 24h
-        if not triggered_rule:
-            since_time = datetime.now() - timedelta(hours=TIME_WINDOW_HOURS)
+    # Rules 2 and 3: critical severity or arsenic -> immediate alert
+    fired = DEFAULT_RULES.immediate(severity, contamination_type)
+
+    # Cluster Rule: IF 3+ reports of same type within 5km in 24h
+    if not fired:
+        nearby_count = 0 if report_saved else 1
+        now = datetime.now()
+        reported = report_time(new_report, now)
+        if recent_water_reports.ready and (now - reported).total_seconds() <= MIRROR_MAX_LAG_SECONDS:
+            # Sliding window over the mirror: no reads, only reports near the point are measured
+            nearby_count += report_clusters.count(contamination_type, lat, lon, reported)
+        else:
+            since_time = reported - timedelta(hours=TIME_WINDOW_HOURS)
             reports_ref = db.collection("waterReports")
             query = reports_ref.where(filter=FieldFilter("contaminationType", "==", contamination_type)) \
-                              .where(filter=FieldFilter("reportedAt", ">", since_time.isoformat()))
-            
-            docs = query.stream()
-            nearby_reports = []
-            for doc in docs:
+                              .where(filter=FieldFilter("reportedAt", ">", since_time.isoformat())) \
+                              .select(["latitude", "longitude"])
+
+            points = []
+            for doc in query.stream():
                 data = doc.to_dict()
-                r_lat = data.get("latitude")
-                r_lon = data.get("longitude")
-                if r_lat is not None and r_lon is not None:
-                    dist = haversine_distance(lat, lon, r_lat, r_lon)
-                    if dist <= CLUSTER_RADIUS:
-                        nearby_reports.append(doc.id)
-            
-            if len(nearby_reports) >= CLUSTER_THRESHOLD:
-                triggered_rule = f"Rule 1: {len(nearby_reports)} Reports Cluster"
-                alert_radius = CLUSTER_RADIUS
-
-        if triggered_rule:
-            # Check for existing active alert in that area to avoid duplicates
-            alerts_ref = db.collection("alerts")
-            active_alerts = alerts_ref.where(filter=FieldFilter("contaminationType", "==", contamination_type)) \
-                                     .where(filter=FieldFilter("status", "==", "active")).stream()
-            
-            for alert_doc in active_alerts:
-                alert_data = alert_doc.to_dict()
-                a_lat = alert_data.get("latitude")
-                a_lon = alert_data.get("longitude")
-                if a_lat is not None and a_lon is not None:
-                    if haversine_distance(lat, lon, a_lat, a_lon) <= alert_radius:
-                        logger.info(f"ℹ️  Duplicate alert exists: {alert_doc.id}")
-                        return alert_doc.id
-
-            # Create new alert
-            alert_data = {
-                "triggerType": "automatic",
-                "triggeredBy": triggered_rule,
-                "contaminationType": contamination_type,
-                "affectedArea": {
-                    "center": GeoPoint(lat, lon),
-                    "radius": alert_radius
-                },
-                "latitude": lat,
-                "longitude": lon,
-                "severityLevel": severity or "unsafe",
-                "message": generate_alert_message(contamination_type, triggered_rule),
-                "createdAt": datetime.now().isoformat(),
-                "status": "active",
-                "affectedUsers": [],
-                "notificationsSent": 0,
-                "verified": False
-            }
-            
-            alert_id = add_document("alerts", alert_data)
-            logger.info(f"🚨 ALERT TRIGGERED: {alert_id} via {triggered_rule}")
-            
-            # Simulate notifications
-            send_mock_notifications(alert_data)
-            
+                if data.get("latitude") is not None and data.get("longitude") is not None:
+                    points.append((data["latitude"], data["longitude"]))
+
+            # One vectorized distance pass over the window's reports
+            if points:
+                r_lats, r_lons = zip(*points)
+                nearby_count += int((distances_from(lat, lon, r_lats, r_lons) <= CLUSTER_RADIUS).sum())
+
+        fired = DEFAULT_RULES.cluster(nearby_count)
+
+    if not fired:
+        return None, None
+    triggered_rule, alert_radius = fired
+
+    # An active alert of this type already covering the report makes a new one a duplicate
+    existing_id = _covering_alert_id(contamination_type, lat, lon)
+    if existing_id:
+        logger.info(f"ℹ️  Duplicate alert exists: {existing_id}")
+        return existing_id, None
+
+    # New alert
+    now = datetime.now()
+    alert_data = {
+        "triggerType": "automatic",
+        "triggeredBy": triggered_rule,
+        "contaminationType": contamination_type,
+        "affectedArea": {
+            "center": GeoPoint(lat, lon),
+            "radius": alert_radius
+        },
+        "latitude": lat,
+        "longitude": lon,
+        "severityLevel": severity or "unsafe",
+        "message": generate_alert_message(contamination_type, triggered_rule),
+        "createdAt": now.isoformat(),
+        "expiresAt": DEFAULT_RULES.expires_at(triggered_rule, now),
+        "status": "active",
+        "affectedUsers": [],
+        "notificationsSent": 0,
+        "verified": False
+    }
+    return None, with_geohash(alert_data)
+
+async def check_and_trigger_alerts(new_report: dict):
+    """Evaluate an already-saved report and write the alert it triggers, if any"""
+    try:
+        existing_id, alert_data = evaluate_alert(new_report)
+        if existing_id:
+            _in_transaction(extend_alert, existing_id)
+            return existing_id
+        if not alert_data:
+            return None
+
+        alert_id, created = create_alert(alert_data)
+        if not created:
+            logger.info(f"ℹ️  Duplicate alert exists: {alert_id}")
             return alert_id
+        active_alerts.apply_local_write(alert_id, alert_data)
+        logger.info(f"🚨 ALERT TRIGGERED: {alert_id} via {alert_data['triggeredBy']}")
+        
+        # Notify subscribers inside the alert area in the background
+        dispatch_alert(alert_id, alert_data)
+        
+        return alert_id
             
     except Exception as e:
         logger.error(f"❌ Error in alert engine: {str(e)}")
@@ -118,7 +286,3 @@ def generate_alert_message(contamination, rule):
     if "Critical" in rule:
         return f"CRITICAL: Severe water contamination reported. Use only verified safe water sources immediately."
     return f"ALERT: A cluster of {contamination} reports detected. Increased risk of water contamination in this area."
-
-def send_mock_notifications(alert):
-    logger.info(f"📱 MOCK SMS: [LUIT] {alert['message']} (Radius: {alert['affectedArea']['radius']}m)")
-    logger.info(f"🔔 MOCK PUSH: Alert triggered for {alert['contaminationType']} near your location.")
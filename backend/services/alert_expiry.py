@@ -0,0 +1,100 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Run the expiry job in-process every this many minutes (0 = only via scripts/expire_alerts.py)
+ALERT_EXPIRY_INTERVAL_MINUTES = float(os.getenv("ALERT_EXPIRY_INTERVAL_MINUTES", 10))
+# Alerts archived per transaction; each one is two writes (archive copy and delete)
+ALERT_EXPIRY_BATCH_SIZE = int(os.getenv("ALERT_EXPIRY_BATCH_SIZE", 200))
+
+def expired_alert_refs(db, now: str, limit: int = ALERT_EXPIRY_BATCH_SIZE) -> List:
+    """References to active alerts whose expiresAt is at or before now, soonest expired first"""
+    from google.cloud.firestore import FieldFilter
+
+    query = db.collection("alerts") \
+        .where(filter=FieldFilter("status", "==", "active")) \
+        .where(filter=FieldFilter("expiresAt", "<=", now)) \
+        .order_by("expiresAt").limit(limit).select([])
+    return [doc.reference for doc in query.stream()]
+
+def archive_alerts(db, refs: List) -> List[str]:
+    """Move alerts that are still expired to the archive in one transaction.
+
+    Each alert is re-read first, so one extended or dismissed since it was
+    queried stays where it is. Returns the ids archived.
+    """
+    from google.cloud.firestore import transactional
+    from services.alert_engine import ALERT_ARCHIVE_COLLECTION, alert_live, archive_record
+
+    @transactional
+    def archive(transaction) -> List[str]:
+        now = datetime.now().isoformat()
+        archived = []
+        for snapshot in db.get_all(refs, transaction=transaction):
+            data = (snapshot.to_dict() or {}) if snapshot.exists else None
+            if not data or data.get("status") != "active" or alert_live(data, now):
+                continue
+            transaction.set(db.collection(ALERT_ARCHIVE_COLLECTION).document(), archive_record(snapshot.id, data))
+            transaction.delete(snapshot.reference)
+            archived.append(snapshot.id)
+        return archived
+
+    return archive(db.transaction())
+
+def run_expiry_job(dry_run: bool = False, max_batches: Optional[int] = None, db=None) -> dict:
+    """Archive every alert past its expiresAt, ALERT_EXPIRY_BATCH_SIZE at a time"""
+    from services.live_mirror import active_alerts
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    started = time.perf_counter()
+    now = datetime.now().isoformat()
+    summary = {"expired": 0, "archived": 0, "batches": 0}
+    while max_batches is None or summary["batches"] < max_batches:
+        refs = expired_alert_refs(db, now)
+        if not refs:
+            break
+        summary["batches"] += 1
+        summary["expired"] += len(refs)
+        if dry_run:
+            # Nothing moves, so the next query would return the same alerts
+            break
+        archived = archive_alerts(db, refs)
+        for alert_id in archived:
+            active_alerts.apply_local_write(alert_id, None)
+        summary["archived"] += len(archived)
+        if len(refs) < ALERT_EXPIRY_BATCH_SIZE:
+            break
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    if summary["expired"]:
+        logger.info(f"🗄️  Alert expiry: {summary}")
+    return summary
+
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def start_expiry_scheduler(interval_minutes: float = ALERT_EXPIRY_INTERVAL_MINUTES):
+    """Run the expiry job every interval_minutes on a daemon thread (no-op if 0)"""
+    global _scheduler
+    if interval_minutes <= 0 or _scheduler is not None:
+        return
+
+    def loop():
+        while not _stop.wait(interval_minutes * 60):
+            try:
+                run_expiry_job()
+            except Exception as e:
+                logger.error(f"❌ Alert expiry job failed: {str(e)}")
+
+    _scheduler = threading.Thread(target=loop, name="alert-expiry", daemon=True)
+    _scheduler.start()
+    logger.info(f"🗄️  Alert expiry job scheduled every {interval_minutes:g} min")
+
+def stop_expiry_scheduler():
+    _stop.set()
@@ -0,0 +1,265 @@
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One entry per submitted water report, keyed by the report id
+ALERT_QUEUE_COLLECTION = "alertQueue"
+
+PENDING, PROCESSING, DONE, FAILED = "pending", "processing", "done", "failed"
+
+# ALERT_WORKER=0 leaves the queue to scripts/alert_worker.py (or another replica)
+ALERT_WORKER = os.getenv("ALERT_WORKER", "1").lower() in ("1", "true", "yes")
+ALERT_QUEUE_POLL_SECONDS = float(os.getenv("ALERT_QUEUE_POLL_SECONDS", 2))
+ALERT_QUEUE_BATCH_SIZE = int(os.getenv("ALERT_QUEUE_BATCH_SIZE", 20))
+# A claimed entry not finished within the lease is picked up again, so a
+# crashed or failing worker delays a report instead of losing it
+ALERT_QUEUE_LEASE_SECONDS = float(os.getenv("ALERT_QUEUE_LEASE_SECONDS", 60))
+ALERT_QUEUE_MAX_ATTEMPTS = int(os.getenv("ALERT_QUEUE_MAX_ATTEMPTS", 5))
+
+# The report fields the alert rules read, copied into the entry so the worker needs no extra read
+RULE_FIELDS = ["contaminationType", "severityLevel", "latitude", "longitude", "reportedAt"]
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def submit_report(report_data: dict) -> str:
+    """Write a water report, its alert queue entry and its daily rollup count in one batch commit.
+
+    Returns the report id straight away; the worker evaluates the alert rules
+    later, at least once, and GET /reporting/reports/{id}/alert-status shows
+    the outcome.
+    """
+    from services.alert_engine import recent_water_reports
+    from services.firebase_service import get_firestore_client
+    from services.geohash import with_geohash
+    from services.rollups import record_rollup
+
+    db = get_firestore_client()
+    report_ref = db.collection("waterReports").document()
+    batch = db.batch()
+    batch.set(report_ref, with_geohash(report_data))
+    batch.set(db.collection(ALERT_QUEUE_COLLECTION).document(report_ref.id), {
+        "reportId": report_ref.id,
+        "report": {field: report_data.get(field) for field in RULE_FIELDS},
+        "status": PENDING,
+        "attempts": 0,
+        "enqueuedAt": _now().isoformat(),
+    })
+    record_rollup(batch, "waterReports", report_data, db=db)
+    batch.commit()
+    # The cluster window counts the report from now on, before the worker evaluates it
+    recent_water_reports.apply_local_write(report_ref.id, report_data)
+    _wake.set()
+    return report_ref.id
+
+def get_alert_status(report_id: str) -> Optional[dict]:
+    """Where a report's alert evaluation stands, or None for an unknown report"""
+    from services.firebase_service import get_document
+
+    entry = get_document(ALERT_QUEUE_COLLECTION, report_id)
+    if entry is None:
+        return None
+    return {
+        "reportId": report_id,
+        "status": entry.get("status"),
+        "alertTriggered": bool(entry.get("alertId")),
+        "alertId": entry.get("alertId"),
+        "alertCreatedAt": entry.get("alertCreatedAt"),
+        "newAlert": entry.get("newAlert", False),
+        "attempts": entry.get("attempts", 0),
+        "enqueuedAt": entry.get("enqueuedAt"),
+        "processedAt": entry.get("processedAt"),
+        "error": entry.get("error"),
+    }
+
+def _claim(db, entry_ref) -> Optional[dict]:
+    """Take the lease on an entry that is pending or whose lease ran out.
+
+    Runs in a transaction, so of several workers polling the same entry only
+    one claims it. Returns the entry, or None when it is not available.
+    """
+    from google.cloud.firestore import transactional
+
+    @transactional
+    def claim(transaction) -> Optional[dict]:
+        snapshot = entry_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        entry = snapshot.to_dict() or {}
+        now = _now()
+        status = entry.get("status")
+        if status != PENDING and not (status == PROCESSING and (entry.get("leaseUntil") or "") < now.isoformat()):
+            return None
+        if entry.get("attempts", 0) >= ALERT_QUEUE_MAX_ATTEMPTS:
+            transaction.update(entry_ref, {"status": FAILED, "leaseUntil": None, "processedAt": now.isoformat()})
+            logger.error(f"❌ Alert queue: giving up on report {entry_ref.id} after {entry.get('attempts')} attempts")
+            return None
+        transaction.update(entry_ref, {
+            "status": PROCESSING,
+            "attempts": entry.get("attempts", 0) + 1,
+            "leaseUntil": (now + timedelta(seconds=ALERT_QUEUE_LEASE_SECONDS)).isoformat(),
+            "worker": WORKER_ID,
+        })
+        return entry
+
+    return claim(db.transaction())
+
+def _complete(db, entry_ref, alert_data: Optional[dict], existing_id: Optional[str]) -> Optional[Tuple[Optional[str], bool]]:
+    """Claim the new alert's key, if any, or extend the existing alert, and mark
+    the entry done in one transaction.
+
+    Returns (alert_id, created); created is False when the alert already
+    existed (see claim_alert_key and extend_alert). The entry also keeps the
+    alert's createdAt, since a keyed alert id is reused once the alert expires
+    (GET /alerts/{id}?createdAt= finds it in the archive). An entry that is
+    already done was completed by another delivery, so nothing is written and
+    None is returned: each report raises at most one alert.
+    """
+    from google.cloud.firestore import transactional
+    from services.alert_engine import claim_alert_key, extend_alert
+
+    @transactional
+    def complete(transaction) -> Optional[Tuple[Optional[str], bool]]:
+        snapshot = entry_ref.get(transaction=transaction)
+        if not snapshot.exists or (snapshot.to_dict() or {}).get("status") in (DONE, FAILED):
+            return None
+        alert_id, created, alert = existing_id, False, None
+        if alert_data:
+            alert_id, created, alert = claim_alert_key(db, transaction, alert_data)
+        elif existing_id:
+            alert = extend_alert(db, transaction, existing_id)
+        transaction.update(entry_ref, {
+            "status": DONE,
+            "alertId": alert_id,
+            "alertCreatedAt": (alert or {}).get("createdAt"),
+            "newAlert": created,
+            "leaseUntil": None,
+            "error": None,
+            "processedAt": _now().isoformat(),
+        })
+        return alert_id, created
+
+    return complete(db.transaction())
+
+def process_entry(db, entry_ref) -> bool:
+    """Claim one queue entry, evaluate its report and record the outcome. Returns
+    True when this call completed the entry."""
+    from services.alert_engine import evaluate_alert, recent_water_reports
+    from services.live_mirror import active_alerts
+    from services.notifications import dispatch_alert
+
+    entry = _claim(db, entry_ref)
+    if entry is None:
+        return False
+    report_id = entry_ref.id
+    report = entry.get("report") or {}
+    # A worker in another process has not seen the report yet: count it
+    # towards its own cluster without waiting for the listener or poll
+    recent_water_reports.apply_local_write(report_id, report)
+    try:
+        existing_id, alert_data = evaluate_alert(report)
+        outcome = _complete(db, entry_ref, alert_data, existing_id)
+        if outcome is None:
+            return False
+    except Exception as e:
+        # Keep the lease: the entry is retried once it runs out
+        logger.error(f"❌ Alert queue: report {report_id} failed: {str(e)}")
+        entry_ref.update({"error": str(e)})
+        _stats["failed"] += 1
+        return False
+
+    enqueued_at = entry.get("enqueuedAt")
+    if enqueued_at:
+        _stats["lastLagSeconds"] = round((_now() - datetime.fromisoformat(enqueued_at)).total_seconds(), 3)
+    _stats["processed"] += 1
+    _stats["lastProcessedAt"] = _now().isoformat()
+    alert_id, created = outcome
+    if created:
+        active_alerts.apply_local_write(alert_id, alert_data)
+        logger.info(f"🚨 ALERT TRIGGERED: {alert_id} via {alert_data['triggeredBy']} (report {report_id})")
+        dispatch_alert(alert_id, alert_data)
+    elif alert_data:
+        logger.info(f"ℹ️  Duplicate alert exists: {alert_id} (report {report_id})")
+    return True
+
+def _due_entries(db) -> List:
+    """References to pending entries, oldest first, then entries whose lease ran out"""
+    from google.cloud.firestore import FieldFilter
+
+    queue = db.collection(ALERT_QUEUE_COLLECTION)
+    pending = queue.where(filter=FieldFilter("status", "==", PENDING)) \
+        .order_by("enqueuedAt").limit(ALERT_QUEUE_BATCH_SIZE).select([]).stream()
+    expired = queue.where(filter=FieldFilter("status", "==", PROCESSING)) \
+        .where(filter=FieldFilter("leaseUntil", "<", _now().isoformat())) \
+        .limit(ALERT_QUEUE_BATCH_SIZE).select([]).stream()
+    return [doc.reference for doc in pending] + [doc.reference for doc in expired]
+
+def drain(db=None, max_batches: Optional[int] = None) -> int:
+    """Process due entries until none are left (or max_batches were taken). Returns how many completed."""
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+    completed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        refs = _due_entries(db)
+        if not refs:
+            break
+        batches += 1
+        completed += sum(process_entry(db, ref) for ref in refs)
+    return completed
+
+_stats = {"processed": 0, "failed": 0, "lastLagSeconds": None, "lastProcessedAt": None}
+_worker: Optional[threading.Thread] = None
+_stop = threading.Event()
+_wake = threading.Event()
+
+def queue_stats(db=None) -> dict:
+    """Queue depth and lag (age of the oldest pending entry), plus this process's worker counters"""
+    from google.cloud.firestore import FieldFilter
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    queue = db.collection(ALERT_QUEUE_COLLECTION)
+    depth = {status: int(queue.where(filter=FieldFilter("status", "==", status)).count().get()[0][0].value)
+             for status in (PENDING, PROCESSING, FAILED)}
+    oldest = list(queue.where(filter=FieldFilter("status", "==", PENDING))
+                  .order_by("enqueuedAt").limit(1).select(["enqueuedAt"]).stream())
+    lag = 0.0
+    if oldest:
+        lag = max(0.0, (_now() - datetime.fromisoformat(oldest[0].to_dict()["enqueuedAt"])).total_seconds())
+    return {"depth": depth, "lagSeconds": round(lag, 3), "worker": worker_status()}
+
+def worker_status() -> dict:
+    return {"id": WORKER_ID, "running": _worker is not None and _worker.is_alive(), **_stats}
+
+def run_worker(poll_seconds: float = ALERT_QUEUE_POLL_SECONDS):
+    """Drain the queue whenever a report is submitted here, and every poll_seconds, until stopped"""
+    logger.info(f"🚦 Alert worker {WORKER_ID} polling every {poll_seconds:g}s")
+    while not _stop.is_set():
+        _wake.clear()
+        try:
+            drain()
+        except Exception as e:
+            logger.error(f"❌ Alert worker: {str(e)}")
+        _wake.wait(poll_seconds)
+
+def start_alert_worker():
+    """Run the worker on a daemon thread in this process (no-op with ALERT_WORKER=0)"""
+    global _worker
+    if not ALERT_WORKER or _worker is not None:
+        return
+    _worker = threading.Thread(target=run_worker, name="alert-worker", daemon=True)
+    _worker.start()
+
+def stop_alert_worker():
+    _stop.set()
+    _wake.set()
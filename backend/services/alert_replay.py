@@ -0,0 +1,200 @@
+import logging
+import math
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from services.alert_rules import AlertRules
+from services.distance import EARTH_RADIUS_METERS, haversine_distance
+from services.hotspots import _expand
+
+logger = logging.getLogger(__name__)
+
+REPLAY_FIELDS = ["contaminationType", "severityLevel", "reportedAt", "latitude", "longitude"]
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Two points closer than d meters differ by at most d / this in latitude (a hair under the true value)
+_METERS_PER_DEGREE_LAT = math.radians(EARTH_RADIUS_METERS) * 0.999
+
+class ReplayReports:
+    """Water reports ready to replay: the ones the rules can evaluate (a type,
+    coordinates and an ISO reportedAt), in the order they arrived.
+
+    Reports are ordered by (reportedAt, id). Times are kept as microseconds,
+    which order like the reportedAt strings the live rules compare.
+    """
+
+    def __init__(self, reports: Iterable[dict]):
+        import numpy as np
+
+        rows = []
+        for report in reports:
+            reported_at = report.get("reportedAt")
+            lat, lon = report.get("latitude"), report.get("longitude")
+            contamination_type = report.get("contaminationType")
+            if not isinstance(reported_at, str) or not isinstance(contamination_type, str) or not contamination_type \
+                    or not isinstance(lat, (int, float)) or not isinstance(lon, (int, float)):
+                continue
+            try:
+                at = datetime.fromisoformat(reported_at).replace(tzinfo=None)
+            except ValueError:
+                continue
+            rows.append(((at - _EPOCH) // timedelta(microseconds=1), report.get("id", ""), reported_at,
+                         contamination_type, report.get("severityLevel"), lat, lon))
+        rows.sort(key=lambda row: (row[0], row[1]))
+
+        self.ids = [row[1] for row in rows]
+        self.reported_at = [row[2] for row in rows]
+        self.types = [row[3] for row in rows]
+        self.severities = [row[4] for row in rows]
+        self.micros = np.array([row[0] for row in rows], dtype=np.int64)
+        self.latitudes = np.array([row[5] for row in rows], dtype=np.float64)
+        self.longitudes = np.array([row[6] for row in rows], dtype=np.float64)
+        type_names = sorted(set(self.types))
+        codes = {name: code for code, name in enumerate(type_names)}
+        self.type_codes = np.array([codes[t] for t in self.types], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+def cluster_counts(reports: ReplayReports, radius_meters: float, window_hours: float):
+    """For every report, what the cluster rule counts when it arrives: reports of
+    its type within radius_meters, reported in the window_hours before it, itself
+    and earlier arrivals included. Returns a NumPy array in replay order.
+
+    Reports are keyed by (type, grid cell) with cells radius_meters wide in an
+    equirectangular projection, and sorted by key and arrival. A report's
+    candidates in each of the 3x3 cells around it are then one contiguous
+    slice, found by two binary searches, so only reports in that slice are
+    measured, all at once per chunk.
+    """
+    import numpy as np
+
+    n = len(reports)
+    counts = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return counts
+    lat, lon = reports.latitudes, reports.longitudes
+
+    # Longitude is scaled at the latitude farthest from the equator, so
+    # projected distances never exceed true ones and cells one radius wide
+    # hold every neighbour in the 3x3 block
+    cos_low = math.cos(math.radians(min(float(np.abs(lat).max()), 89.0)))
+    side = radius_meters * 1.001
+    x = np.radians(lon - lon.mean()) * cos_low * EARTH_RADIUS_METERS
+    y = np.radians(lat) * EARTH_RADIUS_METERS
+    cx = np.floor((x - x.min()) / side).astype(np.int64) + 1
+    cy = np.floor((y - y.min()) / side).astype(np.int64) + 1
+    width = int(cy.max()) + 2
+    keys = reports.type_codes * ((int(cx.max()) + 2) * width) + cx * width + cy
+
+    arrival = np.arange(n, dtype=np.int64)
+    # Earliest arrival still inside each report's window (reportedAt > now - window)
+    window_micros = int(window_hours * 3600 * 1_000_000)
+    first = np.searchsorted(reports.micros, reports.micros - window_micros, side="right")
+
+    order = np.lexsort((arrival, keys))
+    # Sorted by key then arrival, so (key, arrival) ranges are contiguous
+    composite = keys[order] * n + order
+
+    phi = np.radians(lat)
+    lam = np.radians(lon)
+    cos_phi = np.cos(phi)
+    # haversine(i, j) <= radius  <=>  a(i, j) <= sin^2(radius / 2R); no arcsin per pair
+    a_limit = math.sin(radius_meters / (2 * EARTH_RADIUS_METERS)) ** 2
+
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = (keys + dx * width + dy) * n
+            starts = np.searchsorted(composite, target + first, side="left")
+            sizes = np.searchsorted(composite, target + arrival, side="right") - starts
+            sources = np.flatnonzero(sizes)
+            for i, position in _expand(sources, sources, starts, sizes):
+                j = order[position]
+                a = np.sin((phi[j] - phi[i]) / 2) ** 2 + cos_phi[i] * cos_phi[j] * np.sin((lam[j] - lam[i]) / 2) ** 2
+                counts += np.bincount(i[a <= a_limit], minlength=n)
+    return counts
+
+def _simulate(reports: ReplayReports, rules: AlertRules, counts) -> dict:
+    """Run one rule set over the reports in arrival order, given its cluster counts"""
+    import numpy as np
+
+    immediate = np.array([(isinstance(s, str) and s in rules.severity_radius) or t in rules.type_radius
+                          for s, t in zip(reports.severities, reports.types)], dtype=bool)
+    candidates = np.flatnonzero(immediate | (counts >= rules.cluster_threshold))
+
+    # Live alerts per type, in the order raised, as [expires, key, lat, lon, radius,
+    # reach]. Only a few are live at once, so each check is a short loop: same
+    # key, or a cheap latitude test ahead of the haversine.
+    active: Dict[str, list] = {}
+    extend_micros = int(rules.extend_hours * 3600 * 1_000_000)
+    alerts = []
+    suppressed = extended = 0
+    for i in candidates.tolist():
+        now = int(reports.micros[i])
+        contamination_type = reports.types[i]
+        typed = active.setdefault(contamination_type, [])
+        if any(alert[0] <= now for alert in typed):
+            typed[:] = [alert for alert in typed if alert[0] > now]
+
+        lat, lon = float(reports.latitudes[i]), float(reports.longitudes[i])
+        key = rules.keys.key(contamination_type, lat, lon)
+        match = next((alert for alert in typed if alert[1] == key), None) or next(
+            (alert for alert in typed
+             if abs(alert[2] - lat) <= alert[5] and haversine_distance(lat, lon, alert[2], alert[3]) <= alert[4]), None)
+        if match is not None:
+            suppressed += 1
+            if extend_micros > 0 and now + extend_micros > match[0]:
+                match[0] = now + extend_micros
+                extended += 1
+            continue
+
+        severity = reports.severities[i]
+        triggered_rule, radius = rules.immediate(severity if isinstance(severity, str) else None, contamination_type) \
+            or rules.cluster(int(counts[i]))
+        ttl_micros = rules.ttl(triggered_rule) // timedelta(microseconds=1)
+        typed.append([now + ttl_micros, key, lat, lon, radius, radius / _METERS_PER_DEGREE_LAT])
+        alerts.append({"reportId": reports.ids[i], "reportedAt": reports.reported_at[i],
+                       "contaminationType": contamination_type, "severityLevel": severity or "unsafe",
+                       "triggeredBy": triggered_rule, "latitude": lat, "longitude": lon, "radius": radius})
+
+    return {"rules": rules.to_dict(), "label": rules.label(), "alertCount": len(alerts), "suppressed": suppressed,
+            "extended": extended, "byRule": dict(Counter(a["triggeredBy"].split(":")[0] for a in alerts)),
+            "byType": dict(Counter(a["contaminationType"] for a in alerts)), "alerts": alerts}
+
+def replay(reports: ReplayReports, rule_sets: List[AlertRules]) -> List[dict]:
+    """Which alerts each rule set would have raised over the reports, one result per rule set.
+
+    A report raises an alert when a rule fires and no live alert of its type
+    raised earlier in the replay covers it or has its key (rules.keys), as the
+    live engine does. Alerts expire after the rules' ttl for the rule that
+    raised them, and each report suppressed by one extends it by extend_hours.
+    Cluster counts depend only on the cluster radius and window, so rule sets
+    sharing those share one counting pass.
+    """
+    counts_by_window = {}
+    results = []
+    for rules in rule_sets:
+        key = (rules.cluster_radius, rules.window_hours)
+        if key not in counts_by_window:
+            started = time.perf_counter()
+            counts_by_window[key] = cluster_counts(reports, rules.cluster_radius, rules.window_hours)
+            logger.info(f"🔁 Cluster counts for {rules.cluster_radius:g}m/{rules.window_hours:g}h over "
+                        f"{len(reports)} reports in {time.perf_counter() - started:.2f}s")
+        results.append(_simulate(reports, rules, counts_by_window[key]))
+    return results
+
+def load_replay_reports(since: datetime, until: Optional[datetime] = None, db=None) -> Iterator[dict]:
+    """Water reports with since < reportedAt <= until, oldest first; only the fields the rules read"""
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+    from google.cloud.firestore import FieldFilter
+
+    query = db.collection("waterReports").where(filter=FieldFilter("reportedAt", ">", since.isoformat()))
+    if until is not None:
+        query = query.where(filter=FieldFilter("reportedAt", "<=", until.isoformat()))
+    for doc in query.order_by("reportedAt").select(REPLAY_FIELDS).stream():
+        yield {"id": doc.id, **(doc.to_dict() or {})}
@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Dict, List, Optional, Tuple
+
+from services.spatial_index import GridIndex
+
+# Constants for rules
+CLUSTER_THRESHOLD = 3
+CLUSTER_RADIUS = 5000  # 5km
+ARSENIC_RADIUS = 2000  # 2km
+CRITICAL_RADIUS = 5000  # 5km
+TIME_WINDOW_HOURS = 24
+
+# How long an automatic alert stays active, per rule, and how far a report
+# that would raise it again pushes its expiry out (0 = never extended)
+RULE_TTL_HOURS = {"cluster": 48, "severity": 72, "type": 168}
+EXTEND_HOURS = 24
+
+# The rule name prefix each kind of rule fires with
+_RULE_KINDS = {"Rule 1": "cluster", "Rule 2": "severity", "Rule 3": "type"}
+
+class AlertKeys:
+    """Deterministic ids for automatic alerts: contamination type plus a grid cell.
+
+    Cells are at least as wide as the largest alert radius, so an alert that
+    covers a point is keyed in the point's cell or one next to it, and finding
+    it takes a point read per cell instead of a query. Ids look like
+    "arsenic-600-5439"; changing the cell size changes every key.
+    """
+
+    def __init__(self, cell_size_meters: float):
+        self.cell_size_meters = cell_size_meters
+        self._grid = GridIndex(cell_size_meters)
+
+    def key(self, contamination_type: str, latitude: float, longitude: float) -> str:
+        row, col = self._grid.cell_of(latitude, longitude)
+        return f"{contamination_type}-{row}-{col}"
+
+    def nearby(self, contamination_type: str, latitude: float, longitude: float) -> List[str]:
+        """Keys of the cells an alert covering the point can be keyed in, the point's own first"""
+        # 1% over the cell size absorbs the grid's rounded meters-per-degree
+        cells = self._grid.cells_around(latitude, longitude, self.cell_size_meters * 1.01)
+        own = self.key(contamination_type, latitude, longitude)
+        return [own] + [key for key in (f"{contamination_type}-{row}-{col}" for row, col in cells) if key != own]
+
+class AlertRules:
+    """Declarative definition of the automatic alert rules, checked in this order:
+
+    1. severity: a report whose severityLevel is a key of severity_radius raises
+       an alert of that radius at once ("Rule 2: Critical Severity")
+    2. type: a report whose contaminationType is a key of type_radius raises an
+       alert of that radius at once ("Rule 3: Arsenic Detected")
+    3. cluster: cluster_threshold or more reports of one type (the new one
+       included) within cluster_radius of the new report, reported in the last
+       window_hours, raise an alert of cluster_radius ("Rule 1: N Reports Cluster")
+
+    A rule that fires is a duplicate while an active alert of the type is
+    keyed in the report's cell (see AlertKeys) or covers the report. The alert
+    expires ttl_hours[kind] after it was raised; each duplicate moves the
+    expiry to at least extend_hours from then.
+
+    The live engine evaluates DEFAULT_RULES; services/alert_replay.py evaluates
+    any number of rule sets over historical reports.
+    """
+
+    def __init__(self, cluster_threshold: int = CLUSTER_THRESHOLD, cluster_radius: float = CLUSTER_RADIUS,
+                 window_hours: float = TIME_WINDOW_HOURS, severity_radius: Optional[Dict[str, float]] = None,
+                 type_radius: Optional[Dict[str, float]] = None, ttl_hours: Optional[Dict[str, float]] = None,
+                 extend_hours: float = EXTEND_HOURS):
+        self.cluster_threshold = cluster_threshold
+        self.cluster_radius = cluster_radius
+        self.window_hours = window_hours
+        self.severity_radius = {"critical": CRITICAL_RADIUS} if severity_radius is None else dict(severity_radius)
+        self.type_radius = {"arsenic": ARSENIC_RADIUS} if type_radius is None else dict(type_radius)
+        self.ttl_hours = {**RULE_TTL_HOURS, **(ttl_hours or {})}
+        self.extend_hours = extend_hours
+        self.keys = AlertKeys(self.max_radius())
+
+    def max_radius(self) -> float:
+        """Largest radius an alert raised by these rules can have"""
+        return max([self.cluster_radius, *self.severity_radius.values(), *self.type_radius.values()])
+
+    def immediate(self, severity: Optional[str], contamination_type: str) -> Optional[Tuple[str, float]]:
+        """(rule, alert radius) when the report alone raises an alert, else None"""
+        if severity in self.severity_radius:
+            return f"Rule 2: {severity.title()} Severity", self.severity_radius[severity]
+        if contamination_type in self.type_radius:
+            return f"Rule 3: {contamination_type.title()} Detected", self.type_radius[contamination_type]
+        return None
+
+    def cluster(self, nearby_count: int) -> Optional[Tuple[str, float]]:
+        """(rule, alert radius) when nearby_count reports make a cluster, else None"""
+        if nearby_count >= self.cluster_threshold:
+            return f"Rule 1: {nearby_count} Reports Cluster", self.cluster_radius
+        return None
+
+    def ttl(self, triggered_by: str) -> timedelta:
+        """How long an alert raised by the rule named triggered_by stays active"""
+        kind = _RULE_KINDS.get(triggered_by.split(":")[0], "cluster")
+        return timedelta(hours=self.ttl_hours[kind])
+
+    def expires_at(self, triggered_by: str, now: datetime) -> str:
+        return (now + self.ttl(triggered_by)).isoformat()
+
+    def extended_expiry(self, alert: dict, now: datetime) -> Optional[str]:
+        """The later expiresAt a duplicate report gives the alert, or None when it keeps its own"""
+        expires_at = alert.get("expiresAt")
+        if self.extend_hours <= 0 or alert.get("triggerType") != "automatic" or not expires_at:
+            return None
+        extended = (now + timedelta(hours=self.extend_hours)).isoformat()
+        return extended if extended > expires_at else None
+
+    def to_dict(self) -> dict:
+        return {"clusterThreshold": self.cluster_threshold, "clusterRadius": self.cluster_radius,
+                "windowHours": self.window_hours, "severityRadius": dict(self.severity_radius),
+                "typeRadius": dict(self.type_radius), "ttlHours": dict(self.ttl_hours),
+                "extendHours": self.extend_hours}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AlertRules":
+        default = cls()
+        return cls(data.get("clusterThreshold", default.cluster_threshold),
+                   data.get("clusterRadius", default.cluster_radius),
+                   data.get("windowHours", default.window_hours),
+                   data.get("severityRadius"), data.get("typeRadius"), data.get("ttlHours"),
+                   data.get("extendHours", default.extend_hours))
+
+    def label(self) -> str:
+        return f"{self.cluster_threshold}+ in {self.cluster_radius / 1000:g}km/{self.window_hours:g}h"
+
+    def __repr__(self) -> str:
+        return f"AlertRules({self.to_dict()})"
+
+DEFAULT_RULES = AlertRules()
+
+def rule_grid(base: AlertRules = DEFAULT_RULES, cluster_thresholds: Optional[List[int]] = None,
+              cluster_radii: Optional[List[float]] = None, windows_hours: Optional[List[float]] = None) -> List[AlertRules]:
+    """Every combination of the given cluster parameters, the rest taken from base"""
+    return [AlertRules(threshold, radius, hours, base.severity_radius, base.type_radius, base.ttl_hours,
+                       base.extend_hours)
+            for threshold, radius, hours in product(cluster_thresholds or [base.cluster_threshold],
+                                                    cluster_radii or [base.cluster_radius],
+                                                    windows_hours or [base.window_hours])]
@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+from google.cloud.firestore_v1.bulk_writer import BulkRetry, BulkWriterOptions, SendMode
+
+logger = logging.getLogger(__name__)
+
+# BulkWriter ramps from the initial rate towards the max, committing batches
+# of up to 20 writes in parallel on its own executor.
+BULK_INITIAL_OPS_PER_SECOND = int(os.getenv("BULK_INITIAL_OPS_PER_SECOND", 1000))
+BULK_MAX_OPS_PER_SECOND = int(os.getenv("BULK_MAX_OPS_PER_SECOND", 10000))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", 5))
+PROGRESS_EVERY = 1000
+
+def _run(operations: Iterable, label: str, db=None,
+         on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Push (method, reference, data) operations through one Firestore BulkWriter.
+
+    Failed writes are retried with exponential backoff up to BULK_MAX_ATTEMPTS.
+    Progress is logged every PROGRESS_EVERY successful writes and passed to
+    on_progress if provided.
+    """
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    writer = db.bulk_writer(options=BulkWriterOptions(
+        initial_ops_per_second=BULK_INITIAL_OPS_PER_SECOND,
+        max_ops_per_second=BULK_MAX_OPS_PER_SECOND,
+        mode=SendMode.parallel,
+        retry=BulkRetry.exponential,
+    ))
+
+    lock = threading.Lock()
+    stats = {"written": 0, "failed": 0}
+
+    def on_result(reference, result, bulk_writer):
+        with lock:
+            stats["written"] += 1
+            done = stats["written"]
+        if done % PROGRESS_EVERY == 0:
+            logger.info(f"⏳ {label}: {done} written")
+            if on_progress:
+                on_progress(done)
+
+    def on_error(failure, bulk_writer) -> bool:
+        if failure.attempts < BULK_MAX_ATTEMPTS:
+            return True
+        with lock:
+            stats["failed"] += 1
+        logger.error(f"❌ {label}: giving up on {failure.operation.reference.path} ({failure.message})")
+        return False
+
+    writer.on_write_result(on_result)
+    writer.on_write_error(on_error)
+
+    started = time.monotonic()
+    queued = 0
+    try:
+        for method, reference, data in operations:
+            if method == "delete":
+                writer.delete(reference)
+            elif method == "set":
+                writer.set(reference, data)
+            else:
+                writer.update(reference, data)
+            queued += 1
+    finally:
+        writer.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"✅ {label}: {stats['written']}/{queued} written in {elapsed:.2f}s ({stats['failed']} failed)")
+    if on_progress and stats["written"] % PROGRESS_EVERY:
+        on_progress(stats["written"])
+    return {"written": stats["written"], "failed": stats["failed"], "seconds": round(elapsed, 3)}
+
+def bulk_delete(references: Iterable, label: str = "bulk delete", db=None,
+                on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Delete every document reference, returns {written, failed, seconds}"""
+    return _run((("delete", ref, None) for ref in references), label, db, on_progress)
+
+def bulk_update(references: Iterable, data: dict, label: str = "bulk update", db=None,
+                on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Apply the same field update to every document reference"""
+    return _run((("update", ref, data) for ref in references), label, db, on_progress)
+
+def bulk_update_documents(updates: Iterable, label: str = "bulk update", db=None,
+                          on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Apply a per-document update for every (reference, data) pair"""
+    return _run((("update", ref, data) for ref, data in updates), label, db, on_progress)
+
+def bulk_set_documents(writes: Iterable, label: str = "bulk set", db=None,
+                       on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Create or overwrite the document for every (reference, data) pair"""
+    return _run((("set", ref, data) for ref, data in writes), label, db, on_progress)
+
+def delete_query(query, label: str = "bulk delete", db=None,
+                 on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """Delete everything a query matches. Only document names are read."""
+    return bulk_delete((doc.reference for doc in query.select([]).stream()), label, db, on_progress)
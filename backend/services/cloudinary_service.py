@@ -1,25 +1,40 @@
-import cloudinary
-import cloudinary.uploader
 from config import get_settings
 import base64
 import io
 from PIL import Image
 import tempfile
 import os
+import threading
 
-settings = get_settings()
+_cloudinary = None
+_config_lock = threading.Lock()
 
-print(f"\n🔧 CLOUDINARY CONFIG:")
-print(f"   Cloud Name: {settings.cloudinary_cloud_name}")
-print(f"   API Key: {'SET' if settings.cloudinary_api_key else 'MISSING'}")
-print(f"   API Secret: {'SET' if settings.cloudinary_api_secret else 'MISSING'}\n")
+def get_cloudinary():
+    """Import and configure the Cloudinary SDK on first use instead of at import time"""
+    global _cloudinary
+    if _cloudinary is not None:
+        return _cloudinary
 
-# Configure Cloudinary
-cloudinary.config(
-    cloud_name=settings.cloudinary_cloud_name,
-    api_key=settings.cloudinary_api_key,
-    api_secret=settings.cloudinary_api_secret
-)
+    with _config_lock:
+        if _cloudinary is None:
+            import cloudinary
+            import cloudinary.uploader
+
+            settings = get_settings()
+
+            print(f"\n🔧 CLOUDINARY CONFIG:")
+            print(f"   Cloud Name: {settings.cloudinary_cloud_name}")
+            print(f"   API Key: {'SET' if settings.cloudinary_api_key else 'MISSING'}")
+            print(f"   API Secret: {'SET' if settings.cloudinary_api_secret else 'MISSING'}\n")
+
+            # Configure Cloudinary
+            cloudinary.config(
+                cloud_name=settings.cloudinary_cloud_name,
+                api_key=settings.cloudinary_api_key,
+                api_secret=settings.cloudinary_api_secret
+            )
+            _cloudinary = cloudinary
+    return _cloudinary
 
 async def upload_image_to_cloudinary(image_base64: str, folder: str = "luit") -> dict:
     """
@@ -54,7 +69,7 @@ async def upload_image_to_cloudinary(image_base64: str, folder: str = "luit") ->
         
         # Upload to Cloudinary
         print(f"   Uploading to Cloudinary...")
-        result = cloudinary.uploader.upload(
+        result = get_cloudinary().uploader.upload(
             tmp_path,
             folder=folder,
             resource_type="image"
@@ -93,7 +108,7 @@ async def delete_image_from_cloudinary(public_id: str) -> dict:
     """Delete image from Cloudinary"""
     try:
         print(f"\n🗑️  DELETING: {public_id}")
-        result = cloudinary.uploader.destroy(public_id)
+        result = get_cloudinary().uploader.destroy(public_id)
         print(f"✅ DELETED\n")
         
         return {
@@ -111,7 +126,7 @@ async def delete_image_from_cloudinary(public_id: str) -> dict:
 async def get_image_url(public_id: str) -> str:
     """Generate secure URL for Cloudinary image"""
     try:
-        url = cloudinary.CloudinaryResource(public_id).build_url(secure=True)
+        url = get_cloudinary().CloudinaryResource(public_id).build_url(secure=True)
         return url
     except Exception as e:
         return None
@@ -0,0 +1,212 @@
+import logging
+import threading
+from bisect import bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from services.live_mirror import LiveMirror
+from services.spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+# Grid cells per cluster radius: smaller cells put more of the circle in
+# cells that are counted whole, at the cost of visiting more cells
+CELLS_PER_RADIUS = 2
+
+class RecentReport:
+    """Fields of a water report the cluster rule reads"""
+    __slots__ = ("id", "reported_at", "contamination_type", "latitude", "longitude")
+
+    FIELDS = ["reportedAt", "contaminationType", "latitude", "longitude"]
+
+    def __init__(self, id: str, reported_at, contamination_type, latitude, longitude):
+        self.id = id
+        self.reported_at = reported_at
+        self.contamination_type = contamination_type
+        self.latitude = latitude
+        self.longitude = longitude
+
+    @classmethod
+    def from_dict(cls, id: str, data: dict) -> "RecentReport":
+        return cls(id, data.get("reportedAt"), data.get("contaminationType"),
+                   data.get("latitude"), data.get("longitude"))
+
+def window_start(window_hours: float, now: Optional[datetime] = None) -> str:
+    """reportedAt values strictly after this ISO string are inside the window.
+
+    reportedAt is stored as a local-time ISO string and compared as a string,
+    exactly like the Firestore range filter does.
+    """
+    return ((now or datetime.now()) - timedelta(hours=window_hours)).isoformat()
+
+class WindowMirror(LiveMirror):
+    """LiveMirror of the documents whose reportedAt falls in the last window_hours.
+
+    Polling re-reads the current window. A listener's query is fixed when it
+    attaches, so records that age out are pruned here after every change, and
+    the listener is re-attached with a fresh bound every window_hours so the
+    documents it tracks do not grow without end.
+    """
+
+    def __init__(self, name: str, collection: str, window_hours: float):
+        super().__init__(name, collection, None, RecentReport)
+        self.window_hours = window_hours
+        self._reattacher: Optional[threading.Thread] = None
+
+    def _query(self):
+        from google.cloud.firestore import FieldFilter
+        from services.firebase_service import get_firestore_client
+        return get_firestore_client().collection(self.collection) \
+            .where(filter=FieldFilter("reportedAt", ">", window_start(self.window_hours))) \
+            .select(self.record_type.FIELDS)
+
+    def _matches(self, data: dict) -> bool:
+        reported_at = data.get("reportedAt")
+        return isinstance(reported_at, str) and reported_at > window_start(self.window_hours)
+
+    def _listen(self) -> bool:
+        if not super()._listen():
+            return False
+        if self._reattacher is None:
+            self._reattacher = threading.Thread(target=self._reattach_loop, name=f"mirror-{self.name}-reattach",
+                                                daemon=True)
+            self._reattacher.start()
+        return True
+
+    def _reattach_loop(self):
+        while not self._stop.wait(self.window_hours * 3600):
+            previous = self._watch
+            try:
+                # The new listener's first snapshot re-adds the current window
+                # (idempotent upserts), so attach it before dropping the old one
+                self._watch = self._query().on_snapshot(self._on_snapshot)
+            except Exception as e:
+                logger.warning(f"⚠️  Mirror {self.name} could not re-attach listener, keeping the old one: {str(e)}")
+                continue
+            if previous is not None:
+                try:
+                    previous.unsubscribe()
+                except Exception:
+                    pass
+            logger.info(f"👂 Mirror {self.name} re-attached from {window_start(self.window_hours)}")
+
+    def _on_snapshot(self, docs, changes, read_time):
+        super()._on_snapshot(docs, changes, read_time)
+        self.prune()
+
+    def prune(self):
+        """Drop records that have aged out of the window"""
+        since = window_start(self.window_hours)
+        with self._lock:
+            expired = [rid for rid, record in self._records.items()
+                       if not isinstance(record.reported_at, str) or record.reported_at <= since]
+            for rid in expired:
+                del self._records[rid]
+            if expired:
+                self._publish([], expired, False)
+
+class _TypeWindow:
+    """Reports of one contamination type: sorted by reportedAt and gridded by location"""
+
+    def __init__(self, cell_size_meters: float):
+        self.times: List[Tuple[str, str]] = []
+        self.index = GridIndex(cell_size_meters)
+
+class ClusterWindow:
+    """Sliding-window counter for the cluster rule: how many reports of a
+    contamination type fall within radius_meters of a point in the last
+    window_hours.
+
+    Each type keeps its reports sorted by reportedAt, so expiring the oldest
+    is a bisect plus the removals, and a GridIndex of their locations, so a
+    count only visits the cells around the point and only measures the
+    reports in cells the circle's edge crosses.
+    Thread-safe.
+    """
+
+    def __init__(self, window_hours: float, radius_meters: float):
+        self.window_hours = window_hours
+        self.radius_meters = radius_meters
+        self._types: Dict[str, _TypeWindow] = {}
+        self._entries: Dict[str, Tuple[str, str]] = {}  # report id -> (type, reportedAt)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def insert(self, report_id: str, contamination_type: str, reported_at: str,
+               latitude: float, longitude: float):
+        """Add a report, or move it if report_id is already counted"""
+        with self._lock:
+            self._discard(report_id)
+            window = self._types.get(contamination_type)
+            if window is None:
+                window = self._types[contamination_type] = _TypeWindow(self.radius_meters / CELLS_PER_RADIUS)
+            insort(window.times, (reported_at, report_id))
+            window.index.insert(report_id, latitude, longitude)
+            self._entries[report_id] = (contamination_type, reported_at)
+
+    def remove(self, report_id: str) -> bool:
+        with self._lock:
+            return self._discard(report_id)
+
+    def _discard(self, report_id: str) -> bool:
+        entry = self._entries.pop(report_id, None)
+        if entry is None:
+            return False
+        contamination_type, reported_at = entry
+        window = self._types[contamination_type]
+        position = bisect_right(window.times, (reported_at, report_id)) - 1
+        del window.times[position]
+        window.index.remove(report_id)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._types = {}
+            self._entries = {}
+
+    def _evict(self, window: _TypeWindow, since: str):
+        # Everything at or before `since` sorts ahead of (since, max id)
+        expired = bisect_right(window.times, (since, "\uffff"))
+        for _, report_id in window.times[:expired]:
+            window.index.remove(report_id)
+            del self._entries[report_id]
+        del window.times[:expired]
+
+    def count(self, contamination_type: str, latitude: float, longitude: float,
+              now: Optional[datetime] = None) -> int:
+        """Reports of the type within radius_meters of the point and reported after
+        now - window_hours (the same comparison the Firestore rule makes)"""
+        since = window_start(self.window_hours, now)
+        with self._lock:
+            window = self._types.get(contamination_type)
+            if window is None:
+                return 0
+            self._evict(window, since)
+            return window.index.count_within(latitude, longitude, self.radius_meters)
+
+def cluster_mirror(mirror: WindowMirror, radius_meters: float) -> ClusterWindow:
+    """A ClusterWindow over a WindowMirror's records, kept in sync by subscribing to it.
+
+    Records need a string reportedAt, a type and coordinates to be counted,
+    matching the documents the Firestore rule can count.
+    """
+    clusters = ClusterWindow(mirror.window_hours, radius_meters)
+
+    def sync(upserted, removed, reset):
+        with clusters._lock:
+            if reset:
+                clusters.clear()
+            for report_id in removed:
+                clusters.remove(report_id)
+            for record in upserted:
+                if isinstance(record.reported_at, str) and record.contamination_type \
+                        and record.latitude is not None and record.longitude is not None:
+                    clusters.insert(record.id, record.contamination_type, record.reported_at,
+                                    record.latitude, record.longitude)
+                else:
+                    clusters.remove(record.id)
+
+    mirror.subscribe(sync)
+    return clusters
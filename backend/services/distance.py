@@ -0,0 +1,75 @@
+import math
+from typing import Sequence
+
+# Every distance in the app is in meters on a spherical Earth of this radius
+EARTH_RADIUS_METERS = 6371000.0
+
+# Below this span the equirectangular approximation stays within ~0.1% of
+# haversine at Assam's latitudes (tens of meters at the limit); beyond it,
+# use haversine.
+EQUIRECTANGULAR_MAX_METERS = 50000.0
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distance in meters between two points (Haversine formula).
+
+    Scalar version for one-off comparisons, where NumPy's per-call overhead
+    would cost more than the arithmetic.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = math.sin(math.radians(lat2 - lat1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+def distances_from(latitude: float, longitude: float, latitudes: Sequence[float], longitudes: Sequence[float],
+                   fast: bool = False):
+    """Distances in meters from one point to each of many, as a NumPy array.
+
+    fast=True uses the equirectangular approximation, which skips the
+    trigonometry per point; only use it when every point is within
+    EQUIRECTANGULAR_MAX_METERS. Pass NumPy arrays for large inputs: building
+    arrays from Python lists costs more than the arithmetic.
+    """
+    import numpy as np
+
+    lats = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lons = np.radians(np.asarray(longitudes, dtype=np.float64))
+    phi = math.radians(latitude)
+    dlon = lons - math.radians(longitude)
+
+    if fast:
+        # Short ranges: scale longitude by the query point's latitude, no per-point trig.
+        # Wrap the longitude difference so points across the antimeridian stay close.
+        x = ((dlon + math.pi) % (2 * math.pi) - math.pi) * math.cos(phi)
+        y = lats - phi
+        return EARTH_RADIUS_METERS * np.sqrt(x * x + y * y)
+
+    a = np.sin((lats - phi) / 2) ** 2 + math.cos(phi) * np.cos(lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def pairwise_distances(latitudes: Sequence[float], longitudes: Sequence[float],
+                       other_latitudes: Sequence[float] = None, other_longitudes: Sequence[float] = None,
+                       fast: bool = False):
+    """(n, m) matrix of distances in meters between two point sets.
+
+    With one set, distances between all of its points (n x n).
+    """
+    import numpy as np
+
+    lats = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+    lons = np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+    if other_latitudes is None:
+        other_lats, other_lons = lats.T, lons.T
+    else:
+        other_lats = np.radians(np.asarray(other_latitudes, dtype=np.float64))[None, :]
+        other_lons = np.radians(np.asarray(other_longitudes, dtype=np.float64))[None, :]
+    dlon = other_lons - lons
+
+    if fast:
+        # Short ranges: one longitude scale for the whole matrix, at the sets' mean latitude
+        x = ((dlon + math.pi) % (2 * math.pi) - math.pi) * math.cos((lats.mean() + other_lats.mean()) / 2)
+        y = other_lats - lats
+        return EARTH_RADIUS_METERS * np.sqrt(x * x + y * y)
+
+    a = np.sin((other_lats - lats) / 2) ** 2 + np.cos(lats) * np.cos(other_lats) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -0,0 +1,158 @@
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from services.reference_cache import CACHE_TTL_SECONDS, reference_cache
+from services.spatial_index import GridIndex
+
+logger = logging.getLogger(__name__)
+
+# operatingHours strings are local to the labs
+LAB_TIMEZONE = ZoneInfo(os.getenv("LAB_TIMEZONE", "Asia/Kolkata"))
+
+# Labs and sources are sparse; coarse cells keep nearest() to a few rounds
+FACILITY_CELL_SIZE_METERS = 5000.0
+
+_DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+_HOURS_PATTERN = re.compile(
+    r"^(?P<days>.*?)\s*(?P<open>\d{1,2}(?::\d{2})?\s*[ap]m)\s*-\s*(?P<close>\d{1,2}(?::\d{2})?\s*[ap]m)$",
+    re.IGNORECASE,
+)
+
+def _minutes(clock: str) -> int:
+    clock = clock.strip().lower().replace(" ", "")
+    hours, _, rest = clock[:-2].partition(":")
+    hour = int(hours) % 12 + (12 if clock.endswith("pm") else 0)
+    return hour * 60 + int(rest or 0)
+
+def _days(spec: str) -> Optional[set]:
+    if not spec.strip() or spec.strip().lower() in ("daily", "everyday", "all days"):
+        return set(range(7))
+    days = set()
+    for part in spec.split(","):
+        bounds = [b.strip()[:3].lower() for b in part.split("-")]
+        if any(b not in _DAYS for b in bounds) or len(bounds) > 2:
+            return None
+        first, last = _DAYS.index(bounds[0]), _DAYS.index(bounds[-1])
+        days.update(range(first, last + 1) if first <= last else [*range(first, 7), *range(0, last + 1)])
+    return days
+
+def is_open(operating_hours: Optional[str], now: datetime) -> Optional[bool]:
+    """Whether an operatingHours string like "Mon-Sat 9:00 AM - 5:00 PM" covers now.
+
+    A closing time at or before the opening time runs past midnight, so
+    "Fri 8:00 PM - 2:00 AM" covers Saturday 1 AM. Returns None when the hours
+    are missing or not in a format we understand.
+    """
+    if not operating_hours:
+        return None
+    hours = operating_hours.strip()
+    if hours.lower() in ("24x7", "24/7", "24 hours", "open 24 hours"):
+        return True
+    match = _HOURS_PATTERN.match(hours)
+    if not match:
+        return None
+    days = _days(match.group("days"))
+    if days is None:
+        return None
+    minute = now.hour * 60 + now.minute
+    opens, closes = _minutes(match.group("open")), _minutes(match.group("close"))
+    if opens < closes:
+        return now.weekday() in days and opens <= minute < closes
+    # Past midnight the span belongs to the day it opened on
+    return (now.weekday() in days and minute >= opens) or ((now.weekday() - 1) % 7 in days and minute < closes)
+
+def _coordinates(doc: dict) -> Tuple[Optional[float], Optional[float]]:
+    location = doc.get("location")
+    if location is not None and hasattr(location, "latitude"):
+        return location.latitude, location.longitude
+    return doc.get("latitude"), doc.get("longitude")
+
+class _FacilityIndex:
+    """GridIndex over one reference collection, rebuilt from the reference
+    cache whenever the cache reports the collection changed."""
+
+    def __init__(self, collection: str):
+        self.collection = collection
+        self._index: Optional[GridIndex] = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._index = None
+
+    def get(self) -> GridIndex:
+        index = self._index
+        # Past the cache TTL, read through the cache so it can refresh (and notify us)
+        if index is not None and time.monotonic() - self._built_at < CACHE_TTL_SECONDS:
+            return index
+        with self._lock:
+            if self._index is not None and time.monotonic() - self._built_at < CACHE_TTL_SECONDS:
+                return self._index
+            docs = reference_cache.get(self.collection)
+            index = GridIndex(FACILITY_CELL_SIZE_METERS)
+            for doc in docs:
+                lat, lon = _coordinates(doc)
+                if lat is not None and lon is not None:
+                    index.insert(doc["id"], lat, lon, doc)
+            self._index = index
+            self._built_at = time.monotonic()
+            logger.info(f"🗺️  Facility index built for {self.collection} ({len(index)} located)")
+            return index
+
+_indexes = {name: _FacilityIndex(name) for name in ("testingLabs", "safeSources")}
+
+def _on_reference_change(collection: str):
+    facility_index = _indexes.get(collection)
+    if facility_index is not None:
+        facility_index.invalidate()
+
+reference_cache.add_listener(_on_reference_change)
+
+def _result(match) -> dict:
+    distance, _, doc = match
+    result = dict(doc)
+    lat, lon = _coordinates(doc)
+    result.pop("location", None)
+    result.update({"latitude": lat, "longitude": lon, "distance": round(distance, 2)})
+    return result
+
+def nearest_lab(latitude: float, longitude: float, test: Optional[str] = None,
+                now: Optional[datetime] = None) -> Optional[dict]:
+    """Nearest lab offering the test that is open now.
+
+    Labs whose hours can't be parsed count as open. If no lab offering the
+    test is open, the nearest one offering it is returned with open=False.
+    """
+    now = now or datetime.now(LAB_TIMEZONE)
+    index = _indexes["testingLabs"].get()
+
+    def offers(doc) -> bool:
+        return not test or test in (doc.get("testsOffered") or [])
+
+    def open_now(doc) -> bool:
+        return offers(doc) and is_open(doc.get("operatingHours"), now) is not False
+
+    matches = index.nearest(latitude, longitude, 1, where=open_now)
+    if matches:
+        return {**_result(matches[0]), "open": True}
+    matches = index.nearest(latitude, longitude, 1, where=offers)
+    return {**_result(matches[0]), "open": False} if matches else None
+
+def nearest_safe_source(latitude: float, longitude: float,
+                        contamination_type: Optional[str] = None) -> Optional[dict]:
+    """Nearest government-verified source whose latest results (if any) mark
+    the contaminant safe."""
+    def verified_safe(doc) -> bool:
+        if not doc.get("isGovernmentVerified"):
+            return False
+        results = doc.get("results") or {}
+        return not contamination_type or results.get(contamination_type, "safe") == "safe"
+
+    matches = _indexes["safeSources"].get().nearest(latitude, longitude, 1, where=verified_safe)
+    return _result(matches[0]) if matches else None
@@ -1,8 +1,13 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.cloud.firestore import FieldFilter
 from config import get_settings
+from typing import Iterator
 import json
 import os
+import threading
+
+_init_lock = threading.Lock()
 
 # Initialize Firebase
 def init_firebase():
@@ -48,54 +53,92 @@ def init_firebase():
         print(f"ℹ️  Firebase already initialized")
         return True
 
-try:
-    init_firebase()
-except Exception as e:
-    print(f"⚠️  Firebase initialization error at startup: {str(e)}")
-    print("Firebase operations will fail until credentials are properly configured")
+def ensure_firebase():
+    """Initialize the Firebase Admin SDK on first use rather than at import time"""
+    if not firebase_admin._apps:
+        with _init_lock:
+            if not firebase_admin._apps:
+                init_firebase()
 
 def get_firestore_client():
     """Get Firestore client for database operations"""
+    ensure_firebase()
     return firestore.client()
 
+def _invalidate_cache(collection: str):
+    """Drop cached copies of reference collections after a write through these helpers"""
+    from services.reference_cache import invalidate_reference_collection
+    invalidate_reference_collection(collection)
+
 def add_document(collection: str, data: dict) -> str:
     """Add document to Firestore, returns document ID"""
     db = get_firestore_client()
     doc_ref = db.collection(collection).add(data)
+    _invalidate_cache(collection)
     return doc_ref[1].id if doc_ref else None
 
-def get_document(collection: str, doc_id: str) -> dict:
-    """Get document from Firestore"""
+def get_document(collection: str, doc_id: str, fields: list = None) -> dict:
+    """Get document from Firestore, optionally returning only the given fields"""
     db = get_firestore_client()
-    doc = db.collection(collection).document(doc_id).get()
+    doc = db.collection(collection).document(doc_id).get(field_paths=fields)
     return doc.to_dict() if doc.exists else None
 
 def update_document(collection: str, doc_id: str, data: dict):
     """Update document in Firestore"""
     db = get_firestore_client()
     db.collection(collection).document(doc_id).update(data)
+    _invalidate_cache(collection)
 
 def delete_document(collection: str, doc_id: str):
     """Delete document from Firestore"""
     db = get_firestore_client()
     db.collection(collection).document(doc_id).delete()
+    _invalidate_cache(collection)
+
+QUERY_OPERATORS = ("==", "!=", "<", "<=", ">", ">=", "in", "not-in", "array_contains", "array_contains_any")
+
+def build_query(collection: str, filters: list = (), order_by: list = (), limit: int = None,
+                start_after: list = None, fields: list = None):
+    """Compose a Firestore query.
 
-def query_documents(collection: str, field: str, operator: str, value: any) -> list:
-    """Query documents from Firestore"""
+    filters:     (field, operator, value) tuples, all ANDed together
+    order_by:    field names or (field, "ASCENDING"/"DESCENDING") tuples
+    limit:       maximum number of documents the server returns
+    start_after: cursor values, one per order_by field
+    fields:      projection; only these fields are transferred
+    """
     db = get_firestore_client()
     query = db.collection(collection)
-    
-    if operator == "==":
-        query = query.where(field, "==", value)
-    elif operator == "<":
-        query = query.where(field, "<", value)
-    elif operator == ">":
-        query = query.where(field, ">", value)
-    elif operator == "<=":
-        query = query.where(field, "<=", value)
-    elif operator == ">=":
-        query = query.where(field, ">=", value)
-    
-    docs = query.stream()
-    return [doc.to_dict() for doc in docs]
 
+    for field, operator, value in filters:
+        if operator not in QUERY_OPERATORS:
+            raise ValueError(f"Unsupported query operator: {operator}")
+        query = query.where(filter=FieldFilter(field, operator, value))
+
+    for order in order_by:
+        field, direction = (order, "ASCENDING") if isinstance(order, str) else order
+        query = query.order_by(field, direction=direction)
+
+    if start_after is not None:
+        query = query.start_after(list(start_after))
+    if limit is not None:
+        query = query.limit(limit)
+    if fields is not None:
+        query = query.select(fields)
+    return query
+
+def stream_documents(collection: str, filters: list = (), order_by: list = (), limit: int = None,
+                     start_after: list = None, fields: list = None) -> Iterator[dict]:
+    """Lazily yield {id, ...fields} dicts for a query built by build_query"""
+    query = build_query(collection, filters, order_by, limit, start_after, fields)
+    for doc in query.stream():
+        data = doc.to_dict() or {}
+        data['id'] = doc.id
+        yield data
+
+def query_documents(collection: str, field: str, operator: str, value: any, fields: list = None) -> list:
+    """Query documents from Firestore on a single field.
+    When fields is given only those fields are fetched (Firestore select projection).
+    """
+    query = build_query(collection, [(field, operator, value)], fields=fields)
+    return [doc.to_dict() for doc in query.stream()]
@@ -0,0 +1,397 @@
+import csv
+import io
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+import zipfile
+import zlib
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_CSV_PATH = os.getenv(
+    "GAZETTEER_CSV_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "assam_gazetteer.csv"),
+)
+GAZETTEER_INDEX_PATH = os.getenv(
+    "GAZETTEER_INDEX_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "assam_gazetteer.idx"),
+)
+# Village/locality extract in the same columns, generated from GeoNames by
+# scripts/build_gazetteer.py. Indexed after the curated CSV when present.
+GAZETTEER_EXTRACT_PATH = os.getenv(
+    "GAZETTEER_EXTRACT_PATH",
+    os.path.join(os.path.dirname(__file__), "data", "assam_places.csv"),
+)
+
+CSV_COLUMNS = ["name", "district", "latitude", "longitude", "alt_names"]
+
+# GeoNames country dump for India and its district names; Assam is admin1 "03"
+GEONAMES_DUMP_URL = "https://download.geonames.org/export/dump/IN.zip"
+GEONAMES_ADMIN2_URL = "https://download.geonames.org/export/dump/admin2Codes.txt"
+GEONAMES_ADMIN1 = ("IN", "03")
+# Populated places, plus named localities that are not separate settlements
+GEONAMES_CLASSES = {"P"}
+GEONAMES_CODES = {"LCTY"}
+
+# Lookups below this confidence are not trusted for placing a report
+GEOCODE_MIN_CONFIDENCE = float(os.getenv("GEOCODE_MIN_CONFIDENCE", 0.6))
+
+_MAGIC = b"LGZ2"
+_HEADER = struct.Struct("<4sIIIII")  # magic, places, keys, delete table slots, keys blob bytes, labels blob bytes
+
+def normalize(name: str) -> str:
+    """Lowercase ASCII letters only: "North Lakhimpur" -> "northlakhimpur" """
+    return re.sub(r"[^a-z]", "", name.lower())
+
+def _max_edits(length: int) -> int:
+    # One typo in short names, two in longer ones
+    return 1 if length <= 5 else 2
+
+def _deletes(word: str, max_edits: int) -> set:
+    """word plus every string formed by deleting up to max_edits characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_edits):
+        frontier = {w[:i] + w[i + 1:] for w in frontier if len(w) > 1 for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count once), or limit + 1 if larger"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # Shared prefix and suffix never change the distance; only the differing core needs the DP
+    shortest = min(len(a), len(b))
+    start = 0
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return min(max(len(a), len(b)), limit + 1)
+
+    # Only cells within `limit` of the diagonal can stay under the limit
+    over = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        char = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if previous2 is not None and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1] \
+                    and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+        if min(current) > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+def _read_rows(paths: Iterable[str]):
+    """Rows of the gazetteer CSVs in order, skipping a (name, district) already seen"""
+    seen = set()
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                place = (normalize(row["name"]), normalize(row["district"]))
+                if place not in seen:
+                    seen.add(place)
+                    yield row
+
+def build_index(csv_path: str = GAZETTEER_CSV_PATH, index_path: str = GAZETTEER_INDEX_PATH,
+                extract_path: Optional[str] = GAZETTEER_EXTRACT_PATH) -> str:
+    """Compile the gazetteer CSV (name, district, latitude, longitude, alt_names),
+    followed by the generated extract if it exists, into the memory-mappable
+    index file. Returns the path written.
+
+    Curated places come first, so they win exact-name ties with the extract.
+    """
+    places = []
+    keys = []
+    paths = [path for path in (csv_path, extract_path) if path and os.path.exists(path)]
+    for row in _read_rows(paths):
+        place_id = len(places)
+        places.append((float(row["latitude"]), float(row["longitude"]), f"{row['name']}|{row['district']}"))
+        names = [row["name"], *(row.get("alt_names") or "").split(";")]
+        for key in {normalize(n) for n in names if normalize(n)}:
+            keys.append((key, place_id))
+    keys.sort()
+
+    entries = {(zlib.crc32(variant.encode()), key_id)
+               for key_id, (key, _) in enumerate(keys)
+               for variant in _deletes(key, _max_edits(len(key)))}
+    # Open-addressing table (load factor <= 0.5, linear probing) of
+    # delete-variant hash -> key id + 1; 0 marks an empty slot
+    slots = 1 << max(4, (2 * len(entries) - 1).bit_length())
+    table_hash = [0] * slots
+    table_key = [0] * slots
+    for h, key_id in sorted(entries):
+        i = h & (slots - 1)
+        while table_key[i]:
+            i = (i + 1) & (slots - 1)
+        table_hash[i] = h
+        table_key[i] = key_id + 1
+
+    keys_blob = b"".join(key.encode() for key, _ in keys)
+    labels_blob = b"".join(label.encode() for _, _, label in places)
+    key_offsets, offset = [], 0
+    for key, _ in keys:
+        key_offsets.append(offset)
+        offset += len(key)
+    key_offsets.append(offset)
+    label_offsets, offset = [], 0
+    for _, _, label in places:
+        label_offsets.append(offset)
+        offset += len(label.encode())
+    label_offsets.append(offset)
+
+    try:
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(index_path))
+    except OSError:
+        # Read-only install: keep the compiled index in the temp dir instead
+        index_path = os.path.join(tempfile.gettempdir(), os.path.basename(index_path))
+        handle, tmp_path = tempfile.mkstemp(dir=tempfile.gettempdir())
+    with os.fdopen(handle, "wb") as out:
+        out.write(_HEADER.pack(_MAGIC, len(places), len(keys), slots, len(keys_blob), len(labels_blob)))
+        out.write(struct.pack(f"<{len(places)}f", *(p[0] for p in places)))
+        out.write(struct.pack(f"<{len(places)}f", *(p[1] for p in places)))
+        out.write(struct.pack(f"<{len(label_offsets)}I", *label_offsets))
+        out.write(struct.pack(f"<{len(key_offsets)}I", *key_offsets))
+        out.write(struct.pack(f"<{len(keys)}I", *(place_id for _, place_id in keys)))
+        out.write(struct.pack(f"<{slots}I", *table_hash))
+        out.write(struct.pack(f"<{slots}I", *table_key))
+        out.write(keys_blob)
+        out.write(labels_blob)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, index_path)
+    logger.info(f"🗺️  Gazetteer index built: {len(places)} places, {len(keys)} names, {len(entries)} delete variants")
+    return index_path
+
+class Gazetteer:
+    """Read-only view over a compiled gazetteer index.
+
+    The file is memory-mapped and its arrays are read in place, so loading is
+    O(1) and the pages are shared between worker processes. Names are found by
+    binary search (exact and prefix) and through a symmetric-delete hash
+    table (misspellings up to _max_edits), with no scan over the names.
+    """
+
+    def __init__(self, index_path: str):
+        with open(index_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, places, keys, slots, keys_bytes, labels_bytes = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f"Not a gazetteer index: {index_path}")
+
+        offset = _HEADER.size
+        def take(count: int, fmt: str):
+            nonlocal offset
+            section = view[offset:offset + 4 * count].cast(fmt)
+            offset += 4 * count
+            return section
+
+        self._lat = take(places, "f")
+        self._lon = take(places, "f")
+        self._label_offsets = take(places + 1, "I")
+        self._key_offsets = take(keys + 1, "I")
+        self._key_place = take(keys, "I")
+        self._delete_hash = take(slots, "I")
+        self._delete_key = take(slots, "I")
+        self._delete_mask = slots - 1
+        self._keys_blob = view[offset:offset + keys_bytes]
+        self._labels_blob = view[offset + keys_bytes:offset + keys_bytes + labels_bytes]
+        self._keys = _KeyList(self)
+
+    def __len__(self) -> int:
+        return len(self._lat)
+
+    def _key(self, key_id: int) -> str:
+        return bytes(self._keys_blob[self._key_offsets[key_id]:self._key_offsets[key_id + 1]]).decode()
+
+    def _place(self, key_id: int, confidence: float, match_type: str) -> dict:
+        place_id = self._key_place[key_id]
+        label = bytes(self._labels_blob[self._label_offsets[place_id]:self._label_offsets[place_id + 1]]).decode()
+        name, _, district = label.partition("|")
+        return {
+            "name": name,
+            "district": district,
+            "latitude": round(self._lat[place_id], 5),
+            "longitude": round(self._lon[place_id], 5),
+            "confidence": round(confidence, 3),
+            "matchType": match_type,
+        }
+
+    def lookup(self, token: str) -> Optional[dict]:
+        """Best place for a (possibly misspelled or truncated) name.
+
+        Returns {name, district, latitude, longitude, confidence, matchType}
+        or None. confidence is 1.0 for exact names, 1 - edits / length for
+        misspellings and 0.9 * typed / full length for prefixes.
+        """
+        query = normalize(token)
+        if not query:
+            return None
+
+        position = bisect_left(self._keys, query)
+        if position < len(self._keys) and self._keys[position] == query:
+            return self._place(position, 1.0, "exact")
+
+        best = None  # (confidence, -edits, key_id, match_type)
+        limit = _max_edits(len(query))
+        candidates = set()
+        table_hash, table_key, mask = self._delete_hash, self._delete_key, self._delete_mask
+        for variant in _deletes(query, limit):
+            h = zlib.crc32(variant.encode())
+            i = h & mask
+            while table_key[i]:
+                if table_hash[i] == h:
+                    candidates.add(table_key[i] - 1)
+                i = (i + 1) & mask
+        for key_id in candidates:
+            key = self._key(key_id)
+            edits = _edit_distance(query, key, limit)
+            if edits <= limit:
+                candidate = (1 - edits / max(len(query), len(key)), -edits, -key_id, "fuzzy")
+                best = max(best, candidate) if best else candidate
+
+        # Truncated names: the shortest key starting with the query
+        if len(query) >= 3:
+            prefix_ids = range(position, bisect_left(self._keys, query + "{"))
+            if prefix_ids:
+                key_id = min(prefix_ids, key=lambda k: (len(self._key(k)), k))
+                candidate = (0.9 * len(query) / len(self._key(key_id)), 0, -key_id, "prefix")
+                best = max(best, candidate) if best else candidate
+
+        if best is None:
+            return None
+        return self._place(-best[2], best[0], best[3])
+
+class _KeyList:
+    """Sequence view of the sorted key strings, for bisect"""
+
+    def __init__(self, gazetteer: Gazetteer):
+        self._gazetteer = gazetteer
+
+    def __len__(self) -> int:
+        return len(self._gazetteer._key_place)
+
+    def __getitem__(self, key_id: int) -> str:
+        return self._gazetteer._key(key_id)
+
+def _geonames_lines(path: str) -> Iterable[str]:
+    """Lines of a GeoNames dump, either the .txt or the .zip it is published in"""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            member = next(name for name in archive.namelist() if name.endswith(".txt") and "readme" not in name.lower())
+            with archive.open(member) as f:
+                yield from io.TextIOWrapper(f, encoding="utf-8")
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from f
+
+def _district_names(admin2_path: str) -> dict:
+    """admin2 code -> district name for the gazetteer's state, from admin2Codes.txt"""
+    prefix = ".".join(GEONAMES_ADMIN1) + "."
+    districts = {}
+    with open(admin2_path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 3 and fields[0].startswith(prefix):
+                name = fields[2] or fields[1]
+                districts[fields[0][len(prefix):]] = re.sub(r"\s+district$", "", name, flags=re.IGNORECASE)
+    return districts
+
+def write_geonames_extract(dump_path: str, admin2_path: str, out_path: str = GAZETTEER_EXTRACT_PATH) -> int:
+    """Write the state's populated places and localities from a GeoNames dump
+    as a gazetteer CSV. Returns the number of places written.
+
+    Uses the ASCII names; alternate names are kept when they are in Latin
+    script, since normalize() drops everything else anyway.
+    """
+    districts = _district_names(admin2_path)
+    country, admin1 = GEONAMES_ADMIN1
+    rows = []
+    for line in _geonames_lines(dump_path):
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 12 or fields[8] != country or fields[10] != admin1:
+            continue
+        if fields[6] not in GEONAMES_CLASSES and fields[7] not in GEONAMES_CODES:
+            continue
+        name = fields[2] or fields[1]
+        alt_names = sorted({alt.strip() for alt in [fields[1], *fields[3].split(",")]
+                            if alt.strip() and alt.isascii() and normalize(alt) and alt.strip() != name})
+        rows.append({
+            "name": name,
+            "district": districts.get(fields[11], ""),
+            "latitude": f"{float(fields[4]):.4f}",
+            "longitude": f"{float(fields[5]):.4f}",
+            "alt_names": ";".join(alt_names),
+        })
+    rows.sort(key=lambda row: (row["district"], row["name"]))
+
+    handle, tmp_path = tempfile.mkstemp(dir=os.path.dirname(out_path) or ".")
+    with os.fdopen(handle, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, out_path)
+    logger.info(f"🗺️  Gazetteer extract written: {len(rows)} places from {os.path.basename(dump_path)}")
+    return len(rows)
+
+_gazetteer: Optional[Gazetteer] = None
+_load_lock = threading.Lock()
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Process-wide gazetteer; compiles the index first if it is missing or older than its CSVs.
+
+    None when there is neither an index nor a CSV to build one from, so
+    lookups find nothing instead of failing.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _load_lock:
+            if _gazetteer is None:
+                index_path = GAZETTEER_INDEX_PATH
+                sources = [path for path in (GAZETTEER_CSV_PATH, GAZETTEER_EXTRACT_PATH) if os.path.exists(path)]
+                newest = max((os.path.getmtime(path) for path in sources), default=0.0)
+                if not os.path.exists(index_path) or os.path.getmtime(index_path) < newest:
+                    if not sources:
+                        logger.error(f"❌ No gazetteer: neither {GAZETTEER_CSV_PATH} nor {GAZETTEER_EXTRACT_PATH} exists")
+                        return None
+                    index_path = build_index(GAZETTEER_CSV_PATH, index_path)
+                if GAZETTEER_EXTRACT_PATH not in sources:
+                    logger.warning(f"⚠️  Gazetteer extract {GAZETTEER_EXTRACT_PATH} is missing: only the curated "
+                                   f"places are known. Run scripts/build_gazetteer.py")
+                _gazetteer = Gazetteer(index_path)
+                logger.info(f"🗺️  Gazetteer loaded ({len(_gazetteer)} places)")
+    return _gazetteer
+
+@lru_cache(maxsize=4096)
+def _cached_lookup(token: str) -> Optional[tuple]:
+    gazetteer = get_gazetteer()
+    place = gazetteer.lookup(token) if gazetteer is not None else None
+    return tuple(place.items()) if place else None
+
+def geocode(token: str) -> Optional[dict]:
+    """Resolve a village or locality name to coordinates; see Gazetteer.lookup"""
+    place = _cached_lookup(token.strip().lower())
+    return dict(place) if place else None
@@ -0,0 +1,136 @@
+import math
+from typing import Iterator, List, Tuple
+
+from services.distance import haversine_distance
+
+# Reports and alerts store a geohash of their coordinates in this field at
+# write time. Precision 10 is ~1.2 m x 0.6 m, finer than any radius we query.
+GEOHASH_FIELD = "geohash"
+GEOHASH_PRECISION = 10
+
+# A circle is covered by at most this many geohash cells, each read with one
+# prefix-range query. More cells means more queries but a tighter fit.
+MAX_QUERY_CELLS = 9
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_METERS_PER_DEGREE = 111320.0
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Geohash of a point"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, rng = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return "".join(chars)
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a geohash cell"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+def _bounding_box(latitude: float, longitude: float, radius_meters: float):
+    dlat = radius_meters / _METERS_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-6)
+    dlon = min(radius_meters / (_METERS_PER_DEGREE * cos_lat), 180.0)
+    return (max(latitude - dlat, -90.0), min(latitude + dlat, 90.0), longitude - dlon, longitude + dlon)
+
+def covering_cells(latitude: float, longitude: float, radius_meters: float,
+                   max_cells: int = MAX_QUERY_CELLS) -> List[str]:
+    """Geohash prefixes whose cells together cover the circle.
+
+    Uses the finest precision at which the circle's bounding box spans no
+    more than max_cells cells.
+    """
+    min_lat, max_lat, min_lon, max_lon = _bounding_box(latitude, longitude, radius_meters)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = range(math.floor((min_lat + 90.0) / height), math.floor((max_lat + 90.0) / height) + 1)
+        cols = range(math.floor((min_lon + 180.0) / width), math.floor((max_lon + 180.0) / width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            break
+
+    cells = set()
+    for row in rows:
+        cell_lat = min(-90.0 + (row + 0.5) * height, 90.0)
+        for col in cols:
+            cell_lon = (-180.0 + (col + 0.5) * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_lat, cell_lon, precision))
+    return sorted(cells)
+
+def query_bounds(latitude: float, longitude: float, radius_meters: float,
+                 max_cells: int = MAX_QUERY_CELLS) -> List[Tuple[str, str]]:
+    """(start, end) geohash ranges to query for documents within the circle"""
+    return [(prefix, prefix + "~") for prefix in covering_cells(latitude, longitude, radius_meters, max_cells)]
+
+def with_geohash(data: dict) -> dict:
+    """Set the geohash field from data's latitude/longitude, if both are present"""
+    latitude = data.get("latitude")
+    longitude = data.get("longitude")
+    if latitude is not None and longitude is not None:
+        data[GEOHASH_FIELD] = encode(latitude, longitude)
+    return data
+
+def query_nearby(collection: str, latitude: float, longitude: float, radius_meters: float,
+                 filters: list = (), fields: list = None) -> Iterator[dict]:
+    """Yield {id, distance, ...fields} for documents within radius_meters.
+
+    Runs one geohash prefix-range query per covering cell (combined with the
+    given equality filters), then drops the candidates outside the circle.
+    Documents without a geohash are not found; run scripts/backfill_geohash.py
+    after importing data from elsewhere.
+    """
+    from services.firebase_service import stream_documents
+
+    if fields is not None:
+        fields = list(dict.fromkeys([*fields, "latitude", "longitude"]))
+
+    seen = set()
+    for start, end in query_bounds(latitude, longitude, radius_meters):
+        range_filters = [*filters, (GEOHASH_FIELD, ">=", start), (GEOHASH_FIELD, "<=", end)]
+        for data in stream_documents(collection, range_filters, order_by=[GEOHASH_FIELD], fields=fields):
+            if data["id"] in seen:
+                continue
+            seen.add(data["id"])
+            d_lat = data.get("latitude")
+            d_lon = data.get("longitude")
+            if d_lat is None or d_lon is None:
+                continue
+            distance = haversine_distance(latitude, longitude, d_lat, d_lon)
+            if distance <= radius_meters:
+                data["distance"] = distance
+                yield data
+
+def query_nearest(collection: str, latitude: float, longitude: float, k: int, max_radius_meters: float,
+                  filters: list = (), fields: list = None, start_radius_meters: float = 250) -> list:
+    """The k documents closest to the point within max_radius_meters, nearest first.
+
+    Doubles the search radius until k documents fall inside it. Each round
+    covers four times the area of the last, so the rounds before the final
+    one add at most about a third to its reads.
+    """
+    radius = min(start_radius_meters, max_radius_meters)
+    while True:
+        matches = sorted(query_nearby(collection, latitude, longitude, radius, filters, fields),
+                         key=lambda d: (d["distance"], d["id"]))
+        if len(matches) >= k or radius >= max_radius_meters:
+            return matches[:k]
+        radius = min(radius * 2, max_radius_meters)
@@ -0,0 +1,386 @@
+import logging
+import math
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from services.distance import EARTH_RADIUS_METERS
+
+logger = logging.getLogger(__name__)
+
+HOTSPOTS_COLLECTION = "hotspots"
+
+# Reports within HOTSPOT_EPS_METERS of each other are neighbours; a report
+# with at least HOTSPOT_MIN_REPORTS neighbours (itself included) anchors a hotspot
+HOTSPOT_EPS_METERS = float(os.getenv("HOTSPOT_EPS_METERS", 1000))
+HOTSPOT_MIN_REPORTS = int(os.getenv("HOTSPOT_MIN_REPORTS", 5))
+HOTSPOT_WINDOWS_DAYS = [int(d) for d in os.getenv("HOTSPOT_WINDOWS_DAYS", "7,30,90").split(",") if d.strip()]
+
+# Run the job in-process every this many minutes (0 = only via scripts/compute_hotspots.py)
+HOTSPOT_INTERVAL_MINUTES = float(os.getenv("HOTSPOT_INTERVAL_MINUTES", 0))
+
+NOISE = -1
+
+REPORT_FIELDS = ["contaminationType", "reportedAt", "latitude", "longitude"]
+
+# Candidate pairs are measured in chunks of at most this many
+_MAX_PAIRS_PER_CHUNK = 1 << 21
+
+# Above this many core-point pairs, two cells are compared chunk by chunk,
+# stopping at the first pair within eps
+_LARGE_CELL_PAIR = 1 << 16
+
+def _expand(sources, cells, starts, counts):
+    """Yield (source, point) index arrays pairing each source with every point of
+    its cell (points of a cell are contiguous: starts[c] .. starts[c] + counts[c]).
+
+    Sources are split so that no chunk holds more than _MAX_PAIRS_PER_CHUNK pairs.
+    """
+    import numpy as np
+
+    reps = counts[cells]
+    ends = np.cumsum(reps)
+    begin = 0
+    while begin < len(sources):
+        limit = (ends[begin - 1] if begin else 0) + _MAX_PAIRS_PER_CHUNK
+        end = max(begin + 1, int(np.searchsorted(ends, limit, side="right")))
+        chunk_reps = reps[begin:end]
+        total = int(chunk_reps.sum())
+        if total:
+            offsets = np.repeat(starts[cells[begin:end]] - (np.cumsum(chunk_reps) - chunk_reps), chunk_reps)
+            yield np.repeat(sources[begin:end], chunk_reps), offsets + np.arange(total)
+        begin = end
+
+def dbscan(latitudes, longitudes, eps_meters: float, min_samples: int):
+    """DBSCAN over great-circle distance. Returns one label per point: a cluster
+    number from 0, or NOISE.
+
+    Points are bucketed in a grid of cells eps / sqrt(2) wide in an
+    equirectangular projection, so any two points in one cell are within eps
+    and every cell with min_samples points is all core without measuring.
+    Only points in sparser cells have their neighbours counted, and clusters
+    are joined cell by cell, with every measurement the haversine test.
+    Border points join the cluster of their nearest core neighbour.
+    """
+    import numpy as np
+
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    n = len(lat)
+    labels = np.full(n, NOISE, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    # Longitude is scaled at the latitude farthest from the equator, so
+    # projected distances never exceed true ones and no neighbour falls
+    # outside the cells searched; cells shrink by the spread of cos(latitude)
+    # so that a whole cell still fits within eps.
+    cos_low = math.cos(math.radians(min(float(np.abs(lat).max()), 89.0)))
+    cos_high = math.cos(math.radians(float(np.abs(lat).min())))
+    side = eps_meters / math.sqrt(1 + (cos_high / cos_low) ** 2) / 1.001
+    reach = math.ceil(eps_meters * 1.001 / side)
+    x = np.radians(lon - lon.mean()) * cos_low * EARTH_RADIUS_METERS
+    y = np.radians(lat) * EARTH_RADIUS_METERS
+    cx = np.floor((x - x.min()) / side).astype(np.int64) + reach
+    cy = np.floor((y - y.min()) / side).astype(np.int64) + reach
+    width = int(cy.max()) + reach + 1
+    keys = cx * width + cy
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    phi = np.radians(lat[order])
+    lam = np.radians(lon[order])
+    cos_phi = np.cos(phi)
+    cell_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    cell_of = np.repeat(np.arange(len(cell_keys)), counts)
+    # haversine(i, j) <= eps  <=>  a(i, j) <= sin^2(eps / 2R); no arcsin per pair
+    a_limit = math.sin(eps_meters / (2 * EARTH_RADIUS_METERS)) ** 2
+
+    def a_value(i, j):
+        return np.sin((phi[j] - phi[i]) / 2) ** 2 + cos_phi[i] * cos_phi[j] * np.sin((lam[j] - lam[i]) / 2) ** 2
+
+    offsets = [dx * width + dy for dx in range(-reach, reach + 1) for dy in range(-reach, reach + 1)]
+
+    def neighbour_cells(cells, offset):
+        target = cell_keys[cells] + offset
+        position = np.minimum(np.searchsorted(cell_keys, target), len(cell_keys) - 1)
+        return np.where(cell_keys[position] == target, position, -1)
+
+    def neighbour_pairs(points):
+        """(point, neighbour, a) for every neighbour within eps of each point"""
+        for offset in offsets:
+            cells = neighbour_cells(cell_of[points], offset)
+            found = cells >= 0
+            for i, j in _expand(points[found], cells[found], starts, counts):
+                a = a_value(i, j)
+                hit = a <= a_limit
+                yield i[hit], j[hit], a[hit]
+
+    # Core points: every point of a dense cell, and points of sparse cells
+    # with min_samples neighbours
+    core = np.repeat(counts >= min_samples, counts)
+    sparse = np.flatnonzero(~core)
+    if len(sparse):
+        neighbours = np.zeros(n, dtype=np.int64)
+        for i, _, _ in neighbour_pairs(sparse):
+            neighbours += np.bincount(i, minlength=n)
+        core[sparse] = neighbours[sparse] >= min_samples
+
+    core_points = np.flatnonzero(core)
+    if not len(core_points):
+        return labels
+    core_counts = np.bincount(cell_of[core_points], minlength=len(cell_keys))
+    core_starts = np.zeros(len(cell_keys), dtype=np.int64)
+    core_starts[1:] = np.cumsum(core_counts)[:-1]
+    core_cells = np.flatnonzero(core_counts)
+
+    # Join core cells that hold a pair of core points within eps. Core points
+    # sharing a cell are always joined, so each cell pair needs one hit.
+    edges_a, edges_b = [], []
+    for offset in offsets:
+        if offset <= 0:
+            continue
+        others = neighbour_cells(core_cells, offset)
+        keep = others >= 0
+        first, second = core_cells[keep], others[keep]
+        keep = core_counts[second] > 0
+        first, second = first[keep], second[keep]
+        if not len(first):
+            continue
+        sizes = core_counts[first] * core_counts[second]
+        small = sizes <= _LARGE_CELL_PAIR
+
+        # Small cell pairs at once: every core point of the first cell against
+        # every core point of the second
+        pair_ids = np.flatnonzero(small)
+        if len(pair_ids):
+            for pair, i_pos in _expand(pair_ids, first[pair_ids], core_starts, core_counts):
+                for which, j_pos in _expand(np.arange(len(pair)), second[pair], core_starts, core_counts):
+                    hit = a_value(core_points[i_pos[which]], core_points[j_pos]) <= a_limit
+                    joined = np.unique(pair[which[hit]])
+                    edges_a.append(first[joined])
+                    edges_b.append(second[joined])
+
+        for pair in np.flatnonzero(~small):
+            i_points = core_points[core_starts[first[pair]]:core_starts[first[pair]] + core_counts[first[pair]]]
+            j_points = core_points[core_starts[second[pair]]:core_starts[second[pair]] + core_counts[second[pair]]]
+            step = max(1, _MAX_PAIRS_PER_CHUNK // len(j_points))
+            for begin in range(0, len(i_points), step):
+                i = np.repeat(i_points[begin:begin + step], len(j_points))
+                j = np.tile(j_points, len(i_points[begin:begin + step]))
+                if (a_value(i, j) <= a_limit).any():
+                    edges_a.append(first[pair:pair + 1])
+                    edges_b.append(second[pair:pair + 1])
+                    break
+
+    # Connected components of the core cells (label propagation with pointer jumping)
+    component = np.arange(len(cell_keys))
+    if edges_a:
+        edge_a, edge_b = np.concatenate(edges_a), np.concatenate(edges_b)
+        while True:
+            root_a, root_b = component[edge_a], component[edge_b]
+            differ = root_a != root_b
+            if not differ.any():
+                break
+            low = np.minimum(root_a[differ], root_b[differ])
+            np.minimum.at(component, root_a[differ], low)
+            np.minimum.at(component, root_b[differ], low)
+            while True:
+                jumped = component[component]
+                if np.array_equal(jumped, component):
+                    break
+                component = jumped
+
+    cluster_of_cell = np.full(len(cell_keys), NOISE, dtype=np.int64)
+    roots, numbered = np.unique(component[core_cells], return_inverse=True)
+    cluster_of_cell[core_cells] = numbered
+    sorted_labels = np.full(n, NOISE, dtype=np.int64)
+    sorted_labels[core_points] = cluster_of_cell[cell_of[core_points]]
+
+    # Border points: the cluster of the nearest core point within eps
+    border = np.flatnonzero(~core)
+    if len(border):
+        found_i, found_j, found_a = [], [], []
+        for i, j, a in neighbour_pairs(border):
+            to_core = core[j]
+            found_i.append(i[to_core])
+            found_j.append(j[to_core])
+            found_a.append(a[to_core])
+        i, j, a = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_a)
+        if len(i):
+            nearest = np.lexsort((a, i))
+            first_of_point = np.ones(len(nearest), dtype=bool)
+            first_of_point[1:] = i[nearest][1:] != i[nearest][:-1]
+            chosen = nearest[first_of_point]
+            sorted_labels[i[chosen]] = sorted_labels[j[chosen]]
+
+    labels[order] = sorted_labels
+    return labels
+
+def _hotspot(contamination_type: str, window_days: int, rank: int, latitudes, longitudes,
+             reported_at: list, computed_at: str) -> dict:
+    from google.cloud.firestore import GeoPoint
+    from services.distance import distances_from
+    from services.geohash import with_geohash
+
+    center_lat, center_lon = float(latitudes.mean()), float(longitudes.mean())
+    radius = float(distances_from(center_lat, center_lon, latitudes, longitudes).max())
+    return with_geohash({
+        "contaminationType": contamination_type,
+        "windowDays": window_days,
+        "rank": rank,
+        "reportCount": int(len(latitudes)),
+        "latitude": round(center_lat, 6),
+        "longitude": round(center_lon, 6),
+        "center": GeoPoint(center_lat, center_lon),
+        "radiusMeters": round(radius, 1),
+        "firstReportedAt": min(reported_at),
+        "lastReportedAt": max(reported_at),
+        "epsMeters": HOTSPOT_EPS_METERS,
+        "minReports": HOTSPOT_MIN_REPORTS,
+        "computedAt": computed_at,
+    })
+
+def compute_hotspots(reports: List[dict], windows_days: List[int] = None, now: Optional[datetime] = None,
+                     eps_meters: float = None, min_reports: int = None) -> Dict[tuple, List[dict]]:
+    """Cluster reports per contamination type and time window.
+
+    reports are dicts with contaminationType, reportedAt (ISO string),
+    latitude and longitude. Returns {(type, window_days): [hotspot, ...]},
+    hotspots ranked by report count.
+    """
+    import numpy as np
+
+    windows_days = windows_days or HOTSPOT_WINDOWS_DAYS
+    eps_meters = eps_meters or HOTSPOT_EPS_METERS
+    min_reports = min_reports or HOTSPOT_MIN_REPORTS
+    now = now or datetime.now()
+    computed_at = datetime.now(timezone.utc).isoformat()
+
+    by_type: Dict[str, list] = {}
+    for report in reports:
+        if report.get("latitude") is None or report.get("longitude") is None \
+                or not isinstance(report.get("reportedAt"), str) or not report.get("contaminationType"):
+            continue
+        by_type.setdefault(report["contaminationType"], []).append(report)
+
+    results = {}
+    for contamination_type, typed in by_type.items():
+        typed.sort(key=lambda r: r["reportedAt"])
+        times = [r["reportedAt"] for r in typed]
+        lats = np.array([r["latitude"] for r in typed], dtype=np.float64)
+        lons = np.array([r["longitude"] for r in typed], dtype=np.float64)
+        for days in windows_days:
+            since = (now - timedelta(days=days)).isoformat()
+            # Same string comparison as the reportedAt range filters elsewhere
+            first = bisect_right(times, since)
+            started = time.perf_counter()
+            labels = dbscan(lats[first:], lons[first:], eps_meters, min_reports)
+            hotspots = []
+            if len(labels) and labels.max() >= 0:
+                sizes = np.bincount(labels[labels >= 0])
+                for rank, cluster in enumerate(np.argsort(-sizes, kind="stable")):
+                    members = np.flatnonzero(labels == cluster)
+                    hotspots.append(_hotspot(contamination_type, days, rank, lats[first:][members],
+                                             lons[first:][members], [times[first + m] for m in members],
+                                             computed_at))
+            results[(contamination_type, days)] = hotspots
+            logger.info(f"🔥 Hotspots {contamination_type}/{days}d: {len(hotspots)} from "
+                        f"{len(labels)} reports in {time.perf_counter() - started:.2f}s")
+    return results
+
+def load_reports(since: datetime, db=None) -> Iterator[dict]:
+    """Water reports with reportedAt after since; only the clustered fields are read"""
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+    from google.cloud.firestore import FieldFilter
+
+    query = db.collection("waterReports") \
+        .where(filter=FieldFilter("reportedAt", ">", since.isoformat())) \
+        .select(REPORT_FIELDS)
+    for doc in query.stream():
+        yield doc.to_dict() or {}
+
+def _hotspot_id(contamination_type: str, window_days: int, rank: int) -> str:
+    return f"{contamination_type}-{window_days}d-{rank:04d}"
+
+def run_hotspot_job(windows_days: List[int] = None, dry_run: bool = False, db=None) -> dict:
+    """Recompute every hotspot and replace the stored ones.
+
+    Documents are keyed by type, window and rank, so each run overwrites the
+    previous results in place and deletes the ranks that no longer exist.
+    """
+    from services.bulk_mutations import bulk_delete, bulk_set_documents
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    windows_days = windows_days or HOTSPOT_WINDOWS_DAYS
+    started = time.perf_counter()
+    now = datetime.now()
+    reports = list(load_reports(now - timedelta(days=max(windows_days)), db))
+    loaded = time.perf_counter()
+    results = compute_hotspots(reports, windows_days, now)
+    clustered = time.perf_counter()
+
+    collection = db.collection(HOTSPOTS_COLLECTION)
+    writes = {_hotspot_id(t, d, h["rank"]): h for (t, d), hotspots in results.items() for h in hotspots}
+    windows = set(windows_days)
+    stale = [doc.reference for doc in collection.select(["windowDays"]).stream()
+             if doc.id not in writes and (doc.to_dict() or {}).get("windowDays") in windows]
+
+    summary = {
+        "reports": len(reports),
+        "hotspots": len(writes),
+        "stale": len(stale),
+        "loadSeconds": round(loaded - started, 3),
+        "clusterSeconds": round(clustered - loaded, 3),
+    }
+    if not dry_run:
+        bulk_set_documents(((collection.document(doc_id), data) for doc_id, data in writes.items()),
+                           "hotspots", db=db)
+        if stale:
+            bulk_delete(stale, "stale hotspots", db=db)
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"✅ Hotspot job: {summary}")
+    return summary
+
+def get_hotspots(contamination_type: Optional[str] = None, window_days: Optional[int] = None) -> List[dict]:
+    """Stored hotspots, largest first"""
+    from services.firebase_service import stream_documents
+
+    filters = []
+    if contamination_type:
+        filters.append(("contaminationType", "==", contamination_type))
+    if window_days:
+        filters.append(("windowDays", "==", window_days))
+    hotspots = list(stream_documents(HOTSPOTS_COLLECTION, filters))
+    hotspots.sort(key=lambda h: (-h.get("reportCount", 0), h.get("contaminationType") or "", h.get("windowDays") or 0))
+    return hotspots
+
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def start_hotspot_scheduler(interval_minutes: float = HOTSPOT_INTERVAL_MINUTES):
+    """Run the hotspot job every interval_minutes on a daemon thread (no-op if 0)"""
+    global _scheduler
+    if interval_minutes <= 0 or _scheduler is not None:
+        return
+
+    def loop():
+        while not _stop.wait(interval_minutes * 60):
+            try:
+                run_hotspot_job()
+            except Exception as e:
+                logger.error(f"❌ Hotspot job failed: {str(e)}")
+
+    _scheduler = threading.Thread(target=loop, name="hotspots", daemon=True)
+    _scheduler.start()
+    logger.info(f"🔥 Hotspot job scheduled every {interval_minutes:g} min")
+
+def stop_hotspot_scheduler():
+    _stop.set()
@@ -7,7 +7,6 @@ from typing import List, Tuple
 
 import cv2
 import numpy as np
-import onnxruntime as ort
 from PIL import Image
 
 logger = logging.getLogger(__name__)
@@ -127,6 +126,8 @@ def _load_ort_session():
 
     _ensure_model_downloaded()
 
+    import onnxruntime as ort
+
     sess_opts = ort.SessionOptions()
     sess_opts.intra_op_num_threads = 1
     sess_opts.inter_op_num_threads = 1
@@ -138,6 +139,11 @@ def _load_ort_session():
     return _ort_session
 
 
+def warm_up():
+    """Load the detector ahead of the first verification request."""
+    _load_ort_session()
+
+
 def _letterbox(image: np.ndarray, size: int = YOLO_INPUT_SIZE) -> Tuple[np.ndarray, float, Tuple[int, int]]:
     """Resize with unchanged aspect ratio using padding (YOLO-style)."""
     h, w = image.shape[:2]
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from services.spatial_index import index_mirror, index_mirror_geofences
+
+logger = logging.getLogger(__name__)
+
+# "listen" attaches Firestore snapshot listeners and falls back to polling if
+# that fails; "poll" always polls; "off" disables the mirrors so callers read
+# Firestore directly.
+MIRROR_MODE = os.getenv("MIRROR_MODE", "listen").lower()
+MIRROR_POLL_SECONDS = float(os.getenv("MIRROR_POLL_SECONDS", 15))
+
+class ActiveReport:
+    """Compact in-memory view of an active waste report"""
+    __slots__ = ("id", "latitude", "longitude", "image_url", "waste_type")
+
+    FIELDS = ["latitude", "longitude", "imageUrl", "wasteType"]
+
+    def __init__(self, id: str, latitude, longitude, image_url, waste_type):
+        self.id = id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.image_url = image_url
+        self.waste_type = waste_type
+
+    @classmethod
+    def from_dict(cls, id: str, data: dict) -> "ActiveReport":
+        return cls(id, data.get("latitude"), data.get("longitude"), data.get("imageUrl"), data.get("wasteType"))
+
+class ActiveAlert:
+    """Compact view of an active alert.
+
+    The indexed fields are unpacked for the proximity and dedup checks; payload
+    keeps the document itself because /alerts/active returns whole alerts.
+    """
+    __slots__ = ("id", "latitude", "longitude", "radius", "contamination_type", "payload")
+
+    FIELDS = None
+
+    def __init__(self, id: str, latitude, longitude, radius, contamination_type, payload: dict):
+        self.id = id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.contamination_type = contamination_type
+        self.payload = payload
+
+    @classmethod
+    def from_dict(cls, id: str, data: dict) -> "ActiveAlert":
+        radius = (data.get("affectedArea") or {}).get("radius")
+        return cls(id, data.get("latitude"), data.get("longitude"), radius, data.get("contaminationType"), data)
+
+# Every mirror created, so start_mirrors() also covers ones defined in other modules
+_mirrors: List["LiveMirror"] = []
+
+class LiveMirror:
+    """Process-wide copy of the documents one query matches.
+
+    Kept current by a Firestore on_snapshot listener (incremental changes), or
+    by re-reading the query every MIRROR_POLL_SECONDS when listeners are not
+    available. Readers get a consistent list of records plus the time the
+    mirror last synced.
+    """
+
+    def __init__(self, name: str, collection: str, status: str, record_type):
+        self.name = name
+        self.collection = collection
+        self.status = status
+        self.record_type = record_type
+        self._records: Dict[str, object] = {}
+        # Held while records change and while subscribers see the change, so
+        # indexes built by subscribers are never behind a reader of the mirror
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._as_of: Optional[datetime] = None
+        self._watch = None
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._subscribers: List[Callable] = []
+        _mirrors.append(self)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def as_of(self) -> Optional[datetime]:
+        return self._as_of
+
+    def records(self) -> list:
+        with self._lock:
+            return list(self._records.values())
+
+    def subscribe(self, callback: Callable):
+        """callback(upserted_records, removed_ids, reset) runs after every sync.
+
+        reset is True when the whole working set was replaced (first sync or a
+        poll), in which case upserted_records holds every record. A mirror that
+        is already ready replays its records to the new subscriber at once.
+        Callbacks run under the mirror's lock and must not block.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            if self.ready:
+                self._notify(callback, list(self._records.values()), [], True)
+
+    def _query(self):
+        from google.cloud.firestore import FieldFilter
+        from services.firebase_service import get_firestore_client
+        query = get_firestore_client().collection(self.collection) \
+            .where(filter=FieldFilter("status", "==", self.status))
+        if self.record_type.FIELDS is not None:
+            query = query.select(self.record_type.FIELDS)
+        return query
+
+    def _matches(self, data: dict) -> bool:
+        """Whether a document written locally belongs in the working set"""
+        return data.get("status") == self.status
+
+    def start(self, mode: str = MIRROR_MODE):
+        if mode == "off" or self._watch is not None or self._poller is not None:
+            return
+        if mode == "listen" and self._listen():
+            return
+        self._poller = threading.Thread(target=self._poll_loop, name=f"mirror-{self.name}", daemon=True)
+        self._poller.start()
+        logger.info(f"🔁 Mirror {self.name} polling every {MIRROR_POLL_SECONDS}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._watch is not None:
+            try:
+                self._watch.unsubscribe()
+            except Exception:
+                pass
+            self._watch = None
+
+    def _listen(self) -> bool:
+        try:
+            self._watch = self._query().on_snapshot(self._on_snapshot)
+            logger.info(f"👂 Mirror {self.name} listening to {self.collection}")
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Mirror {self.name} could not attach listener, polling instead: {str(e)}")
+            self._watch = None
+            return False
+
+    def apply_local_write(self, doc_id: str, data: Optional[dict]):
+        """Reflect a write this process just made before the listener or poll sees it.
+
+        data is the written document, or None when it left the working set
+        (deleted, or its status changed). Does nothing until the mirror is ready.
+        """
+        if not self.ready:
+            return
+        with self._lock:
+            if data is None or not self._matches(data):
+                if self._records.pop(doc_id, None) is None:
+                    return
+                upserted, removed = [], [doc_id]
+            else:
+                record = self.record_type.from_dict(doc_id, data)
+                self._records[doc_id] = record
+                upserted, removed = [record], []
+            self._publish(upserted, removed, False)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        upserted, removed = [], []
+        reset = not self.ready
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    if self._records.pop(doc.id, None) is not None:
+                        removed.append(doc.id)
+                else:
+                    record = self.record_type.from_dict(doc.id, doc.to_dict() or {})
+                    self._records[doc.id] = record
+                    upserted.append(record)
+            self._as_of = read_time or datetime.now(timezone.utc)
+            # Subscribers catch up before the mirror reports ready
+            self._publish(upserted, removed, reset)
+            self._ready.set()
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"❌ Mirror {self.name} poll failed: {str(e)}")
+            self._stop.wait(MIRROR_POLL_SECONDS)
+
+    def refresh(self):
+        """Replace the working set with a fresh read of the query"""
+        records = {doc.id: self.record_type.from_dict(doc.id, doc.to_dict() or {}) for doc in self._query().stream()}
+        with self._lock:
+            removed = [rid for rid in self._records if rid not in records]
+            self._records = records
+            self._as_of = datetime.now(timezone.utc)
+            self._publish(list(records.values()), removed, True)
+            self._ready.set()
+
+    def _publish(self, upserted, removed, reset):
+        """Pass a change to every subscriber; callers hold the lock"""
+        for callback in self._subscribers:
+            self._notify(callback, upserted, removed, reset)
+
+    def _notify(self, callback, upserted, removed, reset):
+        try:
+            callback(upserted, removed, reset)
+        except Exception as e:
+            logger.error(f"❌ Mirror {self.name} subscriber failed: {str(e)}")
+
+active_reports = LiveMirror("active-reports", "reports", "active", ActiveReport)
+active_alerts = LiveMirror("active-alerts", "alerts", "active", ActiveAlert)
+
+# Alerts without affectedArea.radius are treated as covering the cluster radius
+ALERT_DEFAULT_RADIUS_METERS = 5000
+
+# Grid index over report locations for radius and nearest-neighbour lookups,
+# geofence index over alert areas for "which alerts cover this point"
+active_report_index = index_mirror(active_reports)
+active_alert_geofences = index_mirror_geofences(active_alerts, ALERT_DEFAULT_RADIUS_METERS)
+
+def start_mirrors():
+    for mirror in _mirrors:
+        mirror.start()
+
+def stop_mirrors():
+    for mirror in _mirrors:
+        mirror.stop()
+
+def freshness(mirror: Optional[LiveMirror] = None) -> str:
+    """ISO timestamp of the data a response was built from"""
+    as_of = mirror.as_of if mirror is not None and mirror.ready else None
+    return (as_of or datetime.now(timezone.utc)).isoformat()
@@ -1,63 +1,85 @@
-from math import radians, cos, sin, asin, sqrt
 import logging
+from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+# Fields read from active reports by the proximity checks; projecting them keeps
+# image metadata, descriptions and user details off the wire.
+ACTIVE_REPORT_FIELDS = ["latitude", "longitude", "imageUrl", "wasteType"]
+
+def _scan_active_reports(latitude: float, longitude: float, radius_meters: float,
+                         waste_type: Optional[str] = None) -> list:
+    """{id, distance, ...ACTIVE_REPORT_FIELDS} for active waste reports within radius_meters, nearest first.
+
+    The app writes waste reports straight to Firestore without a geohash, so
+    this scans the projected active reports (the mirror's own query) rather
+    than running geohash range queries that would miss every new report.
     """
-    Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees)
-    Returns distance in meters
+    from google.cloud.firestore import FieldFilter
+    from services.distance import distances_from
+    from services.firebase_service import get_firestore_client
+
+    query = get_firestore_client().collection("reports").where(filter=FieldFilter("status", "==", "active"))
+    if waste_type:
+        query = query.where(filter=FieldFilter("wasteType", "==", waste_type))
+    docs = []
+    for doc in query.select(ACTIVE_REPORT_FIELDS).stream():
+        data = doc.to_dict() or {}
+        if data.get("latitude") is not None and data.get("longitude") is not None:
+            data["id"] = doc.id
+            docs.append(data)
+    if not docs:
+        return []
+
+    # One vectorized distance pass over the active reports
+    distances = distances_from(latitude, longitude, [d["latitude"] for d in docs], [d["longitude"] for d in docs])
+    matches = []
+    for data, distance in zip(docs, distances.tolist()):
+        if distance <= radius_meters:
+            data["distance"] = distance
+            matches.append(data)
+    return sorted(matches, key=lambda d: (d["distance"], d["id"]))
+
+def _nearby_active_reports(latitude: float, longitude: float, radius_meters: float) -> Tuple[list, object]:
+    """[(ActiveReport, distance)] for active reports within radius_meters.
+
+    Queries the grid index over the in-memory mirror when it is ready;
+    otherwise scans the active reports in Firestore (see _scan_active_reports).
+    Returns (matches, mirror or None).
     """
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    r = 6371000  # Radius of earth in meters
-    return c * r
+    from services.live_mirror import ActiveReport, active_report_index, active_reports
+    if active_reports.ready:
+        matches = active_report_index.within(latitude, longitude, radius_meters)
+        return [(report, distance) for distance, _, report in matches], active_reports
+
+    docs = _scan_active_reports(latitude, longitude, radius_meters)
+    return [(ActiveReport.from_dict(data["id"], data), data["distance"]) for data in docs], None
 
 async def check_duplicate_location(latitude: float, longitude: float, radius_meters: float = 100) -> dict:
     """
     Check if a location has active (not cleaned) reports within given radius
-    Returns: {is_duplicate: bool, nearby_reports: list, distance_to_closest: float}
+    Returns: {is_duplicate: bool, nearby_reports: list, distance_to_closest: float, asOf: str}
     """
+    from services.live_mirror import freshness
+
     try:
-        from services.firebase_service import get_firestore_client
-        from google.cloud.firestore import FieldFilter
-        
-        db = get_firestore_client()
-        
-        # Get all ACTIVE reports (not cleaned)
-        active_reports = db.collection("reports").where(
-            filter=FieldFilter("status", "==", "active")
-        ).stream()
+        # ACTIVE reports (not cleaned) within the radius
+        matches, mirror = _nearby_active_reports(latitude, longitude, radius_meters)
         
         nearby_reports = []
         min_distance = float('inf')
         
-        for report in active_reports:
-            data = report.to_dict()
-            report_lat = data.get("latitude")
-            report_lon = data.get("longitude")
-            image_url = data.get("imageUrl")
-            
+        for report, distance in matches:
             # Skip any invalid or incomplete reports (missing coordinates or image)
-            if report_lat and report_lon and image_url:
-                distance = haversine_distance(latitude, longitude, report_lat, report_lon)
-                
-                logger.info(f"📍 Checking distance to report {report.id}: {distance:.1f}m")
-                
-                if distance <= radius_meters:
-                    nearby_reports.append({
-                        "id": report.id,
-                        "distance": round(distance, 2),
-                        "wasteType": data.get("wasteType"),
-                        "latitude": report_lat,
-                        "longitude": report_lon
-                    })
-                    min_distance = min(min_distance, distance)
+            if report.latitude and report.longitude and report.image_url:
+                nearby_reports.append({
+                    "id": report.id,
+                    "distance": round(distance, 2),
+                    "wasteType": report.waste_type,
+                    "latitude": report.latitude,
+                    "longitude": report.longitude
+                })
+                min_distance = min(min_distance, distance)
         
         is_duplicate = len(nearby_reports) > 0
         
@@ -71,7 +93,8 @@ async def check_duplicate_location(latitude: float, longitude: float, radius_met
             'is_duplicate': is_duplicate,
             'nearby_reports': nearby_reports,
             'distance_to_closest': round(min_distance, 2) if min_distance != float('inf') else None,
-            'radius_checked': radius_meters
+            'radius_checked': radius_meters,
+            'asOf': freshness(mirror)
         }
     except Exception as e:
         logger.error(f"❌ Error checking duplicate location: {str(e)}")
@@ -79,5 +102,62 @@ async def check_duplicate_location(latitude: float, longitude: float, radius_met
             'is_duplicate': False,
             'nearby_reports': [],
             'distance_to_closest': None,
-            'radius_checked': radius_meters
+            'radius_checked': radius_meters,
+            'asOf': None
         }
+
+# Water reports still being acted on; clean, resolved and dismissed ones are
+# left off the map.
+OPEN_WATER_REPORT_STATUSES = ["pending", "contaminated", "verified", "testing"]
+WATER_REPORT_MAP_FIELDS = ["latitude", "longitude", "village", "contaminationType",
+                           "waterSource", "severityLevel", "status", "reportedAt"]
+# k-nearest lookups never look further than this
+NEARBY_MAX_RADIUS = 50000
+
+def find_nearby_reports(latitude: float, longitude: float, radius_meters: float, k: Optional[int] = None,
+                        kind: str = "waste", waste_type: Optional[str] = None,
+                        contamination_type: Optional[str] = None) -> Tuple[list, object]:
+    """Open reports around a point, nearest first, as ({id, distance, ...}, mirror or None).
+
+    Radius mode (k is None) returns every report within radius_meters; k mode
+    returns the k nearest within radius_meters (capped at NEARBY_MAX_RADIUS).
+    Waste reports come from the grid index over the active-report mirror,
+    falling back to a scan of the active reports (they carry no geohash);
+    water reports, which are written with one, use geohash range queries.
+    """
+    from services.geohash import query_nearby, query_nearest
+    from services.live_mirror import active_report_index, active_reports
+
+    if k is not None:
+        radius_meters = min(radius_meters, NEARBY_MAX_RADIUS)
+
+    if kind == "waste" and active_reports.ready:
+        where = (lambda r: r.waste_type == waste_type) if waste_type else None
+        if k is None:
+            matches = active_report_index.within(latitude, longitude, radius_meters, where=where)
+        else:
+            matches = active_report_index.nearest(latitude, longitude, k, radius_meters, where=where)
+        return [{
+            "id": report.id,
+            "latitude": report.latitude,
+            "longitude": report.longitude,
+            "imageUrl": report.image_url,
+            "wasteType": report.waste_type,
+            "distance": distance
+        } for distance, _, report in matches], active_reports
+
+    if kind == "waste":
+        docs = _scan_active_reports(latitude, longitude, radius_meters, waste_type)
+        return (docs if k is None else docs[:k]), None
+
+    collection, fields = "waterReports", WATER_REPORT_MAP_FIELDS
+    filters = [("status", "in", OPEN_WATER_REPORT_STATUSES)]
+    if contamination_type:
+        filters.append(("contaminationType", "==", contamination_type))
+
+    if k is None:
+        docs = sorted(query_nearby(collection, latitude, longitude, radius_meters, filters, fields),
+                      key=lambda d: (d["distance"], d["id"]))
+    else:
+        docs = query_nearest(collection, latitude, longitude, k, radius_meters, filters, fields)
+    return docs, None
@@ -0,0 +1,259 @@
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from services.live_mirror import LiveMirror
+from services.spatial_index import index_mirror
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_COLLECTION = "alertSubscriptions"
+CHANNELS = ("sms", "push")
+
+# Delivery settings, per provider unless a provider overrides them
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 500))
+NOTIFY_RATE_PER_SECOND = float(os.getenv("NOTIFY_RATE_PER_SECOND", 1000))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", 4))
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", 0.5))
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", 4))
+
+# affectedUsers is an array on the alert document, which Firestore caps at
+# 1 MiB; past this many recipients only the count is recorded
+AFFECTED_USERS_LIMIT = 5000
+
+class Subscriber:
+    """A user's alert subscription: where they live and how to reach them"""
+    __slots__ = ("id", "latitude", "longitude", "channel", "address", "contamination_types")
+
+    FIELDS = ["latitude", "longitude", "channel", "address", "contaminationTypes"]
+
+    def __init__(self, id: str, latitude, longitude, channel, address, contamination_types):
+        self.id = id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.channel = channel
+        self.address = address
+        self.contamination_types = contamination_types
+
+    @classmethod
+    def from_dict(cls, id: str, data: dict) -> "Subscriber":
+        return cls(id, data.get("latitude"), data.get("longitude"), data.get("channel"),
+                   data.get("address"), data.get("contaminationTypes") or None)
+
+    def wants(self, contamination_type: str) -> bool:
+        return not self.contamination_types or contamination_type in self.contamination_types
+
+# Subscriptions are keyed by user id; only active ones are mirrored
+subscribers = LiveMirror("alert-subscribers", SUBSCRIPTIONS_COLLECTION, "active", Subscriber)
+subscriber_index = index_mirror(subscribers, cell_size_meters=1000)
+
+class ProviderError(Exception):
+    """A provider could not take a batch at all; the whole batch is retried"""
+
+class NotificationProvider(ABC):
+    """Delivers one channel's messages.
+
+    Subclasses implement send_batch. Each message is {to, body, alertId,
+    userId}; send_batch returns the indexes of the messages that failed and
+    should be retried, or raises ProviderError when the batch failed as a whole.
+    """
+    name = "provider"
+    batch_size = NOTIFY_BATCH_SIZE
+    rate_per_second = NOTIFY_RATE_PER_SECOND
+
+    @abstractmethod
+    def send_batch(self, messages: List[dict]) -> List[int]:
+        """Send messages; returns the indexes of those that failed"""
+
+class LogProvider(NotificationProvider):
+    """Default when no real provider is configured: logs what would be sent and keeps nothing"""
+    name = "log"
+
+    def __init__(self, channel: str):
+        self.channel = channel
+
+    def send_batch(self, messages: List[dict]) -> List[int]:
+        alert_ids = sorted({str(m.get("alertId")) for m in messages})
+        logger.info(f"📱 MOCK {self.channel.upper()}: {len(messages)} message(s) for alert(s) {', '.join(alert_ids)}")
+        for message in messages:
+            logger.debug(f"📱 MOCK {self.channel.upper()} to {message.get('to')}: {message.get('body')}")
+        return []
+
+class FakeProvider(NotificationProvider):
+    """Provider for tests and benchmarks: records every message in sent instead of sending.
+
+    sent grows with each message, so register it only for a bounded run.
+    failure_rate makes that share of messages fail on each attempt, and
+    latency_seconds is slept per batch, to exercise retries and pacing.
+    """
+    name = "fake"
+
+    def __init__(self, failure_rate: float = 0.0, latency_seconds: float = 0.0, seed: Optional[int] = None,
+                 batch_size: int = NOTIFY_BATCH_SIZE, rate_per_second: float = NOTIFY_RATE_PER_SECOND):
+        import random
+        self.failure_rate = failure_rate
+        self.latency_seconds = latency_seconds
+        self.batch_size = batch_size
+        self.rate_per_second = rate_per_second
+        self.sent: List[dict] = []
+        self.batches = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[dict]) -> List[int]:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        with self._lock:
+            self.batches += 1
+            failed = [i for i in range(len(messages)) if self._random.random() < self.failure_rate]
+            failed_set = set(failed)
+            self.sent.extend(m for i, m in enumerate(messages) if i not in failed_set)
+        return failed
+
+class RateLimiter:
+    """Token bucket: acquire(n) blocks until n sends fit in rate_per_second"""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        self.rate = rate_per_second
+        self.capacity = burst or rate_per_second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: int = 1):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # A request larger than the bucket waits for a full bucket, then overdraws
+                if self._tokens >= min(n, self.capacity):
+                    self._tokens -= n
+                    return
+                wait = (min(n, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+_providers: Dict[str, NotificationProvider] = {}
+_limiters: Dict[str, RateLimiter] = {}
+
+def register_provider(channel: str, provider: NotificationProvider):
+    """Route a channel's messages through provider (replacing the current one)"""
+    _providers[channel] = provider
+    _limiters[channel] = RateLimiter(provider.rate_per_second)
+
+def get_provider(channel: str) -> NotificationProvider:
+    if channel not in _providers:
+        # Nothing real is configured in this deployment: log instead of sending
+        register_provider(channel, LogProvider(channel))
+    return _providers[channel]
+
+def _deliver_batch(channel: str, messages: List[dict]) -> int:
+    """Send one batch with retries; returns how many were delivered"""
+    provider = get_provider(channel)
+    limiter = _limiters[channel]
+    pending = messages
+    for attempt in range(1, NOTIFY_MAX_ATTEMPTS + 1):
+        limiter.acquire(len(pending))
+        try:
+            failed = provider.send_batch(pending)
+        except ProviderError as e:
+            logger.warning(f"⚠️  {provider.name} batch of {len(pending)} failed (attempt {attempt}): {str(e)}")
+            failed = range(len(pending))
+        pending = [pending[i] for i in failed]
+        if not pending:
+            break
+        if attempt < NOTIFY_MAX_ATTEMPTS:
+            time.sleep(NOTIFY_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    if pending:
+        logger.error(f"❌ {provider.name}: giving up on {len(pending)} of {len(messages)} {channel} messages")
+    return len(messages) - len(pending)
+
+def find_recipients(latitude: float, longitude: float, radius_meters: float,
+                    contamination_type: Optional[str] = None) -> List[Subscriber]:
+    """Active subscribers whose home is inside the circle, nearest first"""
+    def wanted(subscriber) -> bool:
+        return contamination_type is None or subscriber.wants(contamination_type)
+
+    if subscribers.ready:
+        return [s for _, _, s in subscriber_index.within(latitude, longitude, radius_meters, where=wanted)]
+
+    from services.geohash import query_nearby
+    matches = query_nearby(SUBSCRIPTIONS_COLLECTION, latitude, longitude, radius_meters,
+                           filters=[("status", "==", "active")], fields=Subscriber.FIELDS)
+    found = [Subscriber.from_dict(m["id"], m) for m in sorted(matches, key=lambda m: m["distance"])]
+    return [s for s in found if wanted(s)]
+
+def alert_recipients(alert: dict) -> List[Subscriber]:
+    """Subscribers inside an alert's affected area who want its contamination type"""
+    radius = (alert.get("affectedArea") or {}).get("radius") or 0
+    return find_recipients(alert["latitude"], alert["longitude"], radius, alert.get("contaminationType"))
+
+def alert_message(alert: dict) -> str:
+    return f"[LUIT] {alert.get('message', 'Water contamination alert in your area.')}"
+
+def fan_out(alert_id: str, alert: dict, recipients: Optional[List[Subscriber]] = None) -> dict:
+    """Notify every subscriber inside the alert's area.
+
+    Messages are grouped by channel and sent in provider-sized batches, NOTIFY_CONCURRENCY
+    batches at a time under each provider's rate limit. Returns {recipients, sent, failed}.
+    """
+    started = time.perf_counter()
+    if recipients is None:
+        recipients = alert_recipients(alert)
+    body = alert_message(alert)
+
+    batches = []
+    by_channel: Dict[str, List[dict]] = {}
+    for subscriber in recipients:
+        if subscriber.channel in CHANNELS and subscriber.address:
+            by_channel.setdefault(subscriber.channel, []).append(
+                {"to": subscriber.address, "body": body, "alertId": alert_id, "userId": subscriber.id})
+    for channel, messages in by_channel.items():
+        size = max(1, get_provider(channel).batch_size)
+        batches.extend((channel, messages[i:i + size]) for i in range(0, len(messages), size))
+
+    with ThreadPoolExecutor(max_workers=max(1, NOTIFY_CONCURRENCY)) as pool:
+        sent = sum(pool.map(lambda batch: _deliver_batch(*batch), batches))
+    queued = sum(len(messages) for messages in by_channel.values())
+    result = {"recipients": len(recipients), "sent": sent, "failed": queued - sent,
+              "seconds": round(time.perf_counter() - started, 3)}
+    logger.info(f"📣 Alert {alert_id}: notified {sent}/{len(recipients)} subscribers in {result['seconds']}s")
+    return result
+
+def notify_alert(alert_id: str, alert: dict) -> dict:
+    """Fan out an alert and record the outcome on the alert document"""
+    from google.cloud.firestore import ArrayUnion, Increment
+    from services.firebase_service import get_firestore_client
+
+    recipients = alert_recipients(alert)
+    result = fan_out(alert_id, alert, recipients)
+    update = {"notificationsSent": Increment(result["sent"]), "notificationsFailed": Increment(result["failed"]),
+              "affectedCount": Increment(result["recipients"])}
+    if recipients:
+        update["affectedUsers"] = ArrayUnion([s.id for s in recipients[:AFFECTED_USERS_LIMIT]])
+    get_firestore_client().collection("alerts").document(alert_id).update(update)
+    return result
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def dispatch_alert(alert_id: str, alert: dict):
+    """Notify in the background so the request that raised the alert returns immediately"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="notify")
+
+    def run():
+        try:
+            notify_alert(alert_id, alert)
+        except Exception as e:
+            logger.error(f"❌ Notifying alert {alert_id} failed: {str(e)}")
+
+    _executor.submit(run)
@@ -0,0 +1,92 @@
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(values: list) -> str:
+    """Encode the order-by values of the last document on a page as an opaque token"""
+    payload = [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> list:
+    """Decode a token produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+    if not isinstance(values, list) or not values:
+        raise ValueError("Invalid pagination cursor")
+    return [
+        datetime.fromisoformat(v["$dt"]) if isinstance(v, dict) and "$dt" in v else v
+        for v in values
+    ]
+
+def ordered_query(query, order_by: Iterable[Tuple[str, str]] = (), start_after: Optional[str] = None):
+    """Apply order_by plus a document-id tie-breaker, and resume after a cursor token.
+
+    The document id is always the last sort key so cursors stay stable when
+    several documents share the same value for the leading fields.
+    """
+    order_by = list(order_by)
+    direction = order_by[-1][1] if order_by else "ASCENDING"
+    for field, field_direction in order_by:
+        query = query.order_by(field, direction=field_direction)
+    query = query.order_by("__name__", direction=direction)
+    if start_after:
+        values = decode_cursor(start_after)
+        if len(values) != len(order_by) + 1:
+            raise ValueError("Pagination cursor does not match this query")
+        query = query.start_after(values)
+    return query
+
+def paginate_query(query, limit: int, start_after: Optional[str] = None,
+                   order_by: Iterable[Tuple[str, str]] = ()) -> Tuple[List, Optional[str]]:
+    """Fetch one page of a Firestore query using cursors.
+
+    Returns (snapshots, next_cursor). next_cursor is None on the last page.
+    Reads at most limit + 1 documents no matter how large the collection is.
+    """
+    order_by = list(order_by)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = ordered_query(query, order_by, start_after)
+
+    docs = list(query.limit(limit + 1).stream())
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    next_cursor = None
+    if has_more and docs:
+        last = docs[-1].to_dict() or {}
+        next_cursor = encode_cursor([last.get(field) for field, _ in order_by] + [docs[-1].id])
+    return docs, next_cursor
+
+def snapshot_with_id(doc) -> dict:
+    """Convert a snapshot into the {id, ...fields} shape used by list endpoints"""
+    data = doc.to_dict() or {}
+    data['id'] = doc.id
+    return data
+
+def ndjson_response(docs: Iterable, transform: Callable = snapshot_with_id) -> StreamingResponse:
+    """Stream documents as newline-delimited JSON while they arrive from Firestore.
+
+    The iterable is consumed lazily, so exports never hold the whole
+    collection in memory.
+    """
+    def generate():
+        count = 0
+        for doc in docs:
+            yield json.dumps(jsonable_encoder(transform(doc)), default=str) + "\n"
+            count += 1
+        logger.info(f"📤 Streamed {count} documents as NDJSON")
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
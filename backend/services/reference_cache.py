@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Collections that change rarely and are read on almost every request
+REFERENCE_COLLECTIONS = ("testingLabs", "safeSources", "treatmentGuidance")
+
+# Entries younger than TTL are served as-is. Between TTL and STALE_TTL the old
+# copy is served while one background refresh runs. Beyond STALE_TTL the
+# request waits for a fresh read.
+CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL", 300))
+CACHE_STALE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_STALE_TTL", 3600))
+
+def _load_collection(collection: str) -> List[dict]:
+    from services.firebase_service import get_firestore_client
+    db = get_firestore_client()
+    return [{"id": doc.id, **(doc.to_dict() or {})} for doc in db.collection(collection).stream()]
+
+class _Entry:
+    __slots__ = ("docs", "loaded_at", "version", "listening")
+
+    def __init__(self, docs: List[dict], loaded_at: float, version: int):
+        self.docs = docs
+        self.loaded_at = loaded_at
+        self.version = version
+        self.listening = False
+
+class ReferenceCache:
+    """In-process read-through cache for small reference collections.
+
+    Readers always get copies of the cached documents so callers may reshape
+    them (e.g. flatten GeoPoints) without corrupting the cache.
+    """
+
+    def __init__(self, loader: Callable[[str], List[dict]] = _load_collection,
+                 ttl: float = CACHE_TTL_SECONDS, stale_ttl: float = CACHE_STALE_TTL_SECONDS):
+        self._loader = loader
+        self._ttl = ttl
+        self._stale_ttl = max(stale_ttl, ttl)
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._refreshing = set()
+        self._watches = {}
+        self._listeners: List[Callable[[str], None]] = []
+        self._version = 0
+
+    def get(self, collection: str) -> List[dict]:
+        """Return every document in the collection as {id, ...fields} dicts"""
+        entry = self._entries.get(collection)
+        if entry is not None:
+            age = time.monotonic() - entry.loaded_at
+            if entry.listening or age < self._ttl:
+                return [dict(d) for d in entry.docs]
+            if age < self._stale_ttl:
+                self._refresh_in_background(collection)
+                return [dict(d) for d in entry.docs]
+        return [dict(d) for d in self._load(collection).docs]
+
+    def invalidate(self, collection: Optional[str] = None):
+        """Drop one collection (or all) so the next read goes to Firestore"""
+        with self._lock:
+            self._version += 1
+            if collection is None:
+                dropped = [name for name, e in self._entries.items() if not e.listening]
+            else:
+                entry = self._entries.get(collection)
+                dropped = [collection] if entry is not None and not entry.listening else []
+            for name in dropped:
+                del self._entries[name]
+        for name in dropped:
+            self._notify(name)
+
+    def add_listener(self, callback: Callable[[str], None]):
+        """Register a callback run with the collection name whenever its contents change"""
+        self._listeners.append(callback)
+
+    def watch(self, collection: str) -> bool:
+        """Keep a collection current with a Firestore snapshot listener.
+
+        A watched collection never expires; the listener replaces it on every
+        change. Returns False if the listener could not be attached, in which
+        case the TTL path keeps working.
+        """
+        if collection in self._watches:
+            return True
+        try:
+            from services.firebase_service import get_firestore_client
+            db = get_firestore_client()
+
+            def on_snapshot(col_snapshot, changes, read_time):
+                docs = [{"id": doc.id, **(doc.to_dict() or {})} for doc in col_snapshot]
+                self._store(collection, docs, listening=True)
+                logger.info(f"🔄 Reference cache updated from listener: {collection} ({len(docs)} docs)")
+
+            self._watches[collection] = db.collection(collection).on_snapshot(on_snapshot)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️  Could not attach snapshot listener to {collection}: {str(e)}")
+            return False
+
+    def unwatch_all(self):
+        for collection, watch in list(self._watches.items()):
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+            entry = self._entries.get(collection)
+            if entry is not None:
+                entry.listening = False
+        self._watches.clear()
+
+    def _store(self, collection: str, docs: List[dict], listening: bool = False,
+               version: Optional[int] = None) -> _Entry:
+        with self._lock:
+            # A load that started before an invalidation must not resurrect old data
+            if version is not None and version != self._version and not listening:
+                return _Entry(docs, time.monotonic(), version)
+            entry = _Entry(docs, time.monotonic(), self._version)
+            entry.listening = listening or collection in self._watches
+            self._entries[collection] = entry
+        self._notify(collection)
+        return entry
+
+    def _notify(self, collection: str):
+        for callback in self._listeners:
+            try:
+                callback(collection)
+            except Exception as e:
+                logger.error(f"❌ Reference cache listener failed for {collection}: {str(e)}")
+
+    def _load(self, collection: str) -> _Entry:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(collection, threading.Lock())
+        # Only one request per collection goes to Firestore; the rest wait for it
+        with load_lock:
+            entry = self._entries.get(collection)
+            if entry is not None and (entry.listening or time.monotonic() - entry.loaded_at < self._ttl):
+                return entry
+            version = self._version
+            docs = self._loader(collection)
+            logger.info(f"📚 Reference cache loaded {collection} ({len(docs)} docs)")
+            return self._store(collection, docs, version=version)
+
+    def _refresh_in_background(self, collection: str):
+        with self._lock:
+            if collection in self._refreshing:
+                return
+            self._refreshing.add(collection)
+
+        def refresh():
+            try:
+                self._load(collection)
+            except Exception as e:
+                logger.error(f"❌ Background refresh of {collection} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(collection)
+
+        threading.Thread(target=refresh, name=f"refresh-{collection}", daemon=True).start()
+
+reference_cache = ReferenceCache()
+
+def get_reference_collection(collection: str) -> List[dict]:
+    """Read a reference collection through the process-wide cache"""
+    return reference_cache.get(collection)
+
+def invalidate_reference_collection(collection: str):
+    if collection in REFERENCE_COLLECTIONS:
+        reference_cache.invalidate(collection)
+
+def watch_reference_collections() -> int:
+    """Attach snapshot listeners to every reference collection; returns how many attached"""
+    return sum(1 for c in REFERENCE_COLLECTIONS if reference_cache.watch(c))
@@ -0,0 +1,311 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# One document per collection and UTC day, e.g. "reports-2026-10-19":
+# {"collection", "day", "total", "<dimension>": {value: count}}
+ROLLUPS_COLLECTION = "dailyRollups"
+
+# Per counted collection: the timestamp fields tried in order, and the fields counted per value
+ROLLUP_SOURCES = {
+    "reports": (["createdAt"], ["wasteType", "userType"]),
+    "cleanings": (["cleanedAt", "createdAt"], ["wasteType", "userType"]),
+    "waterReports": (["reportedAt", "createdAt"], ["contaminationType"]),
+}
+
+UNKNOWN = "unknown"
+
+# Cached rollups of past days are served for ROLLUP_CACHE_SECONDS; today's,
+# which other processes keep incrementing, for ROLLUP_CACHE_TODAY_SECONDS.
+# This process's own writes drop the day they touch straight away.
+ROLLUP_CACHE_SECONDS = float(os.getenv("ROLLUP_CACHE_SECONDS", 3600))
+ROLLUP_CACHE_TODAY_SECONDS = float(os.getenv("ROLLUP_CACHE_TODAY_SECONDS", 30))
+
+GRANULARITIES = ("day", "week", "month", "year")
+
+# Waste reports are written by the app straight to Firestore, so no backend
+# path counts them as they arrive; their rollups are recounted in-process
+# every ROLLUP_REBUILD_INTERVAL_MINUTES instead (0 = only via scripts/backfill_rollups.py)
+ROLLUP_REBUILD_COLLECTIONS = ["reports"]
+ROLLUP_REBUILD_INTERVAL_MINUTES = float(os.getenv("ROLLUP_REBUILD_INTERVAL_MINUTES", 15))
+
+def as_utc(value, fallback: Optional[datetime] = None) -> Optional[datetime]:
+    """A stored timestamp as an aware UTC datetime: ISO strings (naive ones taken
+    as UTC), epoch millis or datetimes. Anything else gives fallback."""
+    try:
+        if isinstance(value, datetime):
+            return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value / 1000.0, tz=timezone.utc)
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        pass
+    return fallback
+
+def rollup_day(collection: str, data: dict, fallback: Optional[datetime] = None) -> Optional[str]:
+    """UTC day ("YYYY-MM-DD") a document is counted on, from its first timestamp field that parses"""
+    time_fields, _ = ROLLUP_SOURCES[collection]
+    for field in time_fields:
+        when = as_utc(data.get(field))
+        if when is not None:
+            break
+    else:
+        when = fallback
+    return when.astimezone(timezone.utc).date().isoformat() if when is not None else None
+
+def rollup_id(collection: str, day: str) -> str:
+    return f"{collection}-{day}"
+
+def _value(data: dict, field: str) -> str:
+    value = data.get(field)
+    return str(value) if value not in (None, "") else UNKNOWN
+
+def record_rollup(writer, collection: str, data: dict, delta: int = 1, db=None) -> Optional[str]:
+    """Add delta to the day's rollup for a document being written or (delta=-1) deleted.
+
+    writer is the batch or transaction the document write goes through, so
+    the count changes in the same commit. A document without a usable
+    timestamp counts on today. Returns the day counted.
+    """
+    from google.cloud.firestore import Increment
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    day = rollup_day(collection, data, datetime.now(timezone.utc))
+    _, dimensions = ROLLUP_SOURCES[collection]
+    update = {"collection": collection, "day": day, "total": Increment(delta)}
+    for field in dimensions:
+        update[field] = {_value(data, field): Increment(delta)}
+    writer.set(db.collection(ROLLUPS_COLLECTION).document(rollup_id(collection, day)), update, merge=True)
+    rollup_cache.invalidate(collection, day)
+    return day
+
+def count_days(collection: str, docs: Iterable) -> Dict[str, dict]:
+    """Rollup documents for a stream of snapshots, keyed by day. Documents
+    without a usable timestamp count on their create_time."""
+    _, dimensions = ROLLUP_SOURCES[collection]
+    days: Dict[str, dict] = {}
+    for doc in docs:
+        data = doc.to_dict() or {}
+        day = rollup_day(collection, data, getattr(doc, "create_time", None))
+        if day is None:
+            continue
+        rollup = days.get(day)
+        if rollup is None:
+            rollup = days[day] = {"collection": collection, "day": day, "total": 0,
+                                  **{field: defaultdict(int) for field in dimensions}}
+        rollup["total"] += 1
+        for field in dimensions:
+            rollup[field][_value(data, field)] += 1
+    return {day: {key: dict(value) if isinstance(value, defaultdict) else value for key, value in rollup.items()}
+            for day, rollup in days.items()}
+
+def subtract_rollups(collection: str, docs: Iterable, db=None) -> int:
+    """Take deleted documents (snapshots read before the delete) out of their
+    days' rollups, one increment per day. Returns the days touched."""
+    from google.cloud.firestore import Increment
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    _, dimensions = ROLLUP_SOURCES[collection]
+    days = count_days(collection, docs)
+    rollups = db.collection(ROLLUPS_COLLECTION)
+    batch = db.batch()
+    for position, (day, rollup) in enumerate(days.items(), 1):
+        update = {"total": Increment(-rollup["total"])}
+        for field in dimensions:
+            update[field] = {value: Increment(-count) for value, count in rollup[field].items()}
+        batch.set(rollups.document(rollup_id(collection, day)), update, merge=True)
+        if position % 400 == 0:
+            batch.commit()
+            batch = db.batch()
+    batch.commit()
+    rollup_cache.invalidate(collection)
+    return len(days)
+
+def rebuild_rollups(collections: Optional[List[str]] = None, dry_run: bool = False, db=None) -> dict:
+    """Recount the daily rollups of each collection from its documents.
+
+    Reads only the timestamp and dimension fields, overwrites every day's
+    document and deletes rollups for days that no longer have documents.
+    Increments landing while a collection is recounted can be lost, so run
+    it when writes are quiet; it is idempotent and can simply run again.
+    """
+    from services.bulk_mutations import bulk_delete, bulk_set_documents
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+    from google.cloud.firestore import FieldFilter
+
+    summary = {}
+    rollups = db.collection(ROLLUPS_COLLECTION)
+    for collection in collections or list(ROLLUP_SOURCES):
+        started = time.perf_counter()
+        time_fields, dimensions = ROLLUP_SOURCES[collection]
+        days = count_days(collection, db.collection(collection).select(time_fields + dimensions).stream())
+        ids = {rollup_id(collection, day) for day in days}
+        stale = [doc.reference for doc in rollups.where(filter=FieldFilter("collection", "==", collection))
+                 .select([]).stream() if doc.id not in ids]
+        if not dry_run:
+            bulk_set_documents(((rollups.document(rollup_id(collection, day)), rollup) for day, rollup in days.items()),
+                               f"{collection} rollups", db=db)
+            if stale:
+                bulk_delete(stale, f"stale {collection} rollups", db=db)
+            rollup_cache.invalidate(collection)
+        summary[collection] = {"documents": sum(r["total"] for r in days.values()), "days": len(days),
+                               "stale": len(stale), "seconds": round(time.perf_counter() - started, 3)}
+        logger.info(f"📊 Rollups for {collection}: {summary[collection]}")
+    return summary
+
+def day_range(start: date, end: date) -> List[str]:
+    """Every day from start to end, both included, as "YYYY-MM-DD" """
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+def _load_days(collection: str, days: List[str], db=None) -> Dict[str, Optional[dict]]:
+    """The stored rollup of each day, None for days with nothing counted.
+
+    Point reads by document id in one batch, so no index is needed and a
+    year costs at most 366 small reads.
+    """
+    if db is None:
+        from services.firebase_service import get_firestore_client
+        db = get_firestore_client()
+
+    rollups = db.collection(ROLLUPS_COLLECTION)
+    found: Dict[str, Optional[dict]] = dict.fromkeys(days)
+    prefix = len(collection) + 1
+    for snapshot in db.get_all([rollups.document(rollup_id(collection, day)) for day in days]):
+        if snapshot.exists:
+            found[snapshot.id[prefix:]] = snapshot.to_dict() or {}
+    return found
+
+class RollupCache:
+    """In-process read-through cache of daily rollups, per (collection, day).
+
+    A read only fetches the days that are missing or too old, so repeated and
+    overlapping ranges cost no reads once the days are cached. Readers get
+    the cached dicts and must not modify them.
+    """
+
+    def __init__(self, ttl: float = ROLLUP_CACHE_SECONDS, today_ttl: float = ROLLUP_CACHE_TODAY_SECONDS):
+        self._ttl = ttl
+        self._today_ttl = min(today_ttl, ttl)
+        self._entries: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, collection: str, start: date, end: date, db=None) -> Dict[str, dict]:
+        """Rollups of the days from start to end, keyed by day; days with nothing counted are left out"""
+        days = day_range(start, end)
+        now = time.monotonic()
+        today = datetime.now(timezone.utc).date().isoformat()
+        cached, missing = {}, []
+        with self._lock:
+            for day in days:
+                entry = self._entries.get((collection, day))
+                if entry is not None and now - entry[1] < (self._today_ttl if day >= today else self._ttl):
+                    cached[day] = entry[0]
+                else:
+                    missing.append(day)
+            self.stats["hits"] += len(cached)
+            self.stats["misses"] += len(missing)
+        if missing:
+            loaded = _load_days(collection, missing, db)
+            with self._lock:
+                for day, rollup in loaded.items():
+                    self._entries[(collection, day)] = (rollup, now)
+            cached.update(loaded)
+        return {day: cached[day] for day in days if cached[day] is not None}
+
+    def invalidate(self, collection: Optional[str] = None, day: Optional[str] = None):
+        """Drop one day of a collection, a whole collection or everything"""
+        with self._lock:
+            if collection is None:
+                self._entries.clear()
+            elif day is not None:
+                self._entries.pop((collection, day), None)
+            else:
+                for key in [key for key in self._entries if key[0] == collection]:
+                    del self._entries[key]
+
+rollup_cache = RollupCache()
+
+def get_rollups(collection: str, start: date, end: date, db=None) -> Dict[str, dict]:
+    """The rollups of the days from start to end, keyed by day, through rollup_cache"""
+    return rollup_cache.get(collection, start, end, db)
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the day/week (Monday)/month/year bucket a day falls in"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+def _next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    return start + timedelta(days=1)
+
+def timeseries(collection: str, granularity: str, start: date, end: date, dimension: Optional[str] = None,
+               value: Optional[str] = None, db=None) -> List[dict]:
+    """Counts per bucket from start to end, every bucket present (zero when empty).
+
+    Buckets are labelled by their first day; the first and last are clipped to
+    the range. With a dimension, only documents whose field has value count.
+    """
+    rollups = get_rollups(collection, start, end, db)
+    counts: Dict[date, int] = {}
+    for day, rollup in rollups.items():
+        count = rollup.get("total", 0) if dimension is None else (rollup.get(dimension) or {}).get(value, 0)
+        if count:
+            key = bucket_start(date.fromisoformat(day), granularity)
+            counts[key] = counts.get(key, 0) + count
+
+    series = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        series.append({"start": max(current, start).isoformat(), "count": counts.get(current, 0)})
+        current = _next_bucket(current, granularity)
+    return series
+
+_scheduler: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+def start_rollup_scheduler(interval_minutes: float = ROLLUP_REBUILD_INTERVAL_MINUTES):
+    """Recount ROLLUP_REBUILD_COLLECTIONS at startup and every interval_minutes on a daemon thread (no-op if 0)"""
+    global _scheduler
+    if interval_minutes <= 0 or _scheduler is not None:
+        return
+
+    def loop():
+        while True:
+            try:
+                rebuild_rollups(ROLLUP_REBUILD_COLLECTIONS)
+            except Exception as e:
+                logger.error(f"❌ Rollup rebuild failed: {str(e)}")
+            if _stop.wait(interval_minutes * 60):
+                break
+
+    _scheduler = threading.Thread(target=loop, name="rollups", daemon=True)
+    _scheduler.start()
+    logger.info(f"📊 Rollups of {', '.join(ROLLUP_REBUILD_COLLECTIONS)} recounted every {interval_minutes:g} min")
+
+def stop_rollup_scheduler():
+    _stop.set()
@@ -0,0 +1,338 @@
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.distance import distances_from, haversine_distance
+
+# Grid cells are roughly this many meters on a side. Proximity queries in the
+# app use 100 m - 10 km radii; 250 m keeps a 100 m lookup to a handful of
+# cells while a 10 km lookup still touches far fewer cells than points.
+DEFAULT_CELL_SIZE_METERS = 250.0
+
+# Candidate sets at least this large get their distances from the NumPy
+# kernel; below it the scalar formula is faster than building arrays.
+VECTORIZE_MIN_CANDIDATES = 64
+
+_METERS_PER_DEGREE = 111320.0
+
+# Geofence radius classes double from this size: a circle of radius r sits in
+# the class whose bound is the smallest GEOFENCE_MIN_CLASS_METERS * 2**k >= r
+GEOFENCE_MIN_CLASS_METERS = 500.0
+
+class GridIndex:
+    """Uniform-grid spatial index over (latitude, longitude) points.
+
+    Rows are bands of constant latitude height; each row's cell width in
+    degrees is widened by 1/cos(latitude) so cells stay about
+    cell_size_meters wide everywhere. Insert, remove and move are O(1);
+    radius and k-nearest queries only visit the cells around the point.
+    Thread-safe.
+    """
+
+    def __init__(self, cell_size_meters: float = DEFAULT_CELL_SIZE_METERS):
+        self.cell_size_meters = cell_size_meters
+        self._lat_step = cell_size_meters / _METERS_PER_DEGREE
+        self._cells: Dict[Tuple[int, int], Dict[str, tuple]] = {}
+        self._points: Dict[str, Tuple[Tuple[int, int], float, float, Any]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, point_id: str) -> bool:
+        return point_id in self._points
+
+    def _row_cos(self, row: int) -> float:
+        # cos of the row edge nearest a pole, where a degree of longitude is shortest
+        edge = max(abs(row * self._lat_step), abs((row + 1) * self._lat_step))
+        return math.cos(math.radians(min(edge, 89.9)))
+
+    def _lon_step(self, row: int) -> float:
+        return min(self.cell_size_meters / (_METERS_PER_DEGREE * self._row_cos(row)), 360.0)
+
+    def _row(self, latitude: float) -> int:
+        return math.floor(latitude / self._lat_step)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = self._row(latitude)
+        lon_step = self._lon_step(row)
+        return row, math.floor((longitude + 180.0) / lon_step) % math.ceil(360.0 / lon_step)
+
+    def cell_of(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """(row, column) of the cell a point falls in"""
+        return self._cell(latitude, longitude)
+
+    def cells_around(self, latitude: float, longitude: float, radius_meters: float) -> List[Tuple[int, int]]:
+        """Every cell, occupied or not, that a circle around the point can reach"""
+        lat_span = radius_meters / _METERS_PER_DEGREE
+        cells = []
+        for row in range(self._row(max(latitude - lat_span, -90.0)), self._row(min(latitude + lat_span, 90.0)) + 1):
+            first, last, columns = self._column_range(row, longitude, radius_meters)
+            cells.extend((row, col % columns) for col in range(first, last + 1))
+        return list(dict.fromkeys(cells))
+
+    def insert(self, point_id: str, latitude: float, longitude: float, item: Any = None):
+        """Add a point, or move it if point_id is already indexed"""
+        cell = self._cell(latitude, longitude)
+        with self._lock:
+            self._discard(point_id)
+            self._cells.setdefault(cell, {})[point_id] = (latitude, longitude, item)
+            self._points[point_id] = (cell, latitude, longitude, item)
+
+    def remove(self, point_id: str) -> bool:
+        with self._lock:
+            return self._discard(point_id)
+
+    def _discard(self, point_id: str) -> bool:
+        entry = self._points.pop(point_id, None)
+        if entry is None:
+            return False
+        bucket = self._cells[entry[0]]
+        del bucket[point_id]
+        if not bucket:
+            del self._cells[entry[0]]
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._cells = {}
+            self._points = {}
+
+    def _column_range(self, row: int, longitude: float, radius_meters: float) -> Tuple[int, int, int]:
+        """(first, last, columns) for the cells of row the circle can reach; may wrap"""
+        lon_step = self._lon_step(row)
+        lon_span = radius_meters / (_METERS_PER_DEGREE * self._row_cos(row))
+        columns = math.ceil(360.0 / lon_step)
+        first_col = math.floor((longitude - lon_span + 180.0) / lon_step)
+        last_col = math.floor((longitude + lon_span + 180.0) / lon_step)
+        if last_col - first_col + 1 >= columns:
+            first_col, last_col = 0, columns - 1
+        return first_col, last_col, columns
+
+    def _cells_within(self, latitude: float, longitude: float, radius_meters: float):
+        lat_span = radius_meters / _METERS_PER_DEGREE
+        first_row = self._row(max(latitude - lat_span, -90.0))
+        last_row = self._row(min(latitude + lat_span, 90.0))
+        ranges = {row: self._column_range(row, longitude, radius_meters) for row in range(first_row, last_row + 1)}
+
+        # A wide radius over sparse data covers more cells than are occupied;
+        # then it is cheaper to test every occupied cell against the ranges
+        reachable = sum(last - first + 1 for first, last, _ in ranges.values())
+        if reachable > len(self._cells):
+            for (row, col), bucket in self._cells.items():
+                if row in ranges:
+                    first, last, columns = ranges[row]
+                    if (col - first) % columns <= last - first:
+                        yield (row, col), bucket
+            return
+
+        for row, (first, last, columns) in ranges.items():
+            for col in range(first, last + 1):
+                bucket = self._cells.get((row, col % columns))
+                if bucket:
+                    yield (row, col % columns), bucket
+
+    def _search(self, latitude: float, longitude: float, radius_meters: float,
+                where: Optional[Callable[[Any], bool]]) -> Tuple[List[Tuple[float, str, Any]], int]:
+        """(matches nearest first, number of points inside the radius before filtering)"""
+        with self._lock:
+            candidates = [(point_id, entry) for _, bucket in self._cells_within(latitude, longitude, radius_meters)
+                          for point_id, entry in bucket.items()]
+
+        if len(candidates) >= VECTORIZE_MIN_CANDIDATES:
+            distances = distances_from(latitude, longitude, [e[0] for _, e in candidates],
+                                       [e[1] for _, e in candidates]).tolist()
+        else:
+            distances = [haversine_distance(latitude, longitude, e[0], e[1]) for _, e in candidates]
+
+        matches = []
+        inside = 0
+        for (point_id, (_, _, item)), distance in zip(candidates, distances):
+            if distance <= radius_meters:
+                inside += 1
+                if where is None or where(item):
+                    matches.append((distance, point_id, item))
+        matches.sort(key=lambda m: (m[0], m[1]))
+        return matches, inside
+
+    def _farthest_corner(self, cell: Tuple[int, int], latitude: float, longitude: float) -> float:
+        row, col = cell
+        lon_step = self._lon_step(row)
+        lats = (row * self._lat_step, (row + 1) * self._lat_step)
+        lons = (col * lon_step - 180.0, (col + 1) * lon_step - 180.0)
+        return max(haversine_distance(latitude, longitude, lat, lon) for lat in lats for lon in lons)
+
+    def count_within(self, latitude: float, longitude: float, radius_meters: float) -> int:
+        """Number of points within radius_meters, same result as len(within(...)).
+
+        Cells lying wholly inside the circle are counted without measuring
+        their points, so dense areas cost per cell rather than per point.
+        """
+        # Corners within a meter of the edge are measured point by point, so
+        # rounding in the corner test can never change the count
+        inner = radius_meters - 1.0
+        count = 0
+        with self._lock:
+            partial = []
+            for cell, bucket in self._cells_within(latitude, longitude, radius_meters):
+                if len(bucket) > 4 and self._farthest_corner(cell, latitude, longitude) <= inner:
+                    count += len(bucket)
+                else:
+                    partial.extend(bucket.values())
+
+        if len(partial) >= VECTORIZE_MIN_CANDIDATES:
+            distances = distances_from(latitude, longitude, [e[0] for e in partial], [e[1] for e in partial])
+            return count + int((distances <= radius_meters).sum())
+        return count + sum(haversine_distance(latitude, longitude, e[0], e[1]) <= radius_meters for e in partial)
+
+    def within(self, latitude: float, longitude: float, radius_meters: float,
+               where: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, str, Any]]:
+        """(distance_m, id, item) for every point within radius_meters, nearest first.
+
+        where, if given, keeps only the points whose item it returns True for.
+        """
+        return self._search(latitude, longitude, radius_meters, where)[0]
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                max_radius_meters: Optional[float] = None,
+                where: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, str, Any]]:
+        """The k points closest to (latitude, longitude), nearest first.
+
+        Searches a growing radius until k points fall inside it: any point
+        outside a radius that already holds k points cannot be among the k
+        nearest.
+        """
+        if k <= 0:
+            return []
+        radius = self.cell_size_meters
+        while True:
+            if max_radius_meters is not None:
+                radius = min(radius, max_radius_meters)
+            matches, inside = self._search(latitude, longitude, radius, where)
+            exhausted = inside >= len(self._points) or radius >= math.pi * 6371000
+            if len(matches) >= k or exhausted or radius == max_radius_meters:
+                return matches[:k]
+            radius *= 2
+
+class GeofenceIndex:
+    """Index of circles (center and radius) answering "which circles cover this point?".
+
+    Circles are bucketed by radius class, and each class keeps a GridIndex of
+    centers whose cells are as wide as the class bound. A point is covered
+    only by circles whose center lies within their class bound of it, so a
+    query visits a few cells per class instead of every circle.
+    Thread-safe.
+    """
+
+    def __init__(self, min_class_meters: float = GEOFENCE_MIN_CLASS_METERS):
+        self.min_class_meters = min_class_meters
+        self._classes: Dict[int, GridIndex] = {}
+        self._class_of: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._class_of)
+
+    def __contains__(self, fence_id: str) -> bool:
+        return fence_id in self._class_of
+
+    def _class_bound(self, radius_class: int) -> float:
+        return self.min_class_meters * 2 ** radius_class
+
+    def _radius_class(self, radius_meters: float) -> int:
+        if radius_meters <= self.min_class_meters:
+            return 0
+        return math.ceil(math.log2(radius_meters / self.min_class_meters))
+
+    def insert(self, fence_id: str, latitude: float, longitude: float, radius_meters: float, item: Any = None):
+        """Add a circle, or replace it if fence_id is already indexed"""
+        radius_class = self._radius_class(radius_meters)
+        with self._lock:
+            self._discard(fence_id)
+            grid = self._classes.get(radius_class)
+            if grid is None:
+                grid = self._classes[radius_class] = GridIndex(self._class_bound(radius_class))
+            grid.insert(fence_id, latitude, longitude, (radius_meters, item))
+            self._class_of[fence_id] = radius_class
+
+    def remove(self, fence_id: str) -> bool:
+        with self._lock:
+            return self._discard(fence_id)
+
+    def _discard(self, fence_id: str) -> bool:
+        radius_class = self._class_of.pop(fence_id, None)
+        if radius_class is None:
+            return False
+        grid = self._classes[radius_class]
+        grid.remove(fence_id)
+        if not len(grid):
+            del self._classes[radius_class]
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._classes = {}
+            self._class_of = {}
+
+    def covering(self, latitude: float, longitude: float, buffer_meters: float = 0.0,
+                 where: Optional[Callable[[Any], bool]] = None) -> List[Tuple[float, str, Any]]:
+        """(distance_m to center, id, item) for every circle covering the point, nearest first.
+
+        buffer_meters grows every circle, so a positive buffer also returns
+        circles that come within that distance of the point.
+        """
+        with self._lock:
+            classes = list(self._classes.items())
+        matches = []
+        for radius_class, grid in classes:
+            reach = self._class_bound(radius_class) + buffer_meters
+            for distance, fence_id, (radius, item) in grid.within(latitude, longitude, reach):
+                if distance <= radius + buffer_meters and (where is None or where(item)):
+                    matches.append((distance, fence_id, item))
+        matches.sort(key=lambda m: (m[0], m[1]))
+        return matches
+
+def _follow_mirror(mirror, index, add):
+    """Keep index in sync with a LiveMirror; add(index, record) indexes one record
+    and returns False when the record has nothing to index."""
+    def sync(upserted, removed, reset):
+        with index._lock:
+            if reset:
+                index.clear()
+            for point_id in removed:
+                index.remove(point_id)
+            for record in upserted:
+                if not add(index, record):
+                    index.remove(record.id)
+
+    mirror.subscribe(sync)
+    return index
+
+def index_mirror(mirror, cell_size_meters: float = DEFAULT_CELL_SIZE_METERS) -> GridIndex:
+    """A GridIndex of a LiveMirror's records, kept in sync by subscribing to it.
+
+    Records without coordinates are left out; the record itself is the item.
+    """
+    def add(index, record) -> bool:
+        if record.latitude is None or record.longitude is None:
+            return False
+        index.insert(record.id, record.latitude, record.longitude, record)
+        return True
+
+    return _follow_mirror(mirror, GridIndex(cell_size_meters), add)
+
+def index_mirror_geofences(mirror, default_radius_meters: float = 0.0) -> GeofenceIndex:
+    """A GeofenceIndex of a LiveMirror's records (which need a radius attribute),
+    kept in sync by subscribing to it.
+
+    Records without coordinates are left out; records without a radius get
+    default_radius_meters. The record itself is the item.
+    """
+    def add(index, record) -> bool:
+        if record.latitude is None or record.longitude is None:
+            return False
+        radius = record.radius if isinstance(record.radius, (int, float)) else default_radius_meters
+        index.insert(record.id, record.latitude, record.longitude, radius, record)
+        return True
+
+    return _follow_mirror(mirror, GeofenceIndex(), add)
@@ -0,0 +1,58 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_status = {"state": "pending", "steps": {}}
+
+def _warm_firebase():
+    from services.firebase_service import get_firestore_client
+    get_firestore_client()
+
+def _warm_reference_cache():
+    from services.reference_cache import REFERENCE_COLLECTIONS, get_reference_collection
+    for collection in REFERENCE_COLLECTIONS:
+        get_reference_collection(collection)
+
+def _warm_gazetteer():
+    from services.gazetteer import get_gazetteer
+    get_gazetteer()
+
+def _warm_image_model():
+    from services.image_verification import warm_up
+    warm_up()
+
+def warm_up():
+    """Initialize clients, caches and heavy libraries so first requests don't pay for them.
+
+    Each step is timed and failures are logged, never raised: anything that
+    fails here is simply initialized again on first use.
+    """
+    steps = [("firebase", _warm_firebase), ("reference_cache", _warm_reference_cache),
+             ("gazetteer", _warm_gazetteer)]
+    # Set WARMUP_IMAGE_MODEL=0 to skip loading OpenCV/ONNX Runtime in the background
+    if os.getenv("WARMUP_IMAGE_MODEL", "1").lower() in ("1", "true", "yes"):
+        steps.append(("image_model", _warm_image_model))
+
+    _status["state"] = "running"
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            elapsed = time.perf_counter() - started
+            _status["steps"][name] = round(elapsed, 3)
+            logger.info(f"🔥 Warmup {name} ready in {elapsed:.2f}s")
+        except Exception as e:
+            _status["steps"][name] = f"failed: {str(e)}"
+            logger.warning(f"⚠️  Warmup {name} failed: {str(e)}")
+    _status["state"] = "done"
+
+def start_background_warmup() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+def warmup_status() -> dict:
+    return {"state": _status["state"], "steps": dict(_status["steps"])}
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi import Response
+
+from routes import admin
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+class FakeQuery:
+    def __init__(self, client, docs):
+        self._client = client
+        self._docs = docs
+
+    def where(self, field, op, value):
+        assert op == "=="
+        return FakeQuery(self._client, {doc_id: data for doc_id, data in self._docs.items()
+                                        if data.get(field) == value})
+
+    def select(self, fields):
+        return FakeQuery(self._client, {doc_id: {field: data[field] for field in fields if field in data}
+                                        for doc_id, data in self._docs.items()})
+
+    def stream(self):
+        self._client.streams += 1
+        return iter([FakeDoc(doc_id, data) for doc_id, data in self._docs.items()])
+
+class FakeFirestore:
+    """Just enough of a Firestore client for the profile listings, counting the queries run"""
+
+    def __init__(self, collections):
+        self._collections = collections
+        self.streams = 0
+
+    def collection(self, name):
+        return FakeQuery(self, self._collections.get(name, {}))
+
+def _client(profiles: int):
+    users = {}
+    for i in range(profiles):
+        users[f"user{i}"] = {"userType": "individual", "name": f"User {i}", "createdAt": f"2026-01-{i % 28 + 1:02d}"}
+        users[f"ngo{i}"] = {"userType": "ngo", "ngoName": f"NGO {i}", "createdAt": f"2026-02-{i % 28 + 1:02d}"}
+    reports = {f"report{i}": {"userId": f"user{i % profiles}"} for i in range(profiles * 3)}
+    cleanings = {f"cleaning{i}": {"userId": f"ngo{i % profiles}"} for i in range(profiles * 2)}
+    return FakeFirestore({"users": users, "reports": reports, "cleanings": cleanings})
+
+@pytest.mark.parametrize("route", [admin.get_all_users, admin.get_all_ngos])
+@pytest.mark.parametrize("profiles", [1, 10, 200])
+def test_profile_listing_runs_three_queries(monkeypatch, route, profiles):
+    db = _client(profiles)
+    monkeypatch.setattr(admin, "get_firestore_client", lambda: db)
+
+    response = Response()
+    listed = asyncio.run(route(response))
+
+    assert len(listed) == profiles
+    assert response.headers["X-Total-Count"] == str(profiles)
+    assert db.streams == 3
+
+def test_profile_listing_counts_activity(monkeypatch):
+    db = _client(4)
+    monkeypatch.setattr(admin, "get_firestore_client", lambda: db)
+
+    users = {user["id"]: user for user in asyncio.run(admin.get_all_users(Response()))}
+    ngos = {ngo["id"]: ngo for ngo in asyncio.run(admin.get_all_ngos(Response()))}
+
+    assert users["user0"]["reportsCount"] == 3 and users["user0"]["cleaningsCount"] == 0
+    assert ngos["ngo1"]["name"] == "NGO 1" and ngos["ngo1"]["cleaningsCount"] == 2
@@ -0,0 +1,96 @@
+import random
+
+import numpy as np
+import pytest
+
+from services.distance import (EARTH_RADIUS_METERS, EQUIRECTANGULAR_MAX_METERS, distances_from,
+                               haversine_distance, pairwise_distances)
+
+# (lat1, lon1, lat2, lon2) pairs where naive formulas tend to break
+EDGE_PAIRS = [
+    (26.9, 94.2, 26.9, 94.2),            # identical points
+    (0.0, 0.0, 0.0, 0.0),
+    (10.0, 179.9, 10.0, -179.9),         # across the antimeridian
+    (-45.0, -179.999, -45.0, 179.999),
+    (0.0, 180.0, 0.0, -180.0),           # the same meridian written twice
+    (90.0, 0.0, 90.0, 123.0),            # the north pole, any longitude
+    (-90.0, 45.0, -90.0, -135.0),
+    (89.9, 0.0, 89.9, 180.0),            # over the pole
+    (90.0, 0.0, -90.0, 0.0),             # pole to pole
+    (26.9, 94.2, -26.9, -85.8),          # antipodal
+    (0.0, 0.0, 0.0, 1e-9),               # sub-millimetre
+]
+
+def _random_points(rng, n, center=(26.2, 92.9), spread=2.0):
+    return ([center[0] + rng.uniform(-spread, spread) for _ in range(n)],
+            [center[1] + rng.uniform(-spread, spread) for _ in range(n)])
+
+def _global_points(rng, n):
+    return [rng.uniform(-90, 90) for _ in range(n)], [rng.uniform(-180, 180) for _ in range(n)]
+
+@pytest.mark.parametrize("points", [_random_points, _global_points])
+def test_vectorized_matches_scalar(points):
+    rng = random.Random(7)
+    lats, lons = points(rng, 2000)
+    for lat, lon in [(26.9, 94.2), (0.0, 0.0), (-33.9, 151.2), (89.5, -179.5)]:
+        scalar = np.array([haversine_distance(lat, lon, a, b) for a, b in zip(lats, lons)])
+        np.testing.assert_allclose(distances_from(lat, lon, lats, lons), scalar, rtol=1e-9, atol=1e-6)
+
+@pytest.mark.parametrize("lat1, lon1, lat2, lon2", EDGE_PAIRS)
+def test_edge_pairs_agree(lat1, lon1, lat2, lon2):
+    scalar = haversine_distance(lat1, lon1, lat2, lon2)
+    assert scalar == pytest.approx(haversine_distance(lat2, lon2, lat1, lon1), abs=1e-6)
+    assert distances_from(lat1, lon1, [lat2], [lon2])[0] == pytest.approx(scalar, rel=1e-9, abs=1e-6)
+    assert pairwise_distances([lat1], [lon1], [lat2], [lon2])[0, 0] == pytest.approx(scalar, rel=1e-9, abs=1e-6)
+    assert 0.0 <= scalar <= np.pi * EARTH_RADIUS_METERS + 1e-6
+
+def test_edge_pair_values():
+    assert haversine_distance(26.9, 94.2, 26.9, 94.2) == 0.0
+    assert haversine_distance(90.0, 0.0, 90.0, 123.0) == pytest.approx(0.0, abs=1e-6)
+    assert haversine_distance(0.0, 180.0, 0.0, -180.0) == pytest.approx(0.0, abs=1e-6)
+    assert haversine_distance(90.0, 0.0, -90.0, 0.0) == pytest.approx(np.pi * EARTH_RADIUS_METERS)
+    # 0.2 degrees of longitude at 10N, not 359.8
+    across = haversine_distance(10.0, 179.9, 10.0, -179.9)
+    assert across == pytest.approx(haversine_distance(10.0, -0.1, 10.0, 0.1), rel=1e-9)
+
+def test_pairwise_matches_kernel_and_is_symmetric():
+    rng = random.Random(11)
+    lats, lons = _random_points(rng, 300)
+    lats += [lats[0], 90.0, -90.0, 10.0, 10.0]
+    lons += [lons[0], 0.0, 0.0, 179.9, -179.9]
+    matrix = pairwise_distances(lats, lons)
+    for i in range(len(lats)):
+        np.testing.assert_allclose(matrix[i], distances_from(lats[i], lons[i], lats, lons), rtol=1e-9, atol=1e-6)
+    np.testing.assert_allclose(matrix, matrix.T, atol=1e-6)
+    np.testing.assert_allclose(np.diag(matrix), 0.0, atol=1e-6)
+
+    other_lats, other_lons = _random_points(rng, 40)
+    np.testing.assert_allclose(pairwise_distances(lats, lons, other_lats, other_lons)[:, 5],
+                               distances_from(other_lats[5], other_lons[5], lats, lons), rtol=1e-9, atol=1e-6)
+
+@pytest.mark.parametrize("center", [(26.9, 94.2), (0.0, 0.0), (10.0, 179.95), (-20.0, -179.95)])
+def test_equirectangular_within_tolerance(center):
+    rng = random.Random(3)
+    lats, lons = _random_points(rng, 5000, center=center, spread=0.45)
+    # Keep the longitudes in [-180, 180] so the points near the antimeridian wrap
+    lons = [(lon + 180.0) % 360.0 - 180.0 for lon in lons]
+    exact = distances_from(center[0], center[1], lats, lons)
+    within = exact <= EQUIRECTANGULAR_MAX_METERS
+    assert within.sum() > 1000
+
+    fast = distances_from(center[0], center[1], lats, lons, fast=True)
+    np.testing.assert_allclose(fast[within], exact[within], rtol=1e-3, atol=1.0)
+
+    # The matrix shares one longitude scale across the set, so it drifts with
+    # the set's latitude spread (0.9 degrees here) as well as with distance
+    matrix = pairwise_distances(lats[:200], lons[:200], fast=True)
+    exact_matrix = pairwise_distances(lats[:200], lons[:200])
+    close = exact_matrix <= EQUIRECTANGULAR_MAX_METERS
+    np.testing.assert_allclose(matrix[close], exact_matrix[close], rtol=5e-3, atol=1.0)
+
+def test_identical_points_are_zero_on_every_path():
+    lats, lons = [26.9, 90.0, -90.0, 0.0], [94.2, 0.0, 180.0, -180.0]
+    for lat, lon in zip(lats, lons):
+        assert haversine_distance(lat, lon, lat, lon) == 0.0
+        assert distances_from(lat, lon, [lat], [lon])[0] == 0.0
+        assert distances_from(lat, lon, [lat], [lon], fast=True)[0] == 0.0
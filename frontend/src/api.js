@@ -92,6 +92,8 @@ export const analyticsApi = {
   getNgoAnalytics: (ngoId) => api.get(`/analytics/ngo/${ngoId}`),
   getGlobalAnalytics: () => api.get('/analytics/global'),
   getTimeBuckets: () => api.get('/analytics/time-buckets'),
+  // params: { metric, granularity, start, end, wasteType | contaminationType | userType }
+  getTimeseries: (params) => api.get('/analytics/timeseries', { params }),
   getUsersLeaderboard: (category = 'overall', limit = 20) =>
     api.get('/analytics/leaderboard/users', { params: { category, limit } }),
   getNgosLeaderboard: (category = 'overall', limit = 20) =>